@@ -1,26 +1,44 @@
 #AlphaCandle.py
+# candlestick_data needs symbol_start to be UNIQUE, or the ON DUPLICATE KEY UPDATE in
+# insert_candlestick_data never fires and a refetched session is stored twice. On an
+# existing database, drop the duplicates (keeping the newest copy) and swap the key:
+#
+#   DELETE d FROM candlestick_data d
+#   JOIN candlestick_data k ON k.symbolID = d.symbolID AND k.start = d.start AND k.id > d.id;
+#   ALTER TABLE candlestick_data DROP KEY symbol_start, ADD UNIQUE KEY symbol_start (symbolID, start);
+#
+# then rebuild what was derived from the doubled candles:
+#
+#   TRUNCATE candle_rollups; TRUNCATE candle_sessions; TRUNCATE opening_windows;
+#   python candle_rollups.py; python candle_codec.py; python opening_windows.py
+#
+# A session fetched before it closed is recorded as 'partial' and fetched again on the
+# next cycle; candle_coverage.status needs the extra value:
+#
+#   ALTER TABLE candle_coverage MODIFY status enum('fetched','partial','empty','failed') NOT NULL;
 import sys
 import os
+import argparse
 import time
-import pymysql
 from pymysql.err import MySQLError
-from pymysql.cursors import DictCursor
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dtime
 from pytz import timezone
-from questrade_api import QuestradeAPI
-from credentials import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+from questrade_api import LazyQuestradeAPI
+from candle_rollups import rollup_session
+from candle_codec import pack_session
+from opening_windows import extract_opening_window
+from candle_scheduler import plan_cycle, average_volume, resume_date
+from db import connect_to_db
 
 # Initialize Questrade API
-qt = QuestradeAPI(user_id=1)
+qt = LazyQuestradeAPI(user_id=1)
 
-# Database configuration
-db_config = {
-    'host': MYSQL_HOST,
-    'user': MYSQL_USER,
-    'password': MYSQL_PASSWORD,
-    'database': MYSQL_DATABASE,
-    'cursorclass': DictCursor  # Use DictCursor for dictionary results
-}
+# Ingest settings
+MAX_NO_DATA_DAYS = 8          # consecutive empty sessions before a security is negatively cached
+NO_DATA_COOLOFF_DAYS = 7      # how long a negatively cached security is skipped
+GAP_FILL_LOOKBACK_DAYS = 200  # how far back --fill-gaps looks for missing sessions
+STORE_COMPACT_SESSIONS = True # also keep a packed one-row-per-session copy in candle_sessions
+SESSION_LAST_BAR = dtime(15, 59)  # a session is complete once this bar (or the next day) is in
 
 # General helper function to handle MySQL operations
 def execute_query(cursor, query, params=None):
@@ -50,9 +68,70 @@ def get_existing_data_range(cursor, symbolId):
     result = cursor.fetchone()
     return result['min_date'], result['max_date']
 
+def load_watermarks(cursor):
+    """
+    Load the ingest watermark of every security in one read.
+    Securities that have never been ingested come back with NULL watermark columns.
+    """
+    query = """
+        SELECT s.symbolId, s.averageVol20Days, s.averageVol3Months,
+               s.lastTradePrice, s.prevDayClosePrice,
+               w.first_bar, w.last_bar, w.last_attempt,
+               COALESCE(w.consecutive_empty_days, 0) AS consecutive_empty_days, w.skip_until,
+               w.symbolId IS NOT NULL AS has_watermark,
+               c.status AS last_bar_status
+        FROM qt_securities s
+        LEFT JOIN candle_watermarks w ON w.symbolId = s.symbolId
+        LEFT JOIN candle_coverage c ON c.symbolId = s.symbolId AND c.session_date = DATE(w.last_bar)
+    """
+    return execute_query(cursor, query)
+
+def seed_watermark(connection, cursor, symbolId):
+    """
+    Build the watermark row for a security from candlestick_data.
+    Only needed once per security, the first time it is seen without a watermark.
+    """
+    min_date, max_date = get_existing_data_range(cursor, symbolId)
+    cursor.execute("""
+        INSERT INTO candle_watermarks (symbolId, first_bar, last_bar)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE first_bar = VALUES(first_bar), last_bar = VALUES(last_bar)
+    """, (symbolId, min_date, max_date))
+    connection.commit()
+    return min_date, max_date
+
+def update_watermark(cursor, symbolId, first_bar, last_bar):
+    """
+    Widen the watermark to cover [first_bar, last_bar] and reset the empty-day counter.
+    Does not commit, so it lands in the same transaction as the candle insert.
+    """
+    cursor.execute("""
+        INSERT INTO candle_watermarks (symbolId, first_bar, last_bar, last_attempt, consecutive_empty_days)
+        VALUES (%s, %s, %s, NOW(), 0)
+        ON DUPLICATE KEY UPDATE
+            first_bar = LEAST(COALESCE(first_bar, VALUES(first_bar)), VALUES(first_bar)),
+            last_bar = GREATEST(COALESCE(last_bar, VALUES(last_bar)), VALUES(last_bar)),
+            last_attempt = NOW(),
+            consecutive_empty_days = 0
+    """, (symbolId, first_bar, last_bar))
+
+def record_empty_day(connection, cursor, symbolId):
+    """
+    Note a fetch attempt that returned no candles.
+    """
+    cursor.execute("""
+        INSERT INTO candle_watermarks (symbolId, last_attempt, consecutive_empty_days)
+        VALUES (%s, NOW(), 1)
+        ON DUPLICATE KEY UPDATE
+            last_attempt = NOW(),
+            consecutive_empty_days = consecutive_empty_days + 1
+    """, (symbolId,))
+    connection.commit()
+
 def insert_candlestick_data(connection, cursor, candlestick_data):
     """
-    Insert or update candlestick data in the database.
+    Insert or update candlestick data in the database, advancing the security's
+    watermark in the same transaction.
     """
     insert_query = """
         INSERT INTO candlestick_data (
@@ -67,6 +146,8 @@ def insert_candlestick_data(connection, cursor, candlestick_data):
             VWAP = VALUES(VWAP)
     """
     cursor.executemany(insert_query, candlestick_data)
+    starts = [row[1] for row in candlestick_data]
+    update_watermark(cursor, candlestick_data[0][0], min(starts), max(starts))
     connection.commit()
 
 def fetch_candles(qt, symbolId, start_iso, end_iso, retries=5):
@@ -91,104 +172,198 @@ def fetch_candles(qt, symbolId, start_iso, end_iso, retries=5):
     print(f"Failed to fetch data after {retries} attempts.")
     return None
 
-def delete_old_data(connection, cursor, symbolId, days_to_keep=400):
+def delete_old_data(connection, cursor, symbolId, first_bar, days_to_keep=400):
     """
     Delete candlestick data older than a specified number of days.
+    Skipped entirely when the watermark shows nothing is old enough to delete.
     """
     cutoff_date = datetime.now(timezone('UTC')) - timedelta(days=days_to_keep)
+    if first_bar is None or first_bar >= cutoff_date.replace(tzinfo=None):
+        return
+
     delete_query = """
         DELETE FROM candlestick_data
         WHERE symbolID = %s AND start < %s
     """
     cursor.execute(delete_query, (symbolId, cutoff_date))
+    cursor.execute("""
+        UPDATE candle_watermarks
+        SET first_bar = (SELECT MIN(start) FROM candlestick_data WHERE symbolID = %s)
+        WHERE symbolId = %s
+    """, (symbolId, symbolId))
     connection.commit()
 
-def process_security_data(cursor, connection, security, start_date, end_date):
+def load_market_holidays(cursor):
     """
-    Fetch data for a security between start_date and end_date, skipping weekends and holidays.
+    Load every market holiday once so the per-day loops don't query for each date.
+    """
+    return {row['holiday_date'] for row in execute_query(cursor, "SELECT holiday_date FROM market_holidays")}
+
+def trading_sessions(start_date, end_date, holidays):
+    """
+    Return the trading dates between start_date and end_date (inclusive), newest first.
+    """
+    sessions = []
+    current = end_date
+    while current >= start_date:
+        if current.weekday() < 5 and current not in holidays:
+            sessions.append(current)
+        current -= timedelta(days=1)
+    return sessions
+
+def record_coverage(cursor, symbolId, session_date, status):
+    """
+    Record the outcome of fetching one session for a security.
+    Does not commit, so a 'fetched' row lands in the same transaction as its candles.
+    """
+    cursor.execute("""
+        INSERT INTO candle_coverage (symbolId, session_date, status, attempts, updated_at)
+        VALUES (%s, %s, %s, 1, NOW())
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status),
+            attempts = attempts + 1,
+            updated_at = NOW()
+    """, (symbolId, session_date, status))
+
+def mark_no_data(connection, cursor, symbolId):
+    """
+    Negatively cache a security that keeps returning no candles,
+    so its requests are skipped until the cool-off period has passed.
+    """
+    cursor.execute("""
+        UPDATE candle_watermarks
+        SET skip_until = NOW() + INTERVAL %s DAY
+        WHERE symbolId = %s
+    """, (NO_DATA_COOLOFF_DAYS, symbolId))
+    connection.commit()
+
+def is_negatively_cached(security):
+    """
+    Check whether a security is still inside its no-data cool-off period.
+    """
+    return security['skip_until'] is not None and security['skip_until'] > datetime.now()
+
+def session_complete(session_date, candle_list):
+    """
+    A session is complete once it's over (an earlier day) or its closing bar is in.
+    """
+    if session_date < datetime.now(timezone('US/Eastern')).date():
+        return True
+    return datetime.fromisoformat(candle_list[-1]['start']).time() >= SESSION_LAST_BAR
+
+def fetch_session(cursor, connection, symbolId, session_date):
+    """
+    Fetch and store one session of 1-minute candles, recording its coverage.
+    Returns 'fetched', 'partial' (still trading - fetched again next cycle),
+    'empty' or 'failed'.
     """
-    symbolId = security['symbolId']
     eastern = timezone('US/Eastern')
-    current_end = end_date
-    consecutive_no_data_days = 0
-    max_no_data_days = 8
 
-    while current_end >= start_date:
-        # Skip weekends
-        if current_end.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
-            current_end -= timedelta(days=1)
-            continue
+    # Define market open and close times
+    market_open_time = eastern.localize(datetime.combine(session_date, datetime.strptime('09:30', '%H:%M').time()))
+    market_close_time = eastern.localize(datetime.combine(session_date, datetime.strptime('16:00', '%H:%M').time()))
+    start_iso = market_open_time.isoformat()
+    end_iso = market_close_time.isoformat()
 
-        # Check if the date is a holiday
-        cursor.execute("SELECT COUNT(*) FROM market_holidays WHERE holiday_date = %s", (current_end,))
-        if cursor.fetchone()['COUNT(*)'] > 0:
-            print(f"Skipping holiday: {current_end}")
-            current_end -= timedelta(days=1)
-            continue
+    # Debugging line to track data fetching
+    print(f"Fetching candles for symbolID {symbolId} from {start_iso} to {end_iso}")
+
+    candle_list = fetch_candles(qt, symbolId, start_iso, end_iso)
 
-        # Define market open and close times
-        market_open_time = eastern.localize(datetime.combine(current_end, datetime.strptime('09:30', '%H:%M').time()))
-        market_close_time = eastern.localize(datetime.combine(current_end, datetime.strptime('16:00', '%H:%M').time()))
-        start_iso = market_open_time.isoformat()
-        end_iso = market_close_time.isoformat()
+    if candle_list is None:
+        record_coverage(cursor, symbolId, session_date, 'failed')
+        connection.commit()
+        return 'failed'
 
-        # Debugging line to track data fetching
-        print(f"Fetching candles for symbolID {symbolId} from {start_iso} to {end_iso}")
+    if not candle_list:
+        record_coverage(cursor, symbolId, session_date, 'empty')
+        record_empty_day(connection, cursor, symbolId)
+        return 'empty'
 
-        candle_list = fetch_candles(qt, symbolId, start_iso, end_iso)
+    candlestick_data = [
+        (
+            symbolId,
+            candle['start'],
+            candle['end'],
+            candle['open'],
+            candle['high'],
+            candle['low'],
+            candle['close'],
+            candle['volume'],
+            candle.get('VWAP')
+        )
+        for candle in candle_list
+    ]
+    if not session_complete(session_date, candle_list):
+        # Rollups, windows and the packed copy wait for the whole session
+        record_coverage(cursor, symbolId, session_date, 'partial')
+        insert_candlestick_data(connection, cursor, candlestick_data)
+        return 'partial'
+
+    record_coverage(cursor, symbolId, session_date, 'fetched')
+    insert_candlestick_data(connection, cursor, candlestick_data)
+
+    # Refresh the multi-timeframe bars, opening window (and the packed copy) for the session just ingested
+    rollup_session(cursor, symbolId, session_date)
+    extract_opening_window(cursor, symbolId, session_date)
+    if STORE_COMPACT_SESSIONS:
+        pack_session(cursor, symbolId, session_date)
+    connection.commit()
+    return 'fetched'
 
-        if not candle_list:
+def process_security_data(cursor, connection, security, start_date, end_date, holidays):
+    """
+    Fetch data for a security between start_date and end_date, skipping weekends and holidays.
+    """
+    symbolId = security['symbolId']
+    consecutive_no_data_days = 0
+
+    for session_date in trading_sessions(start_date, end_date, holidays):
+        status = fetch_session(cursor, connection, symbolId, session_date)
+
+        if status in ('fetched', 'partial'):
+            consecutive_no_data_days = 0
+        elif status == 'empty':        # 'failed' is an API/network error – coverage retries it, no penalty
             consecutive_no_data_days += 1
-            if consecutive_no_data_days >= max_no_data_days:
-                print(f"Skipping security {symbolId} after {max_no_data_days} consecutive no-data days.")
+            if consecutive_no_data_days >= MAX_NO_DATA_DAYS:
+                print(f"Skipping security {symbolId} for {NO_DATA_COOLOFF_DAYS} days after {MAX_NO_DATA_DAYS} consecutive no-data days.")
+                mark_no_data(connection, cursor, symbolId)
                 return
-        else:
-            consecutive_no_data_days = 0
-            candlestick_data = [
-                (
-                    symbolId,
-                    candle['start'],
-                    candle['end'],
-                    candle['open'],
-                    candle['high'],
-                    candle['low'],
-                    candle['close'],
-                    candle['volume'],
-                    candle.get('VWAP')
-                )
-                for candle in candle_list
-            ]
-            insert_candlestick_data(connection, cursor, candlestick_data)
-
-        # Move to the previous day
-        current_end -= timedelta(days=1)
 
 
 def update_candlestick_data():
     """
     Main function to update candlestick data for all tradable securities.
     """
+    connection = cursor = None
     try:
-        connection = pymysql.connect(**db_config)
+        connection = connect_to_db()
         cursor = connection.cursor()
         print("Connected to the database.")
 
-        # Fetch all tradable securities
-        securities = execute_query(cursor, "SELECT symbolId FROM qt_securities")
+        # Fetch all tradable securities together with their ingest watermarks,
+        # most liquid and most stale first, within this cycle's API budget
+        securities = [s for s in load_watermarks(cursor) if not is_negatively_cached(s)]
+        holidays = load_market_holidays(cursor)
+        securities, deferred = plan_cycle(securities, holidays)
         total_securities = len(securities)
+        print(f"{total_securities} securities planned this cycle, {len(deferred)} deferred.")
 
         for idx, security in enumerate(securities, start=1):
             symbolId = security['symbolId']
-            min_date, max_date = get_existing_data_range(cursor, symbolId)
-            start_date = (max_date + timedelta(days=1)).date() if max_date else (datetime.now(timezone('US/Eastern')) - timedelta(days=200)).date()
+            if security['has_watermark']:
+                min_date = security['first_bar']
+            else:
+                min_date, security['last_bar'] = seed_watermark(connection, cursor, symbolId)
             end_date = datetime.now(timezone('US/Eastern')).date()
+            start_date = resume_date(security, end_date)
 
             if start_date <= end_date:
                 print(f"\nProcessing security {symbolId} ({idx}/{total_securities})")
-                process_security_data(cursor, connection, security, start_date, end_date)
+                process_security_data(cursor, connection, security, start_date, end_date, holidays)
 
                 # Delete old data
-                delete_old_data(connection, cursor, symbolId)
+                delete_old_data(connection, cursor, symbolId, min_date)
 
         print("\nSuccessfully updated candlestick data for all securities.")
 
@@ -204,6 +379,101 @@ def update_candlestick_data():
         if connection:
             connection.close()
 
+def print_cycle_plan():
+    """
+    Show the order the next cycle would ingest in, without fetching anything.
+    """
+    connection = connect_to_db()
+    try:
+        with connection.cursor() as cursor:
+            securities = [s for s in load_watermarks(cursor) if not is_negatively_cached(s)]
+            holidays = load_market_holidays(cursor)
+    finally:
+        connection.close()
+
+    planned, deferred = plan_cycle(securities, holidays)
+    print(f"{len(planned)} securities planned, {len(deferred)} deferred")
+    print(f"{'ID':<10}{'Priority':>10}{'Behind':>8}{'AvgVol':>14}")
+    for security in planned:
+        print(f"{security['symbolId']:<10}{security['priority']:>10.2f}"
+              f"{security['sessions_behind']:>8}{average_volume(security):>14,d}")
+
+def seed_coverage(connection, cursor):
+    """
+    One-off backfill of candle_coverage from the sessions already in candlestick_data,
+    so gap filling doesn't re-request history ingested before coverage was tracked.
+    """
+    cursor.execute("""
+        INSERT IGNORE INTO candle_coverage (symbolId, session_date, status, attempts, updated_at)
+        SELECT symbolID, DATE(start), 'fetched', 1, NOW()
+        FROM candlestick_data
+        GROUP BY symbolID, DATE(start)
+    """)
+    connection.commit()
+    print(f"Seeded {cursor.rowcount} coverage rows from candlestick_data.")
+
+def find_missing_sessions(cursor, securities, holidays, lookback_days):
+    """
+    Return {symbolId: [session_date, ...]} for every session inside a security's
+    watermark range (limited to the lookback window) that has no 'fetched' or
+    'empty' coverage row ('partial' sessions are fetched again).
+    """
+    window_start = (datetime.now(timezone('US/Eastern')) - timedelta(days=lookback_days)).date()
+    covered = {}
+    cursor.execute("""
+        SELECT symbolId, session_date
+        FROM candle_coverage
+        WHERE session_date >= %s AND status IN ('fetched', 'empty')
+    """, (window_start,))
+    for row in cursor.fetchall():
+        covered.setdefault(row['symbolId'], set()).add(row['session_date'])
+
+    missing = {}
+    for security in securities:
+        if security['first_bar'] is None or is_negatively_cached(security):
+            continue
+        start_date = max(security['first_bar'].date(), window_start)
+        end_date = security['last_bar'].date()
+        done = covered.get(security['symbolId'], set())
+        gaps = [d for d in trading_sessions(start_date, end_date, holidays) if d not in done]
+        if gaps:
+            missing[security['symbolId']] = gaps
+    return missing
+
+def fill_candlestick_gaps(lookback_days=GAP_FILL_LOOKBACK_DAYS):
+    """
+    Request only the sessions missing from the coverage map (never fetched, or failed
+    after retries) instead of walking forward from the last bar.
+    """
+    connection = cursor = None
+    try:
+        connection = connect_to_db()
+        cursor = connection.cursor()
+
+        # Without coverage every stored session looks missing - seed it first
+        # rather than re-requesting the whole history
+        if not execute_query(cursor, "SELECT 1 FROM candle_coverage LIMIT 1"):
+            seed_coverage(connection, cursor)
+
+        securities = load_watermarks(cursor)
+        holidays = load_market_holidays(cursor)
+        missing = find_missing_sessions(cursor, securities, holidays, lookback_days)
+        print(f"Found {sum(len(g) for g in missing.values())} missing sessions across {len(missing)} securities.")
+
+        for idx, (symbolId, sessions) in enumerate(missing.items(), start=1):
+            print(f"\nFilling {len(sessions)} sessions for security {symbolId} ({idx}/{len(missing)})")
+            for session_date in sessions:
+                fetch_session(cursor, connection, symbolId, session_date)
+
+    except MySQLError as e:
+        print(f"MySQL error occurred during gap filling: {e}")
+        sys.exit(1)
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
 def is_cron_run():
     """
     Check if the script is run by cron by looking at the LOGNAME variable.
@@ -212,6 +482,34 @@ def is_cron_run():
     return os.getenv("LOGNAME") is None or os.getenv("LOGNAME") == "root"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect 1-minute candles for every security in qt_securities.")
+    parser.add_argument('--fill-gaps', action='store_true',
+                        help="request only sessions missing from candle_coverage, then exit")
+    parser.add_argument('--lookback', type=int, default=GAP_FILL_LOOKBACK_DAYS,
+                        help="days of history --fill-gaps inspects")
+    parser.add_argument('--seed-coverage', action='store_true',
+                        help="backfill candle_coverage from existing candles, then exit")
+    parser.add_argument('--plan', action='store_true',
+                        help="print the next cycle's ingestion order, then exit")
+    args = parser.parse_args()
+
+    if args.plan:
+        print_cycle_plan()
+        sys.exit(0)
+
+    if args.seed_coverage:
+        connection = connect_to_db()
+        try:
+            with connection.cursor() as cursor:
+                seed_coverage(connection, cursor)
+        finally:
+            connection.close()
+        sys.exit(0)
+
+    if args.fill_gaps:
+        fill_candlestick_gaps(args.lookback)
+        sys.exit(0)
+
     try:
         while True:
             # Check the current time
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+activities_sync.py
+Local ledger of Questrade account activities (trades, dividends, deposits,
+fees, …) kept in qt_activities.
+
+The activities endpoint only answers MAX_WINDOW_DAYS at a time, so a range is
+split into maximal windows and each account's windows are fetched
+concurrently (one QuestradeAPI per worker thread). Every account has a
+high‑water mark in activity_sync_state: the end of the last contiguous run
+of windows that came back cleanly. Later runs only request windows after it
+(less OVERLAP_DAYS, since activities can post a day or two late); rows are
+de‑duplicated on a hash of their content.
+
+Tables used / created:
+  • qt_accounts           – which accounts to sync (per user_id)
+  • qt_activities         – one row per activity
+  • activity_sync_state   – (account_number, synced_through, last_run)
+
+  python activities_sync.py                 # every account, from the high‑water mark
+  python activities_sync.py --since 2020-01-01 --workers 8
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pytz import timezone
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+MAX_WINDOW_DAYS    = 31            # longest range the activities endpoint accepts
+LOOKBACK_DAYS      = 730           # first sync of an account
+OVERLAP_DAYS       = 3
+WORKERS            = 4             # concurrent windows per account
+EASTERN            = timezone('US/Eastern')
+FIELDS             = (
+    "tradeDate", "transactionDate", "settlementDate", "action", "symbol", "symbolId",
+    "description", "currency", "quantity", "price", "grossAmount", "commission",
+    "netAmount", "type",
+)
+# ────────────────────────────────────────────────────────────────────
+
+# -------------------------------------------------------------------
+# 1. Windows
+# -------------------------------------------------------------------
+def split_windows(start, end, max_days=MAX_WINDOW_DAYS):
+    """Split [start, end) into the fewest consecutive windows of at most max_days."""
+    windows = []
+    while start < end:
+        stop = min(start + timedelta(days=max_days), end)
+        windows.append((start, stop))
+        start = stop
+    return windows
+
+def contiguous_end(windows, done):
+    """End of the longest run of completed windows from the first one (None if the first failed)."""
+    reached = None
+    for window in windows:
+        if window not in done:
+            break
+        reached = window[1]
+    return reached
+
+# -------------------------------------------------------------------
+# 2. Fetch & persist
+# -------------------------------------------------------------------
+def _client(clients, user_id):
+    """
+    One QuestradeAPI per (worker thread, user) – its cursor isn't shareable.
+    Kept in `clients` so the caller can close them once its pool is done.
+    """
+    from questrade_api import QuestradeAPI
+
+    key = (threading.get_ident(), user_id)
+    if key not in clients:
+        clients[key] = QuestradeAPI(user_id=user_id)
+    return clients[key]
+
+def fetch_window(clients, user_id, account_number, window):
+    start, end = window
+    response = _client(clients, user_id).activities_acct(account_number, start.isoformat(), end.isoformat())
+    return response.get("activities", [])
+
+def _timestamp(value):
+    """'2026-01-15T00:00:00.000000-05:00' → datetime (exchange‑local wall time)."""
+    if not value:
+        return None
+    return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+
+def activity_row(account_number, activity, occurrence=0):
+    """`occurrence` tells apart identical activities (e.g. two equal fills) in one response."""
+    values = [activity.get(field) for field in FIELDS]
+    row_hash = hashlib.sha1(repr((account_number, values, occurrence)).encode()).hexdigest()
+    for i, field in enumerate(FIELDS[:3]):
+        values[i] = _timestamp(values[i])
+    values[6] = (values[6] or "")[:255]
+    return (row_hash, account_number, *values)
+
+def store_activities(cur, account_number, activities):
+    seen, rows = {}, []
+    for activity in activities:
+        key = repr(sorted(activity.items()))
+        seen[key] = seen.get(key, -1) + 1
+        rows.append(activity_row(account_number, activity, seen[key]))
+    if rows:
+        cur.executemany(
+            f"""
+            INSERT IGNORE INTO qt_activities (row_hash, account_number, {', '.join(FIELDS)})
+            VALUES ({', '.join(['%s'] * (len(FIELDS) + 2))})
+            """,
+            rows,
+        )
+    return cur.rowcount if rows else 0
+
+def load_high_water_marks(cur):
+    cur.execute("SELECT account_number, synced_through FROM activity_sync_state")
+    return {row["account_number"]: row["synced_through"] for row in cur.fetchall()}
+
+def save_high_water_mark(cur, account_number, synced_through):
+    cur.execute(
+        """
+        INSERT INTO activity_sync_state (account_number, synced_through, last_run)
+        VALUES (%s, %s, NOW())
+        ON DUPLICATE KEY UPDATE synced_through = VALUES(synced_through), last_run = NOW()
+        """,
+        (account_number, synced_through.replace(tzinfo=None)),
+    )
+
+# -------------------------------------------------------------------
+# 3. Sync
+# -------------------------------------------------------------------
+def sync_account(conn, user_id, account_number, start, end, workers=WORKERS):
+    """
+    Fetch [start, end) for one account with `workers` concurrent windows, store
+    every activity and advance the high‑water mark. Returns (new rows, failed windows).
+    """
+    windows = split_windows(start, end)
+    done, failed, inserted = set(), [], 0
+    clients = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetch_window, clients, user_id, account_number, w): w for w in windows}
+            for future in as_completed(futures):
+                window = futures[future]
+                try:
+                    activities = future.result()
+                except Exception as e:
+                    print(f"  {account_number} {window[0]:%Y-%m-%d}: {e}")
+                    failed.append(window)
+                    continue
+                with conn.cursor() as cur:
+                    inserted += store_activities(cur, account_number, activities)
+                conn.commit()
+                done.add(window)
+    finally:
+        for client in clients.values():
+            client.db.close()
+
+    reached = contiguous_end(windows, done)
+    if reached is not None:
+        with conn.cursor() as cur:
+            save_high_water_mark(cur, account_number, reached)
+        conn.commit()
+    return inserted, failed
+
+def sync_all(conn, since=None, workers=WORKERS, account_numbers=None):
+    """Sync every account in qt_accounts (or just `account_numbers`) up to now."""
+    from questrade_api import QuestradeAPI
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT user_id, account_number, account_type FROM qt_accounts ORDER BY user_id")
+        accounts = [a for a in cur.fetchall() if account_numbers is None or a["account_number"] in account_numbers]
+        marks = load_high_water_marks(cur)
+
+    now = datetime.now(EASTERN)
+    for user_id in sorted({a["user_id"] for a in accounts}):
+        # One call per user up front so a due token refresh happens once,
+        # before the worker threads each load that user's tokens
+        client = QuestradeAPI(user_id=user_id)
+        client.time()
+        client.db.close()
+
+    for account in accounts:
+        mark = marks.get(account["account_number"])
+        if since is not None:
+            start = EASTERN.localize(datetime.combine(since, datetime.min.time()))
+        elif mark is not None:
+            start = EASTERN.localize(mark) - timedelta(days=OVERLAP_DAYS)
+        else:
+            start = now - timedelta(days=LOOKBACK_DAYS)
+        if start >= now:
+            continue
+
+        t0 = time.perf_counter()
+        inserted, failed = sync_account(conn, account["user_id"], account["account_number"], start, now, workers)
+        status = f", {len(failed)} windows failed" if failed else ""
+        print(f"  {account['account_type']:<10} {account['account_number']}: {inserted} new activities "
+              f"({len(split_windows(start, now))} windows, {time.perf_counter() - t0:.1f}s{status})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Questrade account activities into qt_activities.")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="re‑read from this date instead of the high‑water mark")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent windows per account")
+    parser.add_argument("--account", action="append", help="only this account number (repeatable)")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        sync_all(conn, args.since, args.workers, args.account)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
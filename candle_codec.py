@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+candle_codec.py
+Compact one‑row‑per‑symbol‑session storage for 1‑minute candles.
+
+A session's candles are packed into a single zlib‑compressed blob:
+  • minute offsets from 09:30, delta‑encoded (almost always 1)
+  • prices as tick‑scaled integers (PRICE_SCALE ticks per dollar); close is
+    delta‑encoded bar to bar, open/high/low/VWAP are stored relative to close
+  • volume as plain integers
+The `end` column is dropped (always start + 1 minute) and so is the
+auto‑increment id, so a ~390‑row session shrinks to one row of a few KB.
+
+Tables used / created:
+  • candlestick_data   – source minute candles
+  • candle_coverage    – fetched sessions, used to find what to pack
+  • candle_sessions    – (symbolId, session_date, n_bars, price_scale, payload)
+"""
+
+import argparse
+import struct
+import zlib
+import numpy as np
+from datetime import datetime, timedelta, time as dtime
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+PRICE_SCALE        = 10000         # ticks per dollar (0.0001 resolution)
+SESSION_OPEN       = dtime(9, 30)
+ZLIB_LEVEL         = 6
+# ────────────────────────────────────────────────────────────────────
+
+_MAGIC = b"QTC1"
+_HEADER = struct.Struct("<4sHI")   # magic, n_bars, price_scale
+
+# -------------------------------------------------------------------
+# 1. Encode / decode
+# -------------------------------------------------------------------
+def _to_ticks(prices, scale):
+    return np.rint(np.asarray(prices, dtype=np.float64) * scale).astype(np.int64)
+
+def encode_arrays(minutes, open_, high, low, close, volume, vwap, price_scale=PRICE_SCALE):
+    """
+    Pack one session into a compressed blob.
+    `minutes` are minute offsets from the 09:30 open; all arrays share its length.
+    """
+    minutes = np.asarray(minutes, dtype=np.int64)
+    n = len(minutes)
+    close_t = _to_ticks(close, price_scale)
+
+    columns = [
+        np.diff(minutes, prepend=0).astype(np.int16),
+        np.diff(close_t, prepend=0).astype(np.int32),
+        (_to_ticks(open_, price_scale) - close_t).astype(np.int32),
+        (_to_ticks(high, price_scale) - close_t).astype(np.int32),
+        (close_t - _to_ticks(low, price_scale)).astype(np.int32),
+        (_to_ticks(vwap, price_scale) - close_t).astype(np.int32),
+        np.asarray(volume, dtype=np.int64),
+    ]
+    body = b"".join(col.astype(col.dtype.newbyteorder("<")).tobytes() for col in columns)
+    return _HEADER.pack(_MAGIC, n, price_scale) + zlib.compress(body, ZLIB_LEVEL)
+
+def encode_candles(candles, price_scale=PRICE_SCALE):
+    """Pack chronologically ordered candle rows (dicts from candlestick_data)."""
+    session_open = datetime.combine(candles[0]["start"].date(), SESSION_OPEN)
+    minutes = [int((c["start"] - session_open).total_seconds() // 60) for c in candles]
+    return encode_arrays(
+        minutes,
+        [c["open"] for c in candles],
+        [c["high"] for c in candles],
+        [c["low"] for c in candles],
+        [c["close"] for c in candles],
+        [c["volume"] for c in candles],
+        [c["VWAP"] if c["VWAP"] is not None else c["close"] for c in candles],
+        price_scale,
+    )
+
+def decode_session(blob, session_date=None):
+    """
+    Unpack a blob into NumPy arrays: minute (offset from 09:30), open, high,
+    low, close, VWAP (float64) and volume (int64). When `session_date` is given
+    a `start` datetime64[m] array is included as well.
+    """
+    magic, n, price_scale = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise ValueError("Not a candle_sessions payload.")
+    body = zlib.decompress(blob[_HEADER.size:])
+
+    layout = [("dminute", "<i2"), ("dclose", "<i4"), ("open", "<i4"), ("high", "<i4"),
+              ("low", "<i4"), ("VWAP", "<i4"), ("volume", "<i8")]
+    raw, pos = {}, 0
+    for name, dtype in layout:
+        width = np.dtype(dtype).itemsize * n
+        raw[name] = np.frombuffer(body, dtype=dtype, count=n, offset=pos).astype(np.int64)
+        pos += width
+
+    close_t = np.cumsum(raw["dclose"])
+    scale = float(price_scale)
+    out = {
+        "minute": np.cumsum(raw["dminute"]),
+        "open": (close_t + raw["open"]) / scale,
+        "high": (close_t + raw["high"]) / scale,
+        "low": (close_t - raw["low"]) / scale,
+        "close": close_t / scale,
+        "VWAP": (close_t + raw["VWAP"]) / scale,
+        "volume": raw["volume"],
+    }
+    if session_date is not None:
+        base = np.datetime64(datetime.combine(session_date, SESSION_OPEN), "m")
+        out["start"] = base + out["minute"].astype("timedelta64[m]")
+    return out
+
+# -------------------------------------------------------------------
+# 2. Persistence helpers
+# -------------------------------------------------------------------
+def store_session(cursor, symbol_id, session_date, candles):
+    """Upsert one packed session. Does not commit."""
+    if not candles:
+        return
+    cursor.execute(
+        """
+        INSERT INTO candle_sessions (symbolId, session_date, n_bars, price_scale, payload)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            n_bars = VALUES(n_bars),
+            price_scale = VALUES(price_scale),
+            payload = VALUES(payload)
+        """,
+        (symbol_id, session_date, len(candles), PRICE_SCALE, encode_candles(candles)),
+    )
+
+def load_sessions(cursor, symbol_id, start_date, end_date):
+    """Return {session_date: arrays} for sessions in [start_date, end_date]."""
+    cursor.execute(
+        """
+        SELECT session_date, payload
+        FROM candle_sessions
+        WHERE symbolId = %s AND session_date BETWEEN %s AND %s
+        ORDER BY session_date
+        """,
+        (symbol_id, start_date, end_date),
+    )
+    return {row["session_date"]: decode_session(row["payload"], row["session_date"])
+            for row in cursor.fetchall()}
+
+def pack_session(cursor, symbol_id, session_date):
+    """Read one session from candlestick_data and store it packed. Does not commit."""
+    day_start = datetime.combine(session_date, dtime(0, 0))
+    cursor.execute(
+        """
+        SELECT start, open, high, low, close, volume, VWAP
+        FROM candlestick_data
+        WHERE symbolID = %s AND start >= %s AND start < %s
+        ORDER BY start ASC
+        """,
+        (symbol_id, day_start, day_start + timedelta(days=1)),
+    )
+    candles = cursor.fetchall()
+    store_session(cursor, symbol_id, session_date, candles)
+    return len(candles)
+
+# -------------------------------------------------------------------
+# 3. Backfill driver
+# -------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Pack fetched sessions into candle_sessions.")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="only pack sessions on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            query = """
+                SELECT c.symbolId, c.session_date
+                FROM candle_coverage c
+                LEFT JOIN candle_sessions s
+                       ON s.symbolId = c.symbolId AND s.session_date = c.session_date
+                WHERE c.status = 'fetched' AND s.symbolId IS NULL
+            """
+            params = []
+            if args.since:
+                query += " AND c.session_date >= %s"
+                params.append(args.since)
+            cur.execute(query, params)
+            sessions = cur.fetchall()
+            print(f"{len(sessions)} sessions to pack")
+
+            for idx, row in enumerate(sessions, start=1):
+                pack_session(cur, row["symbolId"], row["session_date"])
+                conn.commit()
+                if idx % 500 == 0:
+                    print(f"  {idx}/{len(sessions)}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
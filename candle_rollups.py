@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+candle_rollups.py
+Materialize 5‑minute, 15‑minute, hourly and daily OHLCV+VWAP bars from the
+1‑minute candles AlphaCandle collects, and serve bar queries from the coarsest
+stored timeframe that can answer them.
+
+Bars are aligned to the 09:30 session open, so every timeframe that divides
+another one nests inside it (5 → 15 → 60) and the 390‑minute bar is the
+daily bar.
+
+Tables used / created:
+  • candlestick_data   – minute candles AlphaCandle collects
+  • candle_coverage    – (symbolId, session_date, status) written by AlphaCandle
+  • candle_rollups     – (symbolId, timeframe, start) materialized bars
+"""
+
+import argparse
+from datetime import datetime, timedelta, time as dtime
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+ROLLUP_TIMEFRAMES  = (5, 15, 60, 390)   # minutes; 390 = full session (daily)
+SESSION_OPEN       = dtime(9, 30)
+# ────────────────────────────────────────────────────────────────────
+
+# -------------------------------------------------------------------
+# 1. Aggregation
+# -------------------------------------------------------------------
+def aggregate_bars(bars, timeframe):
+    """
+    Aggregate chronologically ordered bars (1‑minute candles or finer rollups)
+    into `timeframe`‑minute bars aligned to the session open.
+    Each input needs start/end/open/high/low/close/volume/VWAP; each output
+    also carries bar_count, the number of 1‑minute candles it covers.
+    """
+    out = []
+    current = None
+    for bar in bars:
+        session_open = datetime.combine(bar["start"].date(), SESSION_OPEN)
+        offset = int((bar["start"] - session_open).total_seconds() // 60)
+        bucket_start = session_open + timedelta(minutes=(offset // timeframe) * timeframe)
+        volume = bar["volume"] or 0
+
+        if current is None or current["start"] != bucket_start:
+            if current is not None:
+                out.append(_finish_bar(current))
+            current = {
+                "start": bucket_start,
+                "end": bar["end"],
+                "open": bar["open"],
+                "high": bar["high"],
+                "low": bar["low"],
+                "close": bar["close"],
+                "volume": 0,
+                "pv": 0.0,
+                "bar_count": 0,
+            }
+        current["end"] = bar["end"]
+        current["high"] = max(current["high"], bar["high"])
+        current["low"] = min(current["low"], bar["low"])
+        current["close"] = bar["close"]
+        current["volume"] += volume
+        current["pv"] += (bar["VWAP"] or bar["close"]) * volume
+        current["bar_count"] += bar.get("bar_count", 1)
+
+    if current is not None:
+        out.append(_finish_bar(current))
+    return out
+
+def _finish_bar(bar):
+    pv = bar.pop("pv")
+    bar["VWAP"] = pv / bar["volume"] if bar["volume"] else bar["close"]
+    return bar
+
+def choose_timeframe(requested, stored=ROLLUP_TIMEFRAMES):
+    """Coarsest stored timeframe that evenly divides the request (1 = raw candles)."""
+    candidates = [tf for tf in stored if tf <= requested and requested % tf == 0]
+    return max(candidates) if candidates else 1
+
+# -------------------------------------------------------------------
+# 2. Materialization
+# -------------------------------------------------------------------
+def _session_bounds(session_date):
+    start = datetime.combine(session_date, dtime(0, 0))
+    return start, start + timedelta(days=1)
+
+def rollup_session(cursor, symbol_id, session_date, timeframes=ROLLUP_TIMEFRAMES):
+    """
+    Recompute and upsert every rollup timeframe for one symbol‑session.
+    Does not commit, so the caller can keep it in the ingest transaction.
+    """
+    day_start, day_end = _session_bounds(session_date)
+    cursor.execute(
+        """
+        SELECT start, end, open, high, low, close, volume, VWAP
+        FROM candlestick_data
+        WHERE symbolID = %s AND start >= %s AND start < %s
+        ORDER BY start ASC
+        """,
+        (symbol_id, day_start, day_end),
+    )
+    candles = cursor.fetchall()
+    if not candles:
+        return 0
+
+    rows = []
+    for tf in timeframes:
+        for bar in aggregate_bars(candles, tf):
+            rows.append((
+                symbol_id, tf, bar["start"], bar["end"], bar["open"], bar["high"],
+                bar["low"], bar["close"], bar["volume"], bar["VWAP"], bar["bar_count"],
+            ))
+
+    cursor.executemany(
+        """
+        INSERT INTO candle_rollups (
+            symbolId, timeframe, start, end, open, high, low, close, volume, VWAP, bar_count
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            end = VALUES(end),
+            open = VALUES(open),
+            high = VALUES(high),
+            low = VALUES(low),
+            close = VALUES(close),
+            volume = VALUES(volume),
+            VWAP = VALUES(VWAP),
+            bar_count = VALUES(bar_count)
+        """,
+        rows,
+    )
+    return len(rows)
+
+def pending_sessions(cursor, since=None):
+    """Fetched sessions that have no daily rollup yet."""
+    query = """
+        SELECT c.symbolId, c.session_date
+        FROM candle_coverage c
+        LEFT JOIN candle_rollups r
+               ON r.symbolId = c.symbolId
+              AND r.timeframe = %s
+              AND r.start = TIMESTAMP(c.session_date, %s)
+        WHERE c.status = 'fetched' AND r.symbolId IS NULL
+    """
+    params = [max(ROLLUP_TIMEFRAMES), SESSION_OPEN.strftime("%H:%M:%S")]
+    if since:
+        query += " AND c.session_date >= %s"
+        params.append(since)
+    cursor.execute(query + " ORDER BY c.symbolId, c.session_date", params)
+    return cursor.fetchall()
+
+# -------------------------------------------------------------------
+# 3. Query API
+# -------------------------------------------------------------------
+def get_bars(symbol_id, start, end, timeframe):
+    """
+    Return `timeframe`‑minute bars for [start, end), read from the coarsest
+    materialized timeframe that divides it and re‑aggregated if needed.
+    """
+    source_tf = choose_timeframe(timeframe)
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            if source_tf == 1:
+                cur.execute(
+                    """
+                    SELECT start, end, open, high, low, close, volume, VWAP
+                    FROM candlestick_data
+                    WHERE symbolID = %s AND start >= %s AND start < %s
+                    ORDER BY start ASC
+                    """,
+                    (symbol_id, start, end),
+                )
+            else:
+                cur.execute(
+                    """
+                    SELECT start, end, open, high, low, close, volume, VWAP, bar_count
+                    FROM candle_rollups
+                    WHERE symbolId = %s AND timeframe = %s AND start >= %s AND start < %s
+                    ORDER BY start ASC
+                    """,
+                    (symbol_id, source_tf, start, end),
+                )
+            bars = cur.fetchall()
+    finally:
+        conn.close()
+
+    if source_tf == timeframe:
+        return bars
+    return aggregate_bars(bars, timeframe)
+
+# -------------------------------------------------------------------
+# 4. Backfill driver
+# -------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Materialize candle rollups for sessions that lack them.")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="only roll up sessions on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            sessions = pending_sessions(cur, args.since)
+            print(f"{len(sessions)} sessions to roll up")
+            for idx, row in enumerate(sessions, start=1):
+                rollup_session(cur, row["symbolId"], row["session_date"])
+                conn.commit()
+                if idx % 500 == 0:
+                    print(f"  {idx}/{len(sessions)}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
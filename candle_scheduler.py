@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+candle_scheduler.py
+Order and throttle AlphaCandle's per‑cycle ingestion so the liquid names get
+their fresh bars first.
+
+Each security gets a priority from
+  • liquidity  – average daily dollar volume (averageVol20Days/averageVol3Months
+                 × lastTradePrice), on a log scale
+  • activity   – averageVol20Days / averageVol3Months, i.e. is it busier than usual
+  • staleness  – trading sessions since its last ingested bar, on a log scale
+                 so a long‑dead backlog can't outrank a liquid name
+and the plan is cut off once the estimated API calls (one per session to
+fetch) exceed the cycle budget. Securities below the liquidity floor are
+skipped entirely; thin ones above it are only refreshed every few hours.
+
+`python AlphaCandle.py --plan` prints the next cycle's plan without fetching.
+"""
+
+import math
+import numpy as np
+from datetime import datetime, timedelta
+from pytz import timezone
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+CYCLE_API_BUDGET      = None   # max candle requests per cycle (None = unlimited)
+MIN_AVG_VOLUME        = 0      # skip securities whose average volume is below this
+THIN_DOLLAR_VOLUME    = 50000  # below this average $ volume a security is "thin"
+THIN_REFRESH_HOURS    = 6      # thin securities are refreshed at most this often
+STALENESS_WEIGHT      = 0.25   # priority boost per doubling of missed sessions
+MAX_STALE_SESSIONS    = 20     # cap on the staleness boost
+INITIAL_LOOKBACK_DAYS = 200    # matches AlphaCandle's first‑fetch window
+# ────────────────────────────────────────────────────────────────────
+
+def average_volume(security):
+    """Best available average daily share volume (0 if unknown)."""
+    return security.get('averageVol20Days') or security.get('averageVol3Months') or 0
+
+def dollar_volume(security):
+    price = float(security.get('lastTradePrice') or security.get('prevDayClosePrice') or 0)
+    return average_volume(security) * price
+
+def resume_date(security, today):
+    """
+    First session still to fetch: the day after the last ingested bar, or that
+    bar's own session again if it was only partly in (coverage 'partial').
+    """
+    last_bar = security.get('last_bar')
+    if not last_bar:
+        return today - timedelta(days=INITIAL_LOOKBACK_DAYS)
+    if security.get('last_bar_status') == 'partial':
+        return last_bar.date()
+    return last_bar.date() + timedelta(days=1)
+
+def sessions_behind(security, today, holidays):
+    """Trading sessions between the last ingested bar and today (inclusive)."""
+    first = resume_date(security, today)
+    if first > today:
+        return 0
+    return int(np.busday_count(first, today + timedelta(days=1), holidays=sorted(holidays)))
+
+def priority(security, stale):
+    """Higher is fetched sooner."""
+    vol20 = security.get('averageVol20Days') or 0
+    vol3m = security.get('averageVol3Months') or 0
+    activity = min(2.0, max(0.5, vol20 / vol3m)) if vol20 and vol3m else 1.0
+    liquidity = math.log10(1 + dollar_volume(security))
+    return liquidity * activity * (1 + STALENESS_WEIGHT * math.log2(1 + min(stale, MAX_STALE_SESSIONS)))
+
+def plan_cycle(securities, holidays, budget=CYCLE_API_BUDGET, min_avg_volume=MIN_AVG_VOLUME, now=None):
+    """
+    Return (planned, deferred) lists of securities. `planned` is in fetch order and
+    fits within the API budget; `deferred` are up to date, throttled, below the
+    liquidity floor or over budget this cycle. Each planned security gets
+    'priority' and 'sessions_behind' keys.
+    """
+    now = now or datetime.now()
+    today = datetime.now(timezone('US/Eastern')).date()
+    candidates, deferred = [], []
+
+    for security in securities:
+        if min_avg_volume and average_volume(security) < min_avg_volume:
+            deferred.append(security)
+            continue
+        last_attempt = security.get('last_attempt')
+        if (dollar_volume(security) < THIN_DOLLAR_VOLUME and last_attempt
+                and now - last_attempt < timedelta(hours=THIN_REFRESH_HOURS)):
+            deferred.append(security)
+            continue
+        stale = sessions_behind(security, today, holidays)
+        if stale == 0:
+            deferred.append(security)
+            continue
+        candidates.append(dict(security, priority=priority(security, stale), sessions_behind=stale))
+
+    candidates.sort(key=lambda s: s['priority'], reverse=True)
+    if budget is None:
+        return candidates, deferred
+
+    planned, spent = [], 0
+    for security in candidates:
+        if spent + security['sessions_behind'] > budget and planned:
+            deferred.append(security)
+            continue
+        planned.append(security)
+        spent += security['sessions_behind']
+    return planned, deferred
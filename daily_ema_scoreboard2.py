@@ -2,85 +2,102 @@
 """
 daily_ema_scoreboard.py
 Show the highest‑EMA tickers after basic liquidity & price filters.
-"""
-
-import pymysql
-from pymysql.cursors import DictCursor
-from questrade_api import QuestradeAPI
-from credentials import (
-    MYSQL_HOST,
-    MYSQL_USER,
-    MYSQL_PASSWORD,
-    MYSQL_DATABASE,
-)
 
-qt = QuestradeAPI(user_id=1)
+Reads the ema_leaderboard table that ema_engine materializes after every EMA
+update (already joined with price/volume and indexed by score), so a report
+is one index range scan and never touches the Questrade API.
 
-# ──────────────── connection helper ────────────────
-def connect_to_db():
-    return pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE,
-        cursorclass=DictCursor,
-    )
+  python daily_ema_scoreboard2.py --min-ema 25 --limit 50
+  python daily_ema_scoreboard2.py --format json > top.json
+  python daily_ema_scoreboard2.py --refresh        # re‑materialize first
+"""
 
-# ──────────────── parameters (prompt or defaults) ────────────────
-def ask(prompt, default, cast):
-    try:
-        val = input(f"{prompt} [default {default}]: ").strip()
-        return cast(val) if val else default
-    except Exception:
-        return default
+import argparse
+import csv
+import json
+import sys
+from db import connect_to_db
 
-MIN_EMA   = ask("Cut‑off EMA score",        20.0,  float)
-MIN_PRICE = ask("Minimum last trade price", 0.12,  float)
-MIN_VOL   = ask("Minimum 3‑mo avg vol",     5000,  int)
-LIMIT     = ask("How many rows to show",    20,    int)
+# ──────────────── defaults ────────────────
+MIN_EMA   = 20.0
+MIN_PRICE = 0.12
+MIN_VOL   = 5000
+LIMIT     = 20
 
 # ──────────────── query & display ────────────────
-def fetch_top_ema():
+def fetch_top_ema(min_ema=MIN_EMA, min_price=MIN_PRICE, min_vol=MIN_VOL, limit=LIMIT):
     q = """
-        SELECT es.symbolId            AS ID,
-               qs.symbol              AS Symbol,
-               qs.description         AS Name,
-               es.ema_score           AS EMA,
-               qs.lastTradePrice      AS Price,
-               qs.averageVol3Months   AS AvgVol
-        FROM   ema_scores es
-        JOIN   qt_securities qs USING (symbolId)
-        WHERE  es.ema_score      >= %s
-          AND  qs.lastTradePrice >= %s
-          AND  qs.averageVol3Months >= %s
-        ORDER  BY es.ema_score DESC
+        SELECT symbolId              AS ID,
+               symbol                AS Symbol,
+               description           AS Name,
+               ema_score             AS EMA,
+               lastTradePrice        AS Price,
+               averageVol3Months     AS AvgVol,
+               last_score_date       AS ScoreDate
+        FROM   ema_leaderboard
+        WHERE  ema_score         >= %s
+          AND  lastTradePrice    >= %s
+          AND  averageVol3Months >= %s
+        ORDER  BY ema_score DESC
         LIMIT  %s
     """
     conn = connect_to_db()
     try:
         with conn.cursor() as cur:
-            cur.execute(q, (MIN_EMA, MIN_PRICE, MIN_VOL, LIMIT))
-            return cur.fetchall()
+            cur.execute(q, (min_ema, min_price, min_vol, limit))
+            rows = cur.fetchall()
     finally:
         conn.close()
+    for r in rows:
+        r["Price"] = float(r["Price"]) if r["Price"] is not None else None
+        r["ScoreDate"] = r["ScoreDate"].isoformat() if r["ScoreDate"] else None
+    return rows
 
-def main():
-    rows = fetch_top_ema()
-    if not rows:
-        print("No securities met the criteria.")
-        return
-
+def print_table(rows, args):
     print(
-        f"\nTop EMA winners (≥{MIN_EMA}, price ≥{MIN_PRICE}, vol ≥{MIN_VOL})\n"
+        f"\nTop EMA winners (≥{args.min_ema}, price ≥{args.min_price}, vol ≥{args.min_vol})\n"
         f"{'ID':<10}{'Symbol':<8}{'Name':<38}{'EMA':>7}{'Price':>10}{'AvgVol':>12}"
     )
     print("-" * 85)
     for r in rows:
         print(
             f"{r['ID']:<10}{r['Symbol']:<8}"
-            f"{r['Name'][:37]:<38}"
+            f"{(r['Name'] or '')[:37]:<38}"
             f"{r['EMA']:>7.2f}{r['Price']:>10.2f}{r['AvgVol']:>12,d}"
         )
 
+def main():
+    parser = argparse.ArgumentParser(description="Highest‑EMA tickers after price & volume filters.")
+    parser.add_argument("--min-ema", type=float, default=MIN_EMA, help="cut‑off EMA score")
+    parser.add_argument("--min-price", type=float, default=MIN_PRICE, help="minimum last trade price")
+    parser.add_argument("--min-vol", type=int, default=MIN_VOL, help="minimum 3‑mo avg volume")
+    parser.add_argument("--limit", type=int, default=LIMIT, help="how many rows to show")
+    parser.add_argument("--format", choices=["table", "json", "csv"], default="table")
+    parser.add_argument("--refresh", action="store_true",
+                        help="re‑materialize ema_leaderboard before querying")
+    args = parser.parse_args()
+
+    if args.refresh:
+        from ema_engine import refresh_leaderboard
+        conn = connect_to_db()
+        try:
+            refresh_leaderboard(conn)
+        finally:
+            conn.close()
+
+    rows = fetch_top_ema(args.min_ema, args.min_price, args.min_vol, args.limit)
+
+    if args.format == "json":
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    elif args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=["ID", "Symbol", "Name", "EMA", "Price", "AvgVol", "ScoreDate"])
+        writer.writeheader()
+        writer.writerows(rows)
+    elif not rows:
+        print("No securities met the criteria.")
+    else:
+        print_table(rows, args)
+
 if __name__ == "__main__":
     main()
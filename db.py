@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+db.py
+Shared MySQL access for every script: one place for the connection settings,
+a connection pool, reconnect‑on‑failure, batched writes and streaming reads.
+
+  from db import connect_to_db
+  conn = connect_to_db()          # pooled – close() hands it back instead of closing
+  try:
+      ...
+  finally:
+      conn.close()
+
+connect_to_db() is a drop‑in for the per‑script helpers the scripts used to
+carry, so helpers that open a connection per call (dividend_calculator,
+highest_yeild, opening_rebound_score2, …) now reuse an idle one instead of
+paying for a TCP connect + login every time. A connection handed back with
+an open transaction is rolled back, exactly as closing it would have done.
+
+The pool is per process: a forked worker (parallel_rebound_score) starts
+with an empty pool instead of sharing its parent's sockets.
+
+  executemany_batched(cur, sql, rows)    – executemany in BATCH_SIZE chunks
+  stream(conn, sql, params)              – rows one at a time off an SSDictCursor
+  with_retry(fn)                         – rerun fn(conn) once on a lost connection (or deadlock)
+
+  python db.py --bench                   # queries/second: connect‑per‑query vs pooled vs one connection
+"""
+
+import argparse
+import os
+import threading
+import time
+from contextlib import contextmanager
+import pymysql
+from pymysql.cursors import DictCursor, SSDictCursor
+from credentials import (
+    MYSQL_HOST,
+    MYSQL_USER,
+    MYSQL_PASSWORD,
+    MYSQL_DATABASE,
+)
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+POOL_SIZE          = 8             # idle connections kept per process
+PING_AFTER         = 30            # seconds idle before a reused connection is pinged
+CONNECT_RETRIES    = 3
+RETRY_DELAY        = 0.5           # seconds, doubled per retry
+BATCH_SIZE         = 5000          # rows per executemany
+STREAM_FETCH       = 1000          # rows per fetchmany while streaming
+LOST_CONNECTION    = {2003, 2006, 2013, 2055}   # can't connect / gone away / lost / lost at
+DEADLOCK           = 1213          # InnoDB rolled the transaction back – safe to rerun
+# ────────────────────────────────────────────────────────────────────
+
+def connect(**overrides):
+    """A new, unpooled connection (DictCursor), retried on connect failures."""
+    settings = dict(
+        host=MYSQL_HOST,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        database=MYSQL_DATABASE,
+        cursorclass=DictCursor,
+    )
+    settings.update(overrides)
+    delay = RETRY_DELAY
+    for attempt in range(CONNECT_RETRIES):
+        try:
+            return pymysql.connect(**settings)
+        except pymysql.err.OperationalError as e:
+            if attempt == CONNECT_RETRIES - 1 or e.args[0] not in LOST_CONNECTION:
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+def is_lost_connection(error):
+    if isinstance(error, pymysql.err.InterfaceError):        # used after the socket closed
+        return True
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and error.args[0] in LOST_CONNECTION
+
+def is_deadlock(error):
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and error.args[0] == DEADLOCK
+
+# -------------------------------------------------------------------
+# 1. Pool
+# -------------------------------------------------------------------
+class PooledConnection:
+    """
+    Wraps a pymysql connection; everything is passed through except close(),
+    which returns the connection to its pool.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self.__dict__.get("_conn") is None:
+            raise pymysql.err.InterfaceError(0, "connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    @property
+    def open(self):
+        conn = self.__dict__.get("_conn")
+        return conn is not None and conn.open
+
+    def close(self):
+        if self.__dict__.get("_conn") is not None:
+            conn, self._conn = self._conn, None
+            self._pool.put(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Forgotten close() – give the connection back rather than leak it
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    def __init__(self, size=POOL_SIZE, **overrides):
+        self.size = size
+        self.overrides = overrides
+        self._idle = []            # (connection, returned_at)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # Inherited sockets belong to the parent: forget them, don't close them
+            self._idle, self._lock, self._pid = [], threading.Lock(), os.getpid()
+
+    def get(self):
+        self._check_fork()
+        while True:
+            with self._lock:
+                conn, returned_at = self._idle.pop() if self._idle else (None, None)
+            if conn is None:
+                return PooledConnection(self, connect(**self.overrides))
+            if time.monotonic() - returned_at < PING_AFTER:
+                return PooledConnection(self, conn)
+            try:
+                conn.ping(reconnect=True)
+                return PooledConnection(self, conn)
+            except pymysql.err.Error:
+                _close_quietly(conn)          # dead and can't reconnect – try the next one
+
+    def put(self, conn):
+        self._check_fork()
+        if not conn.open:
+            return
+        try:
+            conn.rollback()                   # same as close(): uncommitted work is dropped
+        except pymysql.err.Error:
+            _close_quietly(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        _close_quietly(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def connect_to_db():
+    """A pooled connection; close() returns it to the pool."""
+    return pool().get()
+
+@contextmanager
+def connection():
+    conn = connect_to_db()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def with_retry(fn, retries=1, deadlocks=False, conn=None):
+    """
+    fn(conn) on a pooled connection; if the connection is lost mid‑call it is
+    discarded and fn runs again on a fresh one. With `deadlocks` set, fn is
+    also rerun (after a short back‑off) when InnoDB picks it as a deadlock
+    victim. Pass `conn` to run on a connection the caller already holds (it
+    is rolled back before a rerun, and reconnected if lost, but not closed).
+    Only for idempotent work.
+    """
+    for attempt in range(retries + 1):
+        own = conn is None
+        current = connect_to_db() if own else conn
+        try:
+            return fn(current)
+        except pymysql.err.Error as e:
+            lost = is_lost_connection(e)
+            if attempt == retries or not (lost or (deadlocks and is_deadlock(e))):
+                raise
+            if lost:
+                if own:
+                    _close_quietly(current._conn)
+                else:
+                    conn.ping(reconnect=True)
+            else:
+                if not own:
+                    conn.rollback()
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+        finally:
+            if own:
+                current.close()
+
+# -------------------------------------------------------------------
+# 2. Batched writes & streaming reads
+# -------------------------------------------------------------------
+def executemany_batched(cur, sql, rows, batch_size=BATCH_SIZE):
+    """
+    executemany in chunks of batch_size, so one huge INSERT doesn't hit
+    max_allowed_packet. Returns the total rowcount. Does not commit.
+    """
+    total = 0
+    for i in range(0, len(rows), batch_size):
+        cur.executemany(sql, rows[i:i + batch_size])
+        total += max(cur.rowcount, 0)
+    return total
+
+def stream(conn, sql, params=None, fetch=STREAM_FETCH):
+    """
+    Yield rows (dicts) from an unbuffered SSDictCursor, fetch at a time, so
+    big result sets never sit in memory whole. Nothing else can run on `conn`
+    until the generator is exhausted or closed.
+    """
+    cur = conn.cursor(SSDictCursor)
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(fetch)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cur.close()
+
+# -------------------------------------------------------------------
+# 3. Benchmark
+# -------------------------------------------------------------------
+BENCH_QUERY = "SELECT frequency FROM div_freq WHERE symbol = %s"
+
+def bench(seconds=3.0, threads=1):
+    """Queries/second for the three ways scripts reach MySQL."""
+    def per_query_connect():
+        conn = connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(BENCH_QUERY, ("XEI",))
+                cur.fetchone()
+        finally:
+            conn.close()
+
+    def pooled():
+        conn = connect_to_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(BENCH_QUERY, ("XEI",))
+                cur.fetchone()
+        finally:
+            conn.close()
+
+    local = threading.local()
+
+    def one_connection():
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = connect()
+        with conn.cursor() as cur:
+            cur.execute(BENCH_QUERY, ("XEI",))
+            cur.fetchone()
+        conn.rollback()
+
+    def run(fn):
+        counts = [0] * threads
+        stop = time.perf_counter() + seconds
+
+        def loop(i):
+            while time.perf_counter() < stop:
+                fn()
+                counts[i] += 1
+
+        workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return sum(counts) / seconds
+
+    print(f"{BENCH_QUERY!r}, {threads} thread(s), {seconds:.0f}s each\n")
+    results = {}
+    for name, fn in (("connect per query (before)", per_query_connect),
+                     ("pooled connect_to_db (after)", pooled),
+                     ("one open connection (ceiling)", one_connection)):
+        results[name] = run(fn)
+        print(f"  {name:<32} {results[name]:>10,.0f} q/s")
+    before, after = results["connect per query (before)"], results["pooled connect_to_db (after)"]
+    print(f"\n  pooled is {after / before:.1f}× connect‑per‑query")
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared MySQL access layer.")
+    parser.add_argument("--bench", action="store_true", help="measure queries/second before/after pooling")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.seconds, args.threads)
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+dividend_activity.py
+Infer each symbol's payment frequency from the dividends in the local
+activities ledger (qt_activities, kept up to date by activities_sync) and
+fill in div_freq – so the TMX scrape in highest_yeild is only needed for
+symbols that were never held.
+
+Frequency comes from the median gap between distinct pay dates:
+  • ≤ 45 days → monthly    • ≤ 120 → quarterly
+  • ≤ 240     → semi‑annually   • otherwise annually
+with at least MIN_PAYMENTS payments and MIN_AGREEMENT of the gaps agreeing.
+
+Tables used / created:
+  • qt_activities         – type = 'Dividends' rows (see activities_sync.py)
+  • div_freq              – filled for symbols without a row (or all with --overwrite)
+
+On an existing database div_freq needs the wider frequency enum first:
+
+  ALTER TABLE div_freq
+    MODIFY frequency enum('monthly','quarterly','semi-annually','annually') NOT NULL;
+
+  python dividend_activity.py                 # activities_sync.sync_all, then infer and fill div_freq
+  python dividend_activity.py --no-sync       # infer from what's already in qt_activities
+  python dividend_activity.py --dry-run       # show what would be inferred
+"""
+
+import argparse
+import statistics
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+MIN_PAYMENTS       = 3
+MIN_AGREEMENT      = 0.6           # share of gaps that must fall in the median's class
+FREQUENCY_LIMITS   = [             # (max median gap in days, frequency)
+    (45, "monthly"),
+    (120, "quarterly"),
+    (240, "semi-annually"),
+    (400, "annually"),
+]
+# ────────────────────────────────────────────────────────────────────
+
+# -------------------------------------------------------------------
+# 1. Inference
+# -------------------------------------------------------------------
+def classify_gap(days):
+    for limit, frequency in FREQUENCY_LIMITS:
+        if days <= limit:
+            return frequency
+    return None
+
+def infer_frequency(pay_dates):
+    """Frequency from a symbol's pay dates, or None if the history is too thin or irregular."""
+    dates = sorted(set(pay_dates))
+    if len(dates) < MIN_PAYMENTS:
+        return None
+    gaps = [(b - a).days for a, b in zip(dates, dates[1:])]
+    frequency = classify_gap(statistics.median(gaps))
+    if frequency is None:
+        return None
+    agreeing = sum(1 for gap in gaps if classify_gap(gap) == frequency)
+    return frequency if agreeing / len(gaps) >= MIN_AGREEMENT else None
+
+def load_pay_dates(cur, symbols=None):
+    """{symbol: [transactionDate, ...]} across all accounts."""
+    query = """
+        SELECT symbol, DATE(transactionDate) AS pay_date
+        FROM qt_activities
+        WHERE type = 'Dividends' AND symbol <> ''
+    """
+    params = []
+    if symbols is not None:
+        if not symbols:
+            return {}
+        query += f" AND symbol IN ({', '.join(['%s'] * len(symbols))})"
+        params = list(symbols)
+    cur.execute(query, params)
+    pay_dates = {}
+    for row in cur.fetchall():
+        pay_dates.setdefault(row["symbol"], []).append(row["pay_date"])
+    return pay_dates
+
+def infer_all(cur):
+    """{symbol: frequency} for every symbol with a clear pattern."""
+    inferred = {}
+    for symbol, dates in load_pay_dates(cur).items():
+        frequency = infer_frequency(dates)
+        if frequency:
+            inferred[symbol] = frequency
+    return inferred
+
+def infer_frequency_for(cur, symbol):
+    """Inferred frequency of one symbol from stored activities (no API calls)."""
+    return infer_frequency(load_pay_dates(cur, [symbol]).get(symbol, []))
+
+def update_div_freq(conn, inferred, overwrite=False):
+    """Write inferred frequencies to div_freq; returns the number of rows written."""
+    if not inferred:
+        return 0
+    with conn.cursor() as cur:
+        if overwrite:
+            rows = list(inferred.items())
+        else:
+            cur.execute("SELECT symbol FROM div_freq")
+            known = {row["symbol"] for row in cur.fetchall()}
+            rows = [(symbol, frequency) for symbol, frequency in inferred.items() if symbol not in known]
+        cur.executemany(
+            """
+            INSERT INTO div_freq (symbol, frequency) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE frequency = VALUES(frequency)
+            """,
+            rows,
+        )
+    conn.commit()
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Infer dividend frequency from account activity history.")
+    parser.add_argument("--no-sync", action="store_true", help="only infer from the activities already in qt_activities")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace existing div_freq rows too (default: only fill missing ones)")
+    parser.add_argument("--dry-run", action="store_true", help="print the inferred frequencies without writing")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        if not args.no_sync:
+            from activities_sync import sync_all
+
+            print("Syncing account activities...")
+            sync_all(conn)
+
+        with conn.cursor() as cur:
+            inferred = infer_all(cur)
+        print(f"\nInferred a frequency for {len(inferred)} symbols")
+        if args.dry_run:
+            for symbol, frequency in sorted(inferred.items()):
+                print(f"  {symbol:<15} {frequency}")
+            return
+        written = update_div_freq(conn, inferred, args.overwrite)
+        print(f"Wrote {written} div_freq rows")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
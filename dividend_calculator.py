@@ -1,24 +1,19 @@
 from questrade_api import QuestradeAPI
-from credentials import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
-import pymysql
-from pymysql.cursors import DictCursor
+from db import connect_to_db
 import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-
-os.system('clear')
+from dividend_projection import load_holdings, cached_projection, print_projection
 
 # Global variable for Questrade API instance
 qt = None
 
-# Function to connect to MySQL database
-def connect_to_db():
-    return pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE,
-        cursorclass=DictCursor
-    )
+# Concurrent API calls for the household report
+HOUSEHOLD_WORKERS = 8
+# Refresh a token up front if it expires within this many seconds
+TOKEN_MARGIN_SECONDS = 120
 
 # Function to fetch and filter active accounts
 def get_active_accounts():
@@ -46,18 +41,18 @@ def get_chosen_account_index(accounts):
             print("Invalid choice.")
             return None
 
-# Function to get dividend frequency from the database
-def get_dividend_frequency(symbol):
+# Function to get the dividend frequencies of many symbols in one query
+def get_dividend_frequencies(symbols):
+    symbols = sorted(set(symbols))
+    if not symbols:
+        return {}
     connection = connect_to_db()
     try:
         with connection.cursor() as cursor:
-            sql = "SELECT frequency FROM div_freq WHERE symbol = %s"
-            cursor.execute(sql, (symbol,))
-            result = cursor.fetchone()
-            if result:
-                return result['frequency']
-            else:
-                return None
+            placeholders = ", ".join(["%s"] * len(symbols))
+            sql = f"SELECT symbol, frequency FROM div_freq WHERE symbol IN ({placeholders})"
+            cursor.execute(sql, symbols)
+            return {row['symbol']: row['frequency'] for row in cursor.fetchall()}
     finally:
         connection.close()
 
@@ -78,20 +73,25 @@ def calculate_expected_dividend(symbol, quantity, dividend, frequency):
         annual_dividend = dividend * 12
     elif frequency == 'quarterly':
         annual_dividend = dividend * 4
+    elif frequency == 'semi-annually':
+        annual_dividend = dividend * 2
+    elif frequency == 'annually':
+        annual_dividend = dividend
     else:
         annual_dividend = 0
     return annual_dividend * quantity
 
-# Function to display securities and calculate totals
-def display_securities_with_totals(account_number):
-    positions = qt.positions_acct(account_number)
+# Function to work out the expected dividends of an account's positions.
+# symbol_infos is {symbolId: symbol dict}, frequencies is {symbol: frequency};
+# with prompt=False symbols without a stored frequency are excluded instead of asked for
+def calculate_account_dividends(positions, symbol_infos, frequencies, prompt=True):
     securities = []
     six_months_ago = datetime.now() - timedelta(days=180)
     excluded_stocks = []
     total_market_value = 0
     total_annual_dividends = 0
 
-    for position in positions['positions']:
+    for position in positions:
         # Calculate total market value for all positions
         if position['currentMarketValue'] is not None and position['currentMarketValue'] > 0:
             total_market_value += position['currentMarketValue']
@@ -101,15 +101,15 @@ def display_securities_with_totals(account_number):
             if position['currentMarketValue'] is None or position['currentMarketValue'] == 0:
                 excluded_stocks.append(f"{position.get('symbol', 'Unknown')} was excluded because it had a zero or None balance.")
             continue
-        
-        symbol_info = qt.get_symbol_info(position['symbolId'])
-        if 'symbols' in symbol_info and len(symbol_info['symbols']) > 0:
-            symbol = symbol_info['symbols'][0]['symbol']
-            name = symbol_info['symbols'][0]['description']
+
+        info = symbol_infos.get(position['symbolId'])
+        if info:
+            symbol = info['symbol']
+            name = info['description']
             market_value = position['currentMarketValue']
             quantity = position['openQuantity']
-            dividend = symbol_info['symbols'][0].get('dividend', 0)
-            ex_date_str = symbol_info['symbols'][0].get('exDate')
+            dividend = info.get('dividend', 0)
+            ex_date_str = info.get('exDate')
 
             # Check if ex-date is older than 6 months
             ex_date_old = False
@@ -124,13 +124,17 @@ def display_securities_with_totals(account_number):
                     continue
 
             # Get dividend frequency from the database
-            frequency = get_dividend_frequency(symbol)
+            frequency = frequencies.get(symbol)
+            if frequency is None and not prompt:
+                excluded_stocks.append(f"{symbol} was excluded because it has no stored dividend frequency.")
+                continue
             if frequency is None:
                 # Prompt user for the dividend frequency
                 frequency_input = input(f"Frequency for {symbol} (enter 'm' for monthly or 'q' for quarterly): ").strip().lower()
                 if frequency_input in ['m', 'q']:
                     frequency = 'monthly' if frequency_input == 'm' else 'quarterly'
                     add_or_update_dividend_frequency(symbol, frequency)
+                    frequencies[symbol] = frequency
                 else:
                     print(f"Invalid input for {symbol}. Skipping...")
                     excluded_stocks.append(f"{symbol} was excluded due to invalid frequency input.")
@@ -160,12 +164,26 @@ def display_securities_with_totals(account_number):
     # Sort securities by yield percentage (highest to lowest)
     securities.sort(key=lambda x: x['yield_percent'], reverse=True)
 
+    return {
+        'securities': securities,
+        'total_market_value': total_market_value,
+        'total_annual_dividends': total_annual_dividends,
+        'excluded_stocks': excluded_stocks,
+    }
+
+# Function to print one account's securities and totals
+def print_account_report(title, report):
+    securities = report['securities']
+    total_market_value = report['total_market_value']
+    total_annual_dividends = report['total_annual_dividends']
+    excluded_stocks = report['excluded_stocks']
+
     # Calculate the length of the longest security name
     max_name_length = max(len(security['name']) for security in securities) if securities else 20
     max_name_length = max(max_name_length, len("Name of Security")) + 3
 
     # Display formatted securities
-    print(f"\nDividend-Bearing Securities in Account {account_number}:\n")
+    print(f"\n{title}:\n")
     print(f"{'Name of Security'.ljust(max_name_length)} {'Market Value':>15} {'Expected Dividend':>20} {'Yield (%)':>10}")
     print("-" * (max_name_length + 50))
     
@@ -195,10 +213,167 @@ def display_securities_with_totals(account_number):
         for excluded_stock in excluded_stocks:
             print(excluded_stock)
 
+# Function to show the month-by-month dividend projection for some positions
+def display_projection(positions, symbol_infos, title):
+    connection = connect_to_db()
+    try:
+        with connection.cursor() as cursor:
+            holdings = load_holdings(cursor, positions, symbol_infos)
+        print_projection(cached_projection(connection, holdings), title)
+    finally:
+        connection.close()
+
+# Function to display securities and calculate totals
+def display_securities_with_totals(account_number, projection=False):
+    positions = qt.positions_acct(account_number)['positions']
+
+    # One multi-id symbols call and one div_freq query for every held position
+    held_ids = [p['symbolId'] for p in positions if p['openQuantity'] != 0]
+    symbol_infos = {info['symbolId']: info for info in qt.get_symbols_info(held_ids)}
+    frequencies = get_dividend_frequencies(info['symbol'] for info in symbol_infos.values())
+
+    report = calculate_account_dividends(positions, symbol_infos, frequencies)
+    print_account_report(f"Dividend-Bearing Securities in Account {account_number}", report)
+
+    if projection:
+        display_projection(positions, symbol_infos, f"Projected Dividend Cash Flow - Account {account_number}")
+
+# ──────────────── household report (every user, every account) ────────────────
+# Function to list every configured user
+def get_users():
+    connection = connect_to_db()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id, display_name FROM qt_users ORDER BY is_default DESC, id")
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+# Function to make sure a user has a usable token before any worker thread needs it.
+# Runs on the main thread, so a missing or dead token prompts here, one user at a time
+def ensure_user_token(user):
+    client = QuestradeAPI(user_id=user['id'])
+    try:
+        if datetime.now() >= client.expires_at - timedelta(seconds=TOKEN_MARGIN_SECONDS):
+            client.refresh_access_token()
+    finally:
+        client.db.close()
+
+# Function to fetch one user's active accounts (worker thread - never prompts)
+def fetch_user_accounts(user):
+    client = QuestradeAPI(user_id=user['id'], interactive=False)
+    try:
+        accounts = client.accounts()['accounts']
+    finally:
+        client.db.close()
+    return [account for account in accounts if account['status'] == 'Active']
+
+# Function to fetch positions, balances and symbol info for one account.
+# Each task gets its own QuestradeAPI (its own DB connection and token state)
+def fetch_account_data(user, account):
+    client = QuestradeAPI(user_id=user['id'], interactive=False)
+    try:
+        positions = client.positions_acct(account['number'])['positions']
+        balances = client.balances_acct(account['number'])
+        held_ids = [p['symbolId'] for p in positions if p['openQuantity'] != 0]
+        symbol_infos = {info['symbolId']: info for info in client.get_symbols_info(held_ids)}
+    finally:
+        client.db.close()
+    cad = next((b for b in balances.get('combinedBalances', []) if b['currency'] == 'CAD'), {})
+    return {
+        'user': user,
+        'account': account,
+        'positions': positions,
+        'symbol_infos': symbol_infos,
+        'total_equity': cad.get('totalEquity') or 0,
+        'cash': cad.get('cash') or 0,
+    }
+
+# Function to gather every active account of every user concurrently
+def gather_household(max_workers=HOUSEHOLD_WORKERS):
+    users = get_users()
+    for user in users:
+        ensure_user_token(user)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        accounts_by_user = list(pool.map(fetch_user_accounts, users))
+        futures = [
+            pool.submit(fetch_account_data, user, account)
+            for user, accounts in zip(users, accounts_by_user)
+            for account in accounts
+        ]
+        return [future.result() for future in futures]
+
+# Function to print the consolidated household report
+def display_household_report(projection=False):
+    start = time.perf_counter()
+    accounts = gather_household()
+    symbols = {info['symbol'] for data in accounts for info in data['symbol_infos'].values()}
+    frequencies = get_dividend_frequencies(symbols)
+    fetch_seconds = time.perf_counter() - start
+
+    totals = {'market_value': 0, 'equity': 0, 'cash': 0, 'annual': 0}
+    by_user = {}
+    rows = []
+    for data in accounts:
+        report = calculate_account_dividends(data['positions'], data['symbol_infos'], frequencies, prompt=False)
+        title = f"{data['user']['display_name']} - {data['account']['type']} ({data['account']['number']})"
+        print_account_report(title, report)
+
+        row = {
+            'title': title,
+            'market_value': report['total_market_value'],
+            'equity': data['total_equity'],
+            'cash': data['cash'],
+            'annual': report['total_annual_dividends'],
+        }
+        rows.append(row)
+        user_totals = by_user.setdefault(data['user']['display_name'], dict.fromkeys(totals, 0))
+        for key in totals:
+            totals[key] += row[key]
+            user_totals[key] += row[key]
+
+    def line(label, values):
+        yield_pct = (values['annual'] / values['market_value'] * 100) if values['market_value'] > 0 else 0
+        print(f"{label[:38]:<40}{values['equity']:>15,.2f}{values['cash']:>13,.2f}{values['market_value']:>15,.2f}"
+              f"{values['annual'] / 12:>12,.2f}{yield_pct:>8.2f}%")
+
+    width = 104
+    print("\n" + "=" * width)
+    print(f"Household Dividend Summary ({len(accounts)} accounts, fetched in {fetch_seconds:.1f}s)")
+    print("=" * width)
+    print(f"{'Account':<40}{'Total Equity':>15}{'Cash':>13}{'Market Value':>15}{'Monthly Div':>12}{'Yield':>9}")
+    print("-" * width)
+    for row in rows:
+        line(row['title'], row)
+    print("-" * width)
+    for name, values in by_user.items():
+        line(f"{name} (all accounts)", values)
+    print("=" * width)
+    line("Household", totals)
+    print(f"\n{'Total Annual Dividends:':<40} ${totals['annual']:,.2f}")
+
+    if projection:
+        positions = [p for data in accounts for p in data['positions']]
+        symbol_infos = {k: v for data in accounts for k, v in data['symbol_infos'].items()}
+        display_projection(positions, symbol_infos, "Projected Household Dividend Cash Flow")
+
 # Main script logic
 def main():
     global qt
-    
+
+    parser = argparse.ArgumentParser(description="Expected dividends for your Questrade accounts.")
+    parser.add_argument("--household", action="store_true",
+                        help="report every active account of every user in qt_users, fetched concurrently")
+    parser.add_argument("--projection", action="store_true",
+                        help="also show when the dividends should arrive over the next 12 months")
+    args = parser.parse_args()
+
+    os.system('clear')
+
+    if args.household:
+        display_household_report(args.projection)
+        return
+
     # Initialize Questrade API - this will prompt for user selection
     qt = QuestradeAPI()
     
@@ -211,7 +386,7 @@ def main():
         print(f"\nYou chose: {chosen_account['type']} account with number {chosen_account['number']}")
         
         # Display securities with summary
-        display_securities_with_totals(chosen_account['number'])
+        display_securities_with_totals(chosen_account['number'], args.projection)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+dividend_projection.py
+Forward dividend cash‑flow projection: when each holding should pay over
+the next PROJECTION_MONTHS and how much, month by month.
+
+Each holding's payment schedule is anchored on its last known pay date
+(dividendDate, or exDate + PAY_LAG_DAYS when Questrade has no pay date)
+and stepped forward by its frequency (div_freq). All holdings are projected
+at once as a (holdings × payments) NumPy date matrix; amounts are the
+per‑payment dividend × quantity.
+
+Results are cached in dividend_projections under a fingerprint of the
+holdings (quantity, dividend, ex/pay dates, frequency) and the as‑of date,
+so the projection is only recomputed when positions or dividend data change.
+
+Tables used / created:
+  • qt_securities         – dividend, exDate, dividendDate
+  • div_freq              – payment frequency per symbol
+  • dividend_projections  – (fingerprint, as_of, computed_at, payload JSON)
+"""
+
+import hashlib
+import json
+import numpy as np
+from datetime import date, datetime
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+PROJECTION_MONTHS  = 12
+PAY_LAG_DAYS       = 15            # typical ex‑date → pay‑date gap when dividendDate is missing
+STALE_EX_DAYS      = 180           # same 6‑month cut‑off dividend_calculator uses
+PERIOD_MONTHS      = {
+    "monthly": 1,
+    "quarterly": 3,
+    "semi-annually": 6,
+    "annually": 12,
+}
+# ────────────────────────────────────────────────────────────────────
+
+def _to_date(value):
+    """date from a datetime, a date or a Questrade ISO string ('2025-03-14T00:00:00.000000-04:00')."""
+    if value in (None, "", "NULL"):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).split("T")[0], "%Y-%m-%d").date()
+
+# -------------------------------------------------------------------
+# 1. Holdings
+# -------------------------------------------------------------------
+def load_holdings(cur, positions, symbol_infos=None):
+    """
+    Build projection inputs for `positions` (Questrade position dicts).
+    Dividend data comes from `symbol_infos` ({symbolId: symbol dict}, e.g. from
+    get_symbols_info) when given, otherwise from qt_securities; frequencies
+    from div_freq. Both are single IN (...) queries.
+    """
+    held = [p for p in positions if p.get("openQuantity")]
+    ids = sorted({p["symbolId"] for p in held})
+    if not ids:
+        return []
+
+    if symbol_infos is None:
+        cur.execute(
+            f"""
+            SELECT symbolId, symbol, description, dividend, exDate, dividendDate
+            FROM qt_securities
+            WHERE symbolId IN ({', '.join(['%s'] * len(ids))})
+            """,
+            ids,
+        )
+        symbol_infos = {row["symbolId"]: row for row in cur.fetchall()}
+
+    symbols = sorted({info["symbol"] for info in symbol_infos.values() if info.get("symbol")})
+    frequencies = {}
+    if symbols:
+        cur.execute(
+            f"SELECT symbol, frequency FROM div_freq WHERE symbol IN ({', '.join(['%s'] * len(symbols))})",
+            symbols,
+        )
+        frequencies = {row["symbol"]: row["frequency"] for row in cur.fetchall()}
+
+    holdings = []
+    for position in held:
+        info = symbol_infos.get(position["symbolId"])
+        if not info:
+            continue
+        holdings.append({
+            "symbolId": position["symbolId"],
+            "symbol": info["symbol"],
+            "name": info.get("description") or info["symbol"],
+            "quantity": float(position["openQuantity"]),
+            "dividend": float(info.get("dividend") or 0),
+            "exDate": _to_date(info.get("exDate")),
+            "dividendDate": _to_date(info.get("dividendDate")),
+            "frequency": frequencies.get(info["symbol"]),
+        })
+    return holdings
+
+def fingerprint(holdings, as_of):
+    key = sorted(
+        (h["symbolId"], h["quantity"], h["dividend"], str(h["exDate"]), str(h["dividendDate"]), h["frequency"])
+        for h in holdings
+    )
+    return hashlib.sha1(repr((str(as_of), key)).encode()).hexdigest()
+
+# -------------------------------------------------------------------
+# 2. Projection
+# -------------------------------------------------------------------
+def project(holdings, as_of=None, months=PROJECTION_MONTHS):
+    """
+    Project payments from as_of to the end of the (months‑1)th following month,
+    one column per calendar month. Returns a dict:
+      'months'    – ['YYYY-MM', ...]
+      'holdings'  – [{symbol, name, monthly: [amount per month], total}, ...]
+      'totals'    – amount per month across holdings
+      'payments'  – [{date, symbol, amount}, ...] sorted by date
+      'skipped'   – [(symbol, reason), ...]
+    """
+    as_of = as_of or date.today()
+    start = np.datetime64(as_of, "D")
+    first_month = start.astype("datetime64[M]")
+    end = (first_month + months).astype("datetime64[D]")     # rest of this month + months‑1 full months
+
+    usable, skipped = [], []
+    for h in holdings:
+        anchor = h["dividendDate"] or (h["exDate"] and np.datetime64(h["exDate"], "D") + PAY_LAG_DAYS)
+        if h["dividend"] <= 0:
+            skipped.append((h["symbol"], "no dividend"))
+        elif h["frequency"] not in PERIOD_MONTHS:
+            skipped.append((h["symbol"], "no stored frequency"))
+        elif anchor is None:
+            skipped.append((h["symbol"], "no ex or pay date"))
+        elif h["exDate"] and (as_of - h["exDate"]).days > STALE_EX_DAYS:
+            skipped.append((h["symbol"], "exDate older than 6 months"))
+        else:
+            usable.append((h, np.datetime64(anchor, "D")))
+
+    month_labels = [str(first_month + i) for i in range(months)]
+    result = {"months": month_labels, "holdings": [], "totals": [0.0] * months,
+              "payments": [], "skipped": skipped}
+    if not usable:
+        return result
+
+    anchor = np.array([a for _, a in usable], dtype="datetime64[D]")
+    period = np.array([PERIOD_MONTHS[h["frequency"]] for h, _ in usable])
+    amount = np.array([h["dividend"] * h["quantity"] for h, _ in usable])
+
+    # Step each schedule from the last anchor month at or before the window start
+    anchor_month = anchor.astype("datetime64[M]")
+    anchor_day = (anchor - anchor_month.astype("datetime64[D]")).astype(np.int64)
+    behind = (first_month - anchor_month).astype(np.int64)
+    first_step = np.maximum(behind // period, 0)
+    steps = first_step[:, None] + np.arange(months + 2)[None, :]
+    pay_month = anchor_month[:, None] + steps * period[:, None]
+
+    # Same day of month as the anchor, clamped to the month's length
+    month_len = ((pay_month + 1).astype("datetime64[D]") - pay_month.astype("datetime64[D]")).astype(np.int64)
+    pay_date = pay_month.astype("datetime64[D]") + np.minimum(anchor_day[:, None], month_len - 1)
+    in_window = (pay_date >= start) & (pay_date < end)
+
+    month_idx = (pay_date.astype("datetime64[M]") - first_month).astype(np.int64)
+    grid = np.zeros((len(usable), months))
+    rows, cols = np.nonzero(in_window)
+    np.add.at(grid, (rows, month_idx[rows, cols]), amount[rows])
+
+    for i, (h, _) in enumerate(usable):
+        result["holdings"].append({
+            "symbol": h["symbol"],
+            "name": h["name"],
+            "frequency": h["frequency"],
+            "monthly": [round(float(x), 2) for x in grid[i]],
+            "total": round(float(grid[i].sum()), 2),
+        })
+    result["totals"] = [round(float(x), 2) for x in grid.sum(axis=0)]
+    result["payments"] = sorted(
+        ({"date": str(pay_date[r, c]), "symbol": usable[r][0]["symbol"], "amount": round(float(amount[r]), 2)}
+         for r, c in zip(rows, cols)),
+        key=lambda p: (p["date"], p["symbol"]),
+    )
+    return result
+
+# -------------------------------------------------------------------
+# 3. Cache
+# -------------------------------------------------------------------
+def cached_projection(conn, holdings, as_of=None):
+    """project() with results kept in dividend_projections by fingerprint. Commits on a miss."""
+    as_of = as_of or date.today()
+    key = fingerprint(holdings, as_of)
+    with conn.cursor() as cur:
+        cur.execute("SELECT payload FROM dividend_projections WHERE fingerprint = %s", (key,))
+        row = cur.fetchone()
+        if row:
+            return json.loads(row["payload"])
+
+        result = project(holdings, as_of)
+        cur.execute(
+            """
+            INSERT INTO dividend_projections (fingerprint, as_of, computed_at, payload)
+            VALUES (%s, %s, NOW(), %s)
+            ON DUPLICATE KEY UPDATE payload = VALUES(payload), computed_at = NOW()
+            """,
+            (key, as_of, json.dumps(result)),
+        )
+        cur.execute("DELETE FROM dividend_projections WHERE as_of < %s", (as_of,))
+    conn.commit()
+    return result
+
+# -------------------------------------------------------------------
+# 4. Display
+# -------------------------------------------------------------------
+def print_projection(result, title="Projected Dividend Cash Flow"):
+    months = [m[2:] for m in result["months"]]            # 'YY-MM'
+    width = 16 + 9 * len(months) + 11
+    print(f"\n{title}\n" + "=" * width)
+    print(f"{'Symbol':<16}" + "".join(f"{m:>9}" for m in months) + f"{'Total':>11}")
+    print("-" * width)
+    for h in sorted(result["holdings"], key=lambda h: -h["total"]):
+        print(f"{h['symbol'][:15]:<16}" + "".join(f"{x:>9,.2f}" if x else f"{'-':>9}" for x in h["monthly"])
+              + f"{h['total']:>11,.2f}")
+    print("=" * width)
+    print(f"{'Total':<16}" + "".join(f"{x:>9,.2f}" for x in result["totals"]) + f"{sum(result['totals']):>11,.2f}")
+
+    if result["skipped"]:
+        print("\n--- Not Projected ---")
+        for symbol, reason in result["skipped"]:
+            print(f"{symbol}: {reason}")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+ema_engine.py
+Stateful EMA of the daily opening‑rebound score.
+
+The running EMA per symbol lives in ema_scores (ema_score + last_score_date)
+and the EMA as of each day is written to pattern_scores.ema_opening_rebound_score.
+New daily scores are folded in with one constant‑time step each
+(ema += α·(score − ema), α = 2 / (EMA_PERIOD_DAYS + 1)); symbols with no
+state, or receiving a score older than their state, are rebuilt from their
+full history in one pass vectorized across symbols.
+
+This is not the value the old calculate_ema() stored. That re‑seeded on
+every run from only the last EMA_PERIOD_DAYS scores (the oldest of them as
+the seed) and rounded to 2 decimals; this is a running EMA seeded at a
+symbol's first score and kept at full precision. ema_score shifts a little
+for most symbols, and with it what clears daily_ema_scoreboard2's MIN_EMA
+cut‑off and how ema_leaderboard ranks. When upgrading from the old scorer,
+run `python ema_engine.py --rebuild` once so every symbol's history and
+state are on the new definition.
+
+Tables used / created:
+  • pattern_scores     – (symbolId, date, opening_rebound_score, ema_opening_rebound_score)
+  • ema_scores         – (symbolId, ema_score, last_score_date, last_updated)
+  • ema_leaderboard    – ema_scores pre‑joined with qt_securities, refreshed
+                         for the touched symbols after every update
+
+Run with --rebuild to recompute every symbol's EMA history from scratch, or
+--refresh-leaderboard to re‑materialize the leaderboard (e.g. after
+AlphaEnrich has updated prices and volumes).
+"""
+
+import argparse
+import numpy as np
+from db import connect_to_db, executemany_batched
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+EMA_PERIOD_DAYS    = 30
+ALPHA              = 2 / (EMA_PERIOD_DAYS + 1)
+WRITE_CHUNK        = 5000
+# ────────────────────────────────────────────────────────────────────
+
+# -------------------------------------------------------------------
+# 1. EMA maths
+# -------------------------------------------------------------------
+def ema_step(prev_ema, score, alpha=ALPHA):
+    """One O(1) update; the first score seeds the EMA."""
+    if prev_ema is None:
+        return score
+    return prev_ema + alpha * (score - prev_ema)
+
+def ema_matrix(scores, alpha=ALPHA):
+    """
+    EMA of a (n_symbols, n_days) score matrix, NaN where a symbol has no score
+    that day. One pass over the days, vectorized across symbols; a symbol's EMA
+    is carried unchanged over its missing days. Returns a matrix of the same
+    shape with NaN where there is no score.
+    """
+    out = np.full(scores.shape, np.nan)
+    ema = np.full(scores.shape[0], np.nan)
+    for j in range(scores.shape[1]):
+        x = scores[:, j]
+        has = ~np.isnan(x)
+        ema = np.where(has, np.where(np.isnan(ema), x, ema + alpha * (x - ema)), ema)
+        out[has, j] = ema[has]
+    return out
+
+# -------------------------------------------------------------------
+# 2. Persistence helpers
+# -------------------------------------------------------------------
+def _store_daily(conn, rows):
+    """rows: (symbolId, date, score, ema)."""
+    with conn.cursor() as cur:
+        executemany_batched(
+            cur,
+            """
+            INSERT INTO pattern_scores (symbolId, date, opening_rebound_score, ema_opening_rebound_score)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE ema_opening_rebound_score = VALUES(ema_opening_rebound_score)
+            """,
+            rows,
+            WRITE_CHUNK,
+        )
+
+def _store_state(conn, states):
+    """states: (symbolId, ema, last_score_date)."""
+    with conn.cursor() as cur:
+        executemany_batched(
+            cur,
+            """
+            INSERT INTO ema_scores (symbolId, ema_score, last_score_date, last_updated)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                ema_score = VALUES(ema_score),
+                last_score_date = VALUES(last_score_date),
+                last_updated = NOW()
+            """,
+            states,
+            WRITE_CHUNK,
+        )
+
+def _in_clause(ids):
+    return ", ".join(["%s"] * len(ids))
+
+def load_state(conn, symbol_ids):
+    """{symbolId: (ema, last_score_date)} for symbols that have state."""
+    ids = sorted(symbol_ids)
+    if not ids:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT symbolId, ema_score, last_score_date
+            FROM ema_scores
+            WHERE last_score_date IS NOT NULL AND symbolId IN ({_in_clause(ids)})
+            """,
+            ids,
+        )
+        return {row["symbolId"]: (row["ema_score"], row["last_score_date"]) for row in cur.fetchall()}
+
+def refresh_leaderboard(conn, symbol_ids=None):
+    """
+    Copy the latest EMA plus symbol, price and volume into ema_leaderboard for
+    `symbol_ids` (every symbol if None). Commits.
+    """
+    query = """
+        INSERT INTO ema_leaderboard (
+            symbolId, symbol, description, ema_score, last_score_date,
+            lastTradePrice, averageVol3Months, refreshed_at
+        )
+        SELECT es.symbolId, qs.symbol, qs.description, es.ema_score, es.last_score_date,
+               qs.lastTradePrice, qs.averageVol3Months, NOW()
+        FROM   ema_scores es
+        JOIN   qt_securities qs USING (symbolId)
+    """
+    params = []
+    if symbol_ids is not None:
+        ids = sorted(symbol_ids)
+        if not ids:
+            return
+        query += f" WHERE es.symbolId IN ({_in_clause(ids)})"
+        params = ids
+    query += """
+        ON DUPLICATE KEY UPDATE
+            symbol = VALUES(symbol),
+            description = VALUES(description),
+            ema_score = VALUES(ema_score),
+            last_score_date = VALUES(last_score_date),
+            lastTradePrice = VALUES(lastTradePrice),
+            averageVol3Months = VALUES(averageVol3Months),
+            refreshed_at = VALUES(refreshed_at)
+    """
+    with conn.cursor() as cur:
+        if symbol_ids is None:
+            cur.execute("DELETE FROM ema_leaderboard")
+        cur.execute(query, params)
+    conn.commit()
+
+# -------------------------------------------------------------------
+# 3. Update & rebuild
+# -------------------------------------------------------------------
+def apply_new_scores(conn, rows):
+    """
+    Fold newly landed (symbolId, date, score) rows into the EMA state in O(1)
+    per row, writing the per‑day EMA and the new state. Symbols without state
+    or with out‑of‑order dates are rebuilt instead, and every touched symbol's
+    ema_leaderboard row is refreshed. Commits.
+    Returns {symbolId: ema} for every symbol touched.
+    """
+    by_symbol = {}
+    for symbol_id, day, score in sorted(rows, key=lambda r: (r[0], r[1])):
+        by_symbol.setdefault(symbol_id, []).append((day, score))
+
+    state = load_state(conn, by_symbol)
+    rebuild, daily, states, latest = [], [], [], {}
+    for symbol_id, days in by_symbol.items():
+        ema, last_date = state.get(symbol_id, (None, None))
+        if last_date is None or days[0][0] <= last_date:
+            rebuild.append(symbol_id)
+            continue
+        for day, score in days:
+            ema = ema_step(ema, score)
+            daily.append((symbol_id, day, score, ema))
+        states.append((symbol_id, ema, days[-1][0]))
+        latest[symbol_id] = ema
+
+    _store_daily(conn, daily)
+    _store_state(conn, states)
+    conn.commit()
+    latest.update(rebuild_history(conn, rebuild))
+    refresh_leaderboard(conn, latest)
+    return latest
+
+def rebuild_history(conn, symbol_ids=None):
+    """
+    Recompute the full EMA history for `symbol_ids` (all symbols if None) in one
+    vectorized pass and store it. Commits. Returns {symbolId: latest ema}.
+    """
+    query = "SELECT symbolId, date, opening_rebound_score FROM pattern_scores"
+    params = []
+    if symbol_ids is not None:
+        ids = sorted(symbol_ids)
+        if not ids:
+            return {}
+        query += f" WHERE symbolId IN ({_in_clause(ids)})"
+        params = ids
+    with conn.cursor() as cur:
+        cur.execute(query + " ORDER BY symbolId, date", params)
+        rows = cur.fetchall()
+    if not rows:
+        return {}
+
+    symbols = sorted({r["symbolId"] for r in rows})
+    dates = sorted({r["date"] for r in rows})
+    s_index = {s: i for i, s in enumerate(symbols)}
+    d_index = {d: j for j, d in enumerate(dates)}
+    scores = np.full((len(symbols), len(dates)), np.nan)
+    for r in rows:
+        scores[s_index[r["symbolId"]], d_index[r["date"]]] = r["opening_rebound_score"]
+
+    emas = ema_matrix(scores)
+
+    daily, states = [], {}
+    for r in rows:
+        ema = float(emas[s_index[r["symbolId"]], d_index[r["date"]]])
+        daily.append((r["symbolId"], r["date"], r["opening_rebound_score"], ema))
+        states[r["symbolId"]] = (r["symbolId"], ema, r["date"])   # rows are ordered, so the last wins
+
+    _store_daily(conn, daily)
+    _store_state(conn, list(states.values()))
+    conn.commit()
+    return {symbol_id: ema for symbol_id, ema, _ in states.values()}
+
+# -------------------------------------------------------------------
+# 4. Charting API
+# -------------------------------------------------------------------
+def get_ema_series(symbol_id, start_date=None, end_date=None):
+    """
+    Daily score and EMA for one symbol, oldest first, as NumPy arrays:
+    {'date': datetime64[D], 'score': float64, 'ema': float64}.
+    """
+    query = """
+        SELECT date, opening_rebound_score, ema_opening_rebound_score
+        FROM pattern_scores
+        WHERE symbolId = %s
+    """
+    params = [symbol_id]
+    if start_date:
+        query += " AND date >= %s"
+        params.append(start_date)
+    if end_date:
+        query += " AND date <= %s"
+        params.append(end_date)
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query + " ORDER BY date", params)
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    return {
+        "date": np.array([r["date"] for r in rows], dtype="datetime64[D]"),
+        "score": np.array([r["opening_rebound_score"] for r in rows], dtype=np.float64),
+        "ema": np.array([np.nan if r["ema_opening_rebound_score"] is None else r["ema_opening_rebound_score"]
+                         for r in rows], dtype=np.float64),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the opening‑rebound score EMA.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every symbol's EMA history")
+    parser.add_argument("--refresh-leaderboard", action="store_true",
+                        help="re‑materialize ema_leaderboard from ema_scores and qt_securities")
+    args = parser.parse_args()
+
+    if not (args.rebuild or args.refresh_leaderboard):
+        parser.print_help()
+        return
+
+    conn = connect_to_db()
+    try:
+        if args.rebuild:
+            latest = rebuild_history(conn)
+            print(f"Rebuilt EMA‑{EMA_PERIOD_DAYS} history for {len(latest)} symbols")
+        refresh_leaderboard(conn)
+        print("Refreshed ema_leaderboard")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
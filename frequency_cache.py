@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+frequency_cache.py
+Dividend/distribution frequency lookups for highest_yeild without a query
+(or a web request) per symbol.
+
+  • div_freq is loaded once, in bulk, into a FrequencyCache.
+  • Entries older than TTL_DAYS are still served, but get re‑resolved by
+    resolve(..., refresh_stale=True) – the prefetch does that.
+  • Symbols nothing could resolve go into div_freq_failures with a
+    retry_after that backs off (RETRY_AFTER_HOURS, doubling per attempt, up
+    to MAX_RETRY_DAYS), so they aren't looked up again on every run. Only
+    lookups that had the browser to fall back on count – an HTTP‑only miss
+    may just be a page TMX renders client‑side.
+  • Resolution order: account history (dividend_activity) → TMX over HTTP
+    (tmx_http) → TMX in a browser (tmx_scraper), when one is passed in.
+
+prefetch() resolves the top‑yield candidates from qt_securities ahead of
+time, so the interactive picker finds them already cached. Run it from cron,
+or let highest_yeild start it in the background when its menu opens.
+
+Tables used / created:
+  • div_freq              – (symbol, frequency, last_updated)
+  • div_freq_failures     – (symbol, attempts, last_error, last_attempt, retry_after)
+  • qt_securities         – prefetch candidates
+  • qt_activities         – dividend history, for inference
+
+  python frequency_cache.py                   # prefetch the top PREFETCH_LIMIT candidates
+  python frequency_cache.py --browser         # … falling back to Chromium
+  python frequency_cache.py --loop 60         # … every 60 minutes
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+TTL_DAYS           = 90            # re‑check a stored frequency after this long
+RETRY_AFTER_HOURS  = 24            # first back‑off after a failed lookup
+MAX_RETRY_DAYS     = 30
+PREFETCH_LIMIT     = 100           # same candidate list highest_yeild uses
+STALE_EX_DAYS      = 180
+# ────────────────────────────────────────────────────────────────────
+
+def retry_delay(attempts):
+    return min(timedelta(hours=RETRY_AFTER_HOURS * 2 ** (attempts - 1)), timedelta(days=MAX_RETRY_DAYS))
+
+# -------------------------------------------------------------------
+# 1. Cache
+# -------------------------------------------------------------------
+class FrequencyCache:
+    """In‑memory view of div_freq + div_freq_failures, written through to MySQL."""
+
+    def __init__(self, conn, ttl_days=TTL_DAYS):
+        self.conn = conn
+        self.ttl = timedelta(days=ttl_days)
+        self.frequencies = {}      # symbol -> frequency
+        self.updated = {}          # symbol -> last_updated
+        self.failures = {}         # symbol -> (attempts, retry_after)
+        self.load()
+
+    def load(self, symbols=None):
+        """(Re)load everything, or just `symbols`, from the database."""
+        where, params = "", []
+        if symbols is not None:
+            if not symbols:
+                return
+            where = f" WHERE symbol IN ({', '.join(['%s'] * len(symbols))})"
+            params = list(symbols)
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT symbol, frequency, last_updated FROM div_freq" + where, params)
+            for row in cur.fetchall():
+                self.frequencies[row["symbol"]] = row["frequency"]
+                self.updated[row["symbol"]] = row["last_updated"]
+            cur.execute("SELECT symbol, attempts, retry_after FROM div_freq_failures" + where, params)
+            for row in cur.fetchall():
+                self.failures[row["symbol"]] = (row["attempts"], row["retry_after"])
+        self.conn.commit()         # end the read snapshot so later loads see other writers
+
+    def get(self, symbol):
+        return self.frequencies.get(symbol)
+
+    def is_stale(self, symbol, now=None):
+        updated = self.updated.get(symbol)
+        return updated is None or (now or datetime.now()) - updated > self.ttl
+
+    def retry_due(self, symbol, now=None):
+        failure = self.failures.get(symbol)
+        return failure is None or (now or datetime.now()) >= failure[1]
+
+    def needs_lookup(self, symbol, refresh_stale=False, now=None):
+        if not self.retry_due(symbol, now):
+            return False
+        if symbol not in self.frequencies:
+            return True
+        return refresh_stale and self.is_stale(symbol, now)
+
+    def put(self, symbol, frequency):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO div_freq (symbol, frequency) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE frequency = VALUES(frequency), last_updated = CURRENT_TIMESTAMP
+                """,
+                (symbol, frequency),
+            )
+            cur.execute("DELETE FROM div_freq_failures WHERE symbol = %s", (symbol,))
+        self.conn.commit()
+        self.frequencies[symbol] = frequency
+        self.updated[symbol] = datetime.now()
+        self.failures.pop(symbol, None)
+
+    def fail(self, symbol, reason="not found"):
+        now = datetime.now()
+        attempts = self.failures.get(symbol, (0, None))[0] + 1
+        retry_after = now + retry_delay(attempts)
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO div_freq_failures (symbol, attempts, last_error, last_attempt, retry_after)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE attempts = VALUES(attempts), last_error = VALUES(last_error),
+                    last_attempt = VALUES(last_attempt), retry_after = VALUES(retry_after)
+                """,
+                (symbol, attempts, reason[:255], now, retry_after),
+            )
+        self.conn.commit()
+        self.failures[symbol] = (attempts, retry_after)
+
+    def resolve(self, symbols, resolver, refresh_stale=False, record_failures=True):
+        """
+        Make sure every symbol that needs it has been looked up: pick up rows
+        other processes wrote since load(), then hand the rest to
+        resolver(symbols) -> {symbol: frequency or None} in one call.
+        Misses only go into div_freq_failures with `record_failures` – pass
+        False for a resolver without the browser fallback, so a later
+        browser‑capable lookup isn't held off by its back‑off.
+        Returns {symbol: frequency or None} for all `symbols`.
+        """
+        pending = [s for s in dict.fromkeys(symbols) if self.needs_lookup(s, refresh_stale)]
+        if pending:
+            self.load(pending)
+            pending = [s for s in pending if self.needs_lookup(s, refresh_stale)]
+        if pending:
+            found = resolver(pending)
+            for symbol in pending:
+                if found.get(symbol):
+                    self.put(symbol, found[symbol])
+                elif record_failures:
+                    self.fail(symbol)
+        return {symbol: self.get(symbol) for symbol in symbols}
+
+# -------------------------------------------------------------------
+# 2. Resolvers
+# -------------------------------------------------------------------
+def make_resolver(conn, session=None, scraper=None, web=True, verbose=True):
+    """
+    resolver(symbols) for FrequencyCache.resolve: account history first, then
+    TMX over HTTP (with `scraper.fetch` as the browser fallback, if given).
+    """
+    from dividend_activity import infer_frequency, load_pay_dates
+
+    def resolve(symbols):
+        with conn.cursor() as cur:
+            pay_dates = load_pay_dates(cur, symbols)
+        conn.commit()
+        found = {}
+        for symbol in symbols:
+            frequency = infer_frequency(pay_dates.get(symbol, []))
+            if frequency:
+                if verbose:
+                    print(f"Inferred {frequency} distributions for {symbol} from account history.")
+                found[symbol] = frequency
+        rest = [symbol for symbol in symbols if symbol not in found]
+        if rest and web:
+            from tmx_http import resolve_frequencies
+
+            if verbose:
+                print(f"Fetching distribution frequency for {', '.join(rest)}...")
+            found.update(resolve_frequencies(rest, session, fallback=scraper.fetch if scraper else None))
+        return found
+
+    return resolve
+
+# -------------------------------------------------------------------
+# 3. Prefetch
+# -------------------------------------------------------------------
+def top_yield_symbols(cur, limit=PREFETCH_LIMIT):
+    cur.execute(
+        """
+        SELECT symbol FROM qt_securities
+        WHERE yield IS NOT NULL AND yield > 0 AND exDate IS NOT NULL AND exDate > %s
+        ORDER BY yield DESC
+        LIMIT %s
+        """,
+        (datetime.now() - timedelta(days=STALE_EX_DAYS), limit),
+    )
+    return [row["symbol"] for row in cur.fetchall()]
+
+def prefetch(conn, limit=PREFETCH_LIMIT, browser=False, verbose=True):
+    """Resolve missing and stale frequencies for the top‑yield candidates."""
+    from tmx_http import make_session
+
+    with conn.cursor() as cur:
+        symbols = top_yield_symbols(cur, limit)
+    cache = FrequencyCache(conn)
+    pending = [s for s in symbols if cache.needs_lookup(s, refresh_stale=True)]
+    if not pending:
+        return 0
+
+    scraper = None
+    if browser:
+        from tmx_scraper import TmxScraper
+        scraper = TmxScraper()
+    try:
+        with make_session() as session:
+            cache.resolve(pending, make_resolver(conn, session, scraper, verbose=verbose),
+                          refresh_stale=True, record_failures=scraper is not None)
+    finally:
+        if scraper:
+            scraper.close()
+    return len(pending)
+
+def start_background_prefetch(limit=PREFETCH_LIMIT):
+    """One prefetch pass on a daemon thread with its own connection (HTTP only, no browser)."""
+    def run():
+        conn = connect_to_db()
+        try:
+            prefetch(conn, limit, verbose=False)
+        except Exception as e:
+            print(f"[Background prefetch] {e}")
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=run, name="frequency-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-resolve dividend frequencies for the top-yield candidates.")
+    parser.add_argument("--limit", type=int, default=PREFETCH_LIMIT, help="how many top-yield securities")
+    parser.add_argument("--browser", action="store_true", help="fall back to Chromium when HTTP finds nothing")
+    parser.add_argument("--loop", type=float, metavar="MINUTES", help="keep running, one pass every MINUTES")
+    args = parser.parse_args()
+
+    while True:
+        conn = connect_to_db()
+        try:
+            t0 = time.perf_counter()
+            looked_up = prefetch(conn, args.limit, args.browser)
+            print(f"{datetime.now():%Y-%m-%d %H:%M} looked up {looked_up} symbols "
+                  f"in {time.perf_counter() - t0:.1f}s")
+        finally:
+            conn.close()
+        if not args.loop:
+            break
+        time.sleep(args.loop * 60)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,15 @@
-import pymysql
-from pymysql.cursors import DictCursor
-from questrade_api import QuestradeAPI
-from credentials import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
-from datetime import datetime, timedelta
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from questrade_api import LazyQuestradeAPI
+from db import connect_to_db
+from frequency_cache import FrequencyCache, make_resolver, start_background_prefetch
 
-# Initialize Questrade API
-qt = QuestradeAPI()
+# Questrade API - built (and asks which user) the first time it's used
+qt = LazyQuestradeAPI()
 
 # Configuration - set to True to use automatic web scraping, False for manual entry
 AUTO_FETCH_FREQUENCY = True  # Change this to switch between modes
 
-# Connect to the MySQL database
-def connect_to_db():
-    return pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE,
-        cursorclass=DictCursor
-    )
+# Candidates looked up on TMX together (spread over the scraper's browser contexts)
+SCRAPE_BATCH = 8
 
 # Fetch all active accounts from Questrade
 def get_active_accounts():
@@ -63,44 +53,44 @@ def get_number_of_securities():
         print("Invalid input. Using default of 5.")
         return 5
 
-# Fetch the top 100 highest yielding securities from the database
-def get_top_yielding_securities():
+# Columnar snapshot of qt_securities (+ EMA scores, frequencies) - loaded on the first
+# picker run, then only rows changed since are pulled in (numpy is imported here too)
+_screener = None
+
+# The top 100 highest yielding securities we don't hold and that aren't known non-monthly payers
+def get_top_yielding_securities(exclude_ids=()):
+    global _screener
+    import numpy as np
+    from screener import Screener
+
     connection = connect_to_db()
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT * FROM qt_securities
-                WHERE yield IS NOT NULL AND yield > 0 AND exDate IS NOT NULL AND exDate > %s
-                ORDER BY yield DESC
-                LIMIT 100
-            """, ((datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d %H:%M:%S'),))
-            return cursor.fetchall()
+        if _screener is None:
+            _screener = Screener().load(connection)
+        else:
+            _screener.refresh(connection)
     finally:
         connection.close()
 
+    s = _screener
+    mask = ((s['yield'] > 0) & (s['exDate'] > s.days_ago(180))
+            & ~np.isin(s['symbolId'], list(exclude_ids))
+            & ((s['frequency'] == '') | (s['frequency'] == 'monthly')))
+    return s.select(mask, order_by='-yield', limit=100)
+
 # Get current positions held in the specified account
 def get_current_holdings(account_number):
     positions = qt.positions_acct(account_number)
     return {position['symbolId'] for position in positions['positions'] if position['openQuantity'] > 0}
 
-# Get dividend frequency from the database
-def get_dividend_frequency(symbol):
-    connection = connect_to_db()
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT frequency FROM div_freq WHERE symbol = %s", (symbol,))
-            result = cursor.fetchone()
-            return result['frequency'] if result else None
-    finally:
-        connection.close()
-
 # Update dividend frequency in the database
 def add_or_update_dividend_frequency(symbol, frequency):
     connection = connect_to_db()
     try:
         with connection.cursor() as cursor:
             cursor.execute(
-                "INSERT INTO div_freq (symbol, frequency) VALUES (%s, %s) ON DUPLICATE KEY UPDATE frequency = %s",
+                "INSERT INTO div_freq (symbol, frequency) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE frequency = %s, last_updated = CURRENT_TIMESTAMP",
                 (symbol, frequency, frequency)
             )
         connection.commit()
@@ -153,64 +143,6 @@ def display_all_frequencies():
     finally:
         connection.close()
 
-# Fetch distribution frequency from TMX using Playwright
-def fetch_distribution_from_tmx(symbol, browser):
-    url = f"https://money.tmx.com/en/quote/{symbol}/key-data"
-    
-    try:
-        page = browser.new_page()
-        page.goto(url, wait_until='networkidle', timeout=20000)
-        
-        # Wait a bit for dynamic content to load
-        page.wait_for_timeout(2000)
-        
-        # Try multiple possible selectors
-        selectors = [
-            '.Item__Desc-sc-sgueh0-4',
-            '[class*="Item__Desc"]',
-            'div[class*="Desc"]'
-        ]
-        
-        for selector in selectors:
-            try:
-                items = page.locator(selector).all()
-                if items:
-                    for item in items:
-                        text = item.text_content().strip()
-                        if text in ["Monthly", "Quarterly", "Annually", "Semi-Annually"]:
-                            page.close()
-                            return text.lower()
-            except:
-                continue
-        
-        # If selectors don't work, try getting all text and searching
-        page_content = page.content()
-        text_lower = page_content.lower()
-        
-        if 'monthly' in text_lower and 'distribution' in text_lower:
-            page.close()
-            return 'monthly'
-        elif 'quarterly' in text_lower and 'distribution' in text_lower:
-            page.close()
-            return 'quarterly'
-        elif 'annually' in text_lower and 'distribution' in text_lower:
-            page.close()
-            return 'annually'
-        
-        page.close()
-        return None
-        
-    except PlaywrightTimeoutError:
-        print(f"[Timeout: {symbol}] Could not load page in time")
-        if 'page' in locals():
-            page.close()
-        return None
-    except Exception as e:
-        print(f"[Error: {symbol}] {e}")
-        if 'page' in locals():
-            page.close()
-        return None
-
 # Manually prompt user for dividend frequency
 def prompt_for_frequency(symbol):
     frequency_input = input(f"Frequency for {symbol} (enter 'm' for monthly or 'q' for quarterly): ").strip().lower()
@@ -222,35 +154,19 @@ def prompt_for_frequency(symbol):
         print(f"Invalid input for {symbol}. Skipping...")
         return None
 
-# Verify if a security pays monthly dividends
-def verify_dividend_frequency(security, browser=None):
+# Verify if a security pays monthly dividends (cache.resolve() has already looked it up)
+def verify_dividend_frequency(security, cache):
     symbol = security['symbol']
-    frequency = get_dividend_frequency(symbol)
+    frequency = cache.get(symbol)
 
     if frequency is None:
-        if AUTO_FETCH_FREQUENCY and browser is not None:
-            print(f"Fetching distribution frequency for {symbol}...")
-            dist = fetch_distribution_from_tmx(symbol, browser)
-
-            if dist is None:
-                print(f"Unable to fetch distribution frequency for {symbol}.")
-                # Fall back to manual entry
-                dist = prompt_for_frequency(symbol)
-                if dist is None:
-                    return None
-
-            if dist in ['monthly', 'quarterly', 'semi-annually', 'annually']:
-                add_or_update_dividend_frequency(symbol, dist)
-                frequency = dist
-            else:
-                print(f"Unrecognized frequency '{dist}' for {symbol}. Skipping...")
-                return None
-        else:
-            # Manual entry mode
-            frequency = prompt_for_frequency(symbol)
-            if frequency is None:
-                return None
-            add_or_update_dividend_frequency(symbol, frequency)
+        if AUTO_FETCH_FREQUENCY:
+            print(f"Unable to fetch distribution frequency for {symbol}.")
+        # Fall back to manual entry
+        frequency = prompt_for_frequency(symbol)
+        if frequency is None:
+            return None
+        cache.put(symbol, frequency)
 
     return frequency == 'monthly'
 
@@ -271,36 +187,47 @@ def find_top_dividend_payers():
     num_securities = get_number_of_securities()
 
     current_holdings = get_current_holdings(account_number)
-    top_securities = get_top_yielding_securities()
-
+    candidates = get_top_yielding_securities(current_holdings)
     verified_monthly_securities = []
     
-    # Initialize Playwright browser if AUTO_FETCH is enabled
-    browser = None
-    playwright = None
+    # All stored frequencies in one query; lookups for the rest are batched below
+    connection = connect_to_db()
+    cache = FrequencyCache(connection)
+
+    # HTTP session + TMX scraper if AUTO_FETCH is enabled; the browser only
+    # starts (and Playwright is only imported) if the HTTP lookup comes up empty
+    session = None
+    scraper = None
     
     try:
         if AUTO_FETCH_FREQUENCY:
-            playwright = sync_playwright().start()
-            browser = playwright.chromium.launch(headless=True)
-            print("Browser initialized for automatic fetching...")
-
-        for security in top_securities:
-            if security['symbolId'] in current_holdings:
-                continue
-
-            if verify_dividend_frequency(security, browser):
-                verified_monthly_securities.append(security)
+            from tmx_http import make_session
+            from tmx_scraper import TmxScraper
+            session = make_session()
+            scraper = TmxScraper()
+        resolver = make_resolver(connection, session, scraper, web=AUTO_FETCH_FREQUENCY)
+
+        # Work through the candidates a batch at a time so unknown symbols are looked up together
+        for i in range(0, len(candidates), SCRAPE_BATCH):
+            batch = candidates[i:i + SCRAPE_BATCH]
+            cache.resolve([s['symbol'] for s in batch], resolver, record_failures=scraper is not None)
+
+            for security in batch:
+                if verify_dividend_frequency(security, cache):
+                    verified_monthly_securities.append(security)
+                if len(verified_monthly_securities) >= num_securities:
+                    break
 
             if len(verified_monthly_securities) >= num_securities:
                 break
 
     finally:
-        # Clean up Playwright resources
-        if browser:
-            browser.close()
-        if playwright:
-            playwright.stop()
+        # Clean up HTTP and Playwright resources
+        if session:
+            session.close()
+        if scraper:
+            scraper.close()
+        connection.close()
 
     if verified_monthly_securities:
         print(f"\nTop {num_securities} Highest Yielding Monthly Dividend Payers:")
@@ -311,6 +238,10 @@ def find_top_dividend_payers():
 
 # Main menu loop
 def main():
+    # Look up the top candidates' frequencies while the user is still in the menu
+    if AUTO_FETCH_FREQUENCY:
+        start_background_prefetch()
+
     while True:
         print("\n" + "="*60)
         print("What would you like to do?")
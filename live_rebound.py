@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+live_rebound.py
+Live opening‑rebound detector for 09:30–10:00.
+
+Takes the top‑EMA symbols from ema_leaderboard, polls their quotes in batched
+`v1/markets/quotes?ids=` requests every REFRESH_SECONDS, turns the last trade
+prices into 1‑minute bars and folds each bar into a small per‑symbol state
+(open, low of the first DROP_WINDOW_MIN bars, count of bars sitting on that
+low, last close). The running score is the same formula as
+opening_rebound_score2.calculate_opening_rebound_score, computed from that
+state in O(1) per symbol, so a refresh cycle costs one HTTP round trip per
+QUOTE_BATCH symbols plus microseconds of maths.
+
+Scores shown before DROP_WINDOW_MIN bars have landed are provisional (~).
+
+  python live_rebound.py                    # run through today's opening window
+  python live_rebound.py --replay 2026-03-12  # feed a stored day through the same state
+
+Tables used / created:
+  • ema_leaderboard  – picks the symbols to watch (EMA, price and volume)
+  • opening_windows  – stored bars for --replay
+"""
+
+import argparse
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from pytz import timezone
+from opening_windows import load_opening_windows
+from opening_rebound_score2 import (
+    score_windows,
+    DROP_WINDOW_MIN,
+    MAX_LINGER_MIN,
+    DROP_WEIGHT,
+    RECO_WEIGHT,
+    LINGER_WEIGHT,
+)
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+TOP_N              = 50            # symbols to watch, by EMA
+MIN_PRICE          = 0.12
+MIN_VOL            = 5000
+QUOTE_BATCH        = 100           # symbol ids per quotes request
+REFRESH_SECONDS    = 5
+SHOW_ROWS          = 15
+WINDOW_MINUTES     = 30            # 09:30 → 10:00
+EASTERN            = timezone('US/Eastern')
+# ────────────────────────────────────────────────────────────────────
+
+# -------------------------------------------------------------------
+# 1. Incremental per‑symbol state
+# -------------------------------------------------------------------
+class ReboundState:
+    """
+    Running inputs of the opening‑rebound score for one symbol. Bars are
+    counted in arrival order, like the candle list the batch scorer sees.
+    """
+
+    def __init__(self):
+        self.open_px = None
+        self.closed_bars = 0
+        self.drop_low = None          # low of the closed bars within the drop window
+        self.low_counts = {}          # closed bar low → number of bars
+        self.bar = None               # [minute, low, close] of the bar still forming
+
+    def add_tick(self, minute, price, open_px=None):
+        """Fold one trade price seen during window minute `minute` (0 = 09:30)."""
+        if self.open_px is None:
+            self.open_px = open_px or price
+        if self.bar is None or minute != self.bar[0]:
+            self._close_bar()
+            self.bar = [minute, price, price]
+        else:
+            self.bar[1] = min(self.bar[1], price)
+            self.bar[2] = price
+
+    def add_bar(self, minute, open_px, low, close):
+        """Fold one complete 1‑minute candle."""
+        if self.open_px is None:
+            self.open_px = open_px
+        self._close_bar()
+        self.bar = [minute, low, close]
+
+    def _close_bar(self):
+        if self.bar is None:
+            return
+        low = self.bar[1]
+        if self.closed_bars < DROP_WINDOW_MIN:
+            self.drop_low = low if self.drop_low is None else min(self.drop_low, low)
+        self.low_counts[low] = self.low_counts.get(low, 0) + 1
+        self.closed_bars += 1
+        self.bar = None
+
+    def bars(self):
+        return self.closed_bars + (self.bar is not None)
+
+    def score(self):
+        """(score, provisional) using the closed bars plus the bar still forming."""
+        if self.bar is None and self.drop_low is None:
+            return None, True
+        low_px = self.drop_low
+        if self.bar is not None and self.closed_bars < DROP_WINDOW_MIN:
+            low_px = self.bar[1] if low_px is None else min(low_px, self.bar[1])
+        close_px = self.bar[2] if self.bar is not None else None
+        if close_px is None or not self.open_px:
+            return None, True
+
+        pct_drop = (self.open_px - low_px) / self.open_px * 100.0
+        denom = self.open_px - low_px
+        pct_reco = 0.0 if denom == 0.0 else (close_px - low_px) / denom * 100.0
+        pct_reco = max(0.0, min(100.0, pct_reco))
+
+        linger = self.low_counts.get(low_px, 0) + (self.bar is not None and self.bar[1] == low_px)
+        linger = min(linger, MAX_LINGER_MIN)
+
+        raw = (
+            DROP_WEIGHT   * pct_drop +
+            RECO_WEIGHT   * pct_reco +
+            LINGER_WEIGHT * (1 - linger / MAX_LINGER_MIN) * 100
+        )
+        return round(max(0.0, min(100.0, raw)), 2), self.bars() < DROP_WINDOW_MIN
+
+# -------------------------------------------------------------------
+# 2. Watch list & quotes
+# -------------------------------------------------------------------
+def load_watch_list(top_n=TOP_N):
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT symbolId, symbol, ema_score
+                FROM   ema_leaderboard
+                WHERE  lastTradePrice >= %s
+                  AND  averageVol3Months >= %s
+                ORDER  BY ema_score DESC
+                LIMIT  %s
+                """,
+                (MIN_PRICE, MIN_VOL, top_n),
+            )
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+def poll_quotes(qt, symbol_ids):
+    """All quotes for `symbol_ids`, QUOTE_BATCH ids per request."""
+    quotes = []
+    for i in range(0, len(symbol_ids), QUOTE_BATCH):
+        quotes.extend(qt.get_quotes(symbol_ids[i:i + QUOTE_BATCH]).get("quotes", []))
+    return quotes
+
+def window_minute(now):
+    """Minutes since 09:30 Eastern for an aware datetime."""
+    local = now.astimezone(EASTERN)
+    return (local.hour - 9) * 60 + local.minute - 30
+
+# -------------------------------------------------------------------
+# 3. Live loop
+# -------------------------------------------------------------------
+def print_board(watch, states, minute, fetch_s, score_s):
+    ranked = []
+    for row in watch:
+        score, provisional = states[row["symbolId"]].score()
+        if score is not None:
+            ranked.append((score, provisional, row))
+    ranked.sort(key=lambda r: r[0], reverse=True)
+
+    print(f"\n09:30+{minute:02d}  fetch {fetch_s * 1000:.0f} ms  score {score_s * 1000:.2f} ms  "
+          f"({len(ranked)}/{len(watch)} symbols)")
+    print(f"{'Symbol':<10}{'Score':>8}{'EMA':>8}{'Bars':>6}")
+    for score, provisional, row in ranked[:SHOW_ROWS]:
+        mark = "~" if provisional else " "
+        bars = states[row["symbolId"]].bars()
+        print(f"{row['symbol']:<10}{score:>7.2f}{mark}{row['ema_score']:>8.2f}{bars:>6}")
+
+def run_live(qt, watch):
+    states = {row["symbolId"]: ReboundState() for row in watch}
+    symbol_ids = [row["symbolId"] for row in watch]
+
+    while True:
+        minute = window_minute(datetime.now(EASTERN))
+        if minute < 0:
+            time.sleep(min(REFRESH_SECONDS, -minute * 60))
+            continue
+        if minute >= WINDOW_MINUTES:
+            break
+
+        t0 = time.perf_counter()
+        quotes = poll_quotes(qt, symbol_ids)
+        t1 = time.perf_counter()
+        for quote in quotes:
+            state = states.get(quote.get("symbolId"))
+            price = quote.get("lastTradePrice")
+            if state is None or not price:
+                continue
+            state.add_tick(minute, price, quote.get("openPrice"))
+        t2 = time.perf_counter()
+
+        print_board(watch, states, minute, t1 - t0, t2 - t1)
+        time.sleep(max(0.0, REFRESH_SECONDS - (time.perf_counter() - t0)))
+    return states
+
+# -------------------------------------------------------------------
+# 4. Replay (stored bars through the live state)
+# -------------------------------------------------------------------
+def replay(day, watch):
+    """Feed one stored day's opening windows bar by bar; check against the batch scorer."""
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            windows = load_opening_windows(cur, day, day + timedelta(days=1),
+                                           [row["symbolId"] for row in watch],
+                                           fields=("open", "low", "close"))
+    finally:
+        conn.close()
+
+    expected = score_windows(windows["open"], windows["low"], windows["close"], windows["counts"])
+    states, mismatches, elapsed = {}, 0, 0.0
+    for i, (symbol_id, _) in enumerate(windows["keys"]):
+        state = states[symbol_id] = ReboundState()
+        t0 = time.perf_counter()
+        for j in range(windows["counts"][i]):
+            state.add_bar(j, windows["open"][i, j], windows["low"][i, j], windows["close"][i, j])
+            state.score()
+        elapsed += time.perf_counter() - t0
+
+        score, provisional = state.score()
+        live = np.nan if score is None or provisional else score
+        if np.isnan(live) != np.isnan(expected[i]):
+            mismatches += 1                # scored on one side only
+        elif not np.isnan(live) and abs(live - round(float(expected[i]), 2)) > 1e-6:
+            mismatches += 1
+
+    bars = int(windows["counts"].sum())
+    print(f"{len(windows['keys'])} symbols, {bars} bars replayed, "
+          f"{elapsed / max(bars, 1) * 1e6:.1f} µs per bar, {mismatches} mismatches vs batch scorer")
+    return states
+
+def main():
+    parser = argparse.ArgumentParser(description="Live 09:30–10:00 opening‑rebound detector.")
+    parser.add_argument("--top", type=int, default=TOP_N, help="symbols to watch, by EMA")
+    parser.add_argument("--replay", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="replay a stored day instead of polling quotes")
+    args = parser.parse_args()
+
+    watch = load_watch_list(args.top)
+    if not watch:
+        print("No symbols in ema_leaderboard met the filters.")
+        return
+
+    if args.replay:
+        replay(args.replay, watch)
+        return
+
+    from questrade_api import QuestradeAPI
+    qt = QuestradeAPI(user_id=1)
+    print(f"Watching {len(watch)} symbols, refresh every {REFRESH_SECONDS}s")
+    run_live(qt, watch)
+
+if __name__ == "__main__":
+    main()
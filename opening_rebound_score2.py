@@ -3,52 +3,49 @@
 opening_rebound_score.py
 Compute a daily “opening‑rebound (✓‑mark) score” for every security that has
 09:30–10:00 1‑minute candles in the local MySQL database and maintain a 30‑day
-EMA of that score.
+EMA of that score (see ema_engine.py).
 
 Tables used / created:
   • candlestick_data   – minute candles you already collect
+  • candle_watermarks  – per‑symbol first/last bar (batch mode planning)
+  • opening_windows    – pre‑extracted 09:30–10:00 windows (batch mode reads)
   • market_holidays    – yyyy‑mm‑dd rows to skip
-  • pattern_scores     – (symbolId, date, opening_rebound_score)
-  • ema_scores         – (symbolId, ema_score, last_updated)
+  • pattern_scores     – (symbolId, date, opening_rebound_score, ema_opening_rebound_score)
+  • ema_scores         – (symbolId, ema_score, last_score_date, last_updated)
+
+Run with --batch to score every symbol and pending day from a handful of
+range queries, NumPy array maths and bulk upserts instead of one connection
+per query.
 """
 
-import pymysql
-from pymysql.cursors import DictCursor
-from datetime import timedelta
-from questrade_api import QuestradeAPI
-from credentials import (
-    MYSQL_HOST,
-    MYSQL_USER,
-    MYSQL_PASSWORD,
-    MYSQL_DATABASE,
-)
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+from opening_windows import load_opening_windows
+from ema_engine import apply_new_scores, EMA_PERIOD_DAYS
+from questrade_api import LazyQuestradeAPI
+from db import connect_to_db, executemany_batched
 
 # ─────────────────────────── PARAMETERS ────────────────────────────
 DROP_WINDOW_MIN    = 10            # minutes (09:30→09:39)
 EVAL_END_TIME      = "10:00:00"    # exclusive upper bound
 MAX_LINGER_MIN     = 10
-EMA_PERIOD_DAYS    = 30
 DROP_WEIGHT        = 0.5
 RECO_WEIGHT        = 0.3
 LINGER_WEIGHT      = 0.2
+BATCH_DAYS         = 30            # days of opening windows per range query
+WRITE_CHUNK        = 5000          # rows per bulk upsert
 # ────────────────────────────────────────────────────────────────────
 
-qt = QuestradeAPI(user_id=1)  # still handy for ad‑hoc queries later
-
-def connect_to_db():
-    return pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE,
-        cursorclass=DictCursor,
-    )
+qt = LazyQuestradeAPI(user_id=1)  # still handy for ad‑hoc queries later; built on first use
 
 # -------------------------------------------------------------------
 # 1. Data utilities
 # -------------------------------------------------------------------
 def get_candlestick_data(symbol_id, trade_date):
     """Return all 09:30–09:59 candles (inclusive/exclusive) for one day."""
+    window_start = datetime.combine(trade_date, datetime.strptime("09:30:00", "%H:%M:%S").time())
+    window_end = datetime.combine(trade_date, datetime.strptime(EVAL_END_TIME, "%H:%M:%S").time())
     conn = connect_to_db()
     try:
         with conn.cursor() as cur:
@@ -57,12 +54,11 @@ def get_candlestick_data(symbol_id, trade_date):
                 SELECT *
                 FROM candlestick_data
                 WHERE symbolId = %s
-                  AND DATE(start) = %s
-                  AND TIME(start) >= '09:30:00'
-                  AND TIME(start) <  %s
+                  AND start >= %s
+                  AND start <  %s
                 ORDER BY start ASC
                 """,
-                (symbol_id, trade_date, EVAL_END_TIME),
+                (symbol_id, window_start, window_end),
             )
             return cur.fetchall()
     finally:
@@ -107,6 +103,50 @@ def calculate_opening_rebound_score(candles):
     )
     return round(max(0.0, min(100.0, raw)), 2)
 
+def window_components(open_, low, close, counts, drop_window=DROP_WINDOW_MIN):
+    """
+    The weight‑independent parts of the score for many windows at once.
+    `open_`, `low`, `close` are (n_windows, n_bars) float arrays, as loaded by
+    opening_windows, holding each window's candles left‑aligned (NaN padded);
+    `counts` is candles per window.
+    Returns (valid, pct_drop, pct_reco, linger) with linger not yet capped.
+    """
+    rows = np.arange(len(counts))
+    valid = counts >= drop_window
+    last = np.maximum(counts - 1, 0)
+
+    open_px = open_[:, 0]
+    low_px = np.nanmin(np.where(valid[:, None], low[:, :drop_window], np.inf), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_drop = (open_px - low_px) / open_px * 100.0
+        close10_px = close[rows, last]
+        denom = open_px - low_px
+        pct_reco = np.where(denom == 0.0, 0.0, (close10_px - low_px) / denom * 100.0)
+    pct_reco = np.clip(pct_reco, 0.0, 100.0)
+
+    linger = np.sum(low == low_px[:, None], axis=1)
+    return valid & (open_px != 0), pct_drop, pct_reco, linger
+
+def score_windows(open_, low, close, counts):
+    """
+    Vectorized calculate_opening_rebound_score over many windows at once.
+    Returns a float array with NaN wherever the scalar version returns None.
+    """
+    valid, pct_drop, pct_reco, linger = window_components(open_, low, close, counts)
+    linger = np.minimum(linger, MAX_LINGER_MIN)
+
+    raw = (
+        DROP_WEIGHT   * pct_drop +
+        RECO_WEIGHT   * pct_reco +
+        LINGER_WEIGHT * (1 - linger / MAX_LINGER_MIN) * 100
+    )
+    raw = np.clip(raw, 0.0, 100.0)
+    return np.where(valid, raw, np.nan)
+
+def is_scoring_day(day, holidays):
+    """Same day filter as the sequential driver: no Mondays, no market holidays."""
+    return day.weekday() != 0 and day not in holidays
+
 # -------------------------------------------------------------------
 # 3. Persistence helpers
 # -------------------------------------------------------------------
@@ -126,52 +166,6 @@ def store_opening_rebound_score(symbol_id, trade_date, score):
     finally:
         conn.close()
 
-def calculate_ema(symbol_id):
-    conn = connect_to_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT opening_rebound_score
-                FROM pattern_scores
-                WHERE symbolId = %s
-                ORDER BY date DESC
-                LIMIT %s
-                """,
-                (symbol_id, EMA_PERIOD_DAYS),
-            )
-            scores = [row["opening_rebound_score"] for row in cur.fetchall()]
-    finally:
-        conn.close()
-
-    if not scores:
-        return None
-
-    scores.reverse()                      # chronological order
-    ema = scores[0]
-    multiplier = 2 / (len(scores) + 1)
-    for s in scores[1:]:
-        ema = (s - ema) * multiplier + ema
-    return round(ema, 2)
-
-def store_ema(symbol_id, ema):
-    conn = connect_to_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO ema_scores (symbolId, ema_score, last_updated)
-                VALUES (%s, %s, NOW())
-                ON DUPLICATE KEY UPDATE
-                    ema_score = VALUES(ema_score),
-                    last_updated = NOW()
-                """,
-                (symbol_id, ema),
-            )
-        conn.commit()
-    finally:
-        conn.close()
-
 # -------------------------------------------------------------------
 # 4. Main driver: iterate securities & days
 # -------------------------------------------------------------------
@@ -211,6 +205,7 @@ def main():
                 last_d = cur.fetchone()["last_d"]
                 work_date = (last_d + timedelta(days=1)) if last_d else min_date
 
+                new_scores = []
                 while work_date and work_date <= max_date:
                     if work_date.weekday() == 0:           # Monday
                         work_date += timedelta(days=1)
@@ -227,15 +222,117 @@ def main():
                     score = calculate_opening_rebound_score(candles)
                     if score is not None:
                         store_opening_rebound_score(symbol_id, work_date, score)
+                        new_scores.append((symbol_id, work_date, score))
                         print(f"  {work_date}: score {score}")
                     work_date += timedelta(days=1)
 
-                ema = calculate_ema(symbol_id)
+                ema = apply_new_scores(conn, new_scores).get(symbol_id)
                 if ema is not None:
-                    store_ema(symbol_id, ema)
-                    print(f"  EMA‑{EMA_PERIOD_DAYS} = {ema}")
+                    print(f"  EMA‑{EMA_PERIOD_DAYS} = {ema:.2f}")
+    finally:
+        conn.close()
+
+# -------------------------------------------------------------------
+# 5. Batch driver: all symbols, all pending dates, bulk reads & writes
+# -------------------------------------------------------------------
+def load_pending_ranges(cur):
+    """
+    Return {symbolId: (first_pending_date, last_candle_date)} for every symbol
+    with candles that have not been scored yet.
+    """
+    cur.execute("SELECT symbolId, MAX(date) AS last_d FROM pattern_scores GROUP BY symbolId")
+    last_scored = {row["symbolId"]: row["last_d"] for row in cur.fetchall()}
+
+    cur.execute(
+        """
+        SELECT symbolId, first_bar, last_bar
+        FROM candle_watermarks
+        WHERE last_bar IS NOT NULL
+        """
+    )
+    pending = {}
+    for row in cur.fetchall():
+        last_d = last_scored.get(row["symbolId"])
+        start = (last_d + timedelta(days=1)) if last_d else row["first_bar"].date()
+        if start <= row["last_bar"].date():
+            pending[row["symbolId"]] = (start, row["last_bar"].date())
+    return pending
+
+def bulk_store_scores(conn, rows):
+    # Primary‑key order, so concurrent writers (parallel_rebound_score shards)
+    # take their row locks in the same order instead of deadlocking
+    rows = sorted(rows, key=lambda r: (r[0], r[1]))
+    with conn.cursor() as cur:
+        executemany_batched(
+            cur,
+            """
+            INSERT INTO pattern_scores (symbolId, date, opening_rebound_score)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE opening_rebound_score = VALUES(opening_rebound_score)
+            """,
+            rows,
+            WRITE_CHUNK,
+        )
+    conn.commit()
+
+def score_pending(conn, pending, holidays, shard=False, verbose=True):
+    """
+    Score every pending (symbol, day) in `pending`, reading opening windows in
+    BATCH_DAYS range queries. With `shard` set only the pending symbols' windows
+    are read (for a process‑pool worker holding a slice of the universe).
+    Returns [(symbolId, date, score), ...].
+    """
+    if not pending:
+        return []
+    first = min(start for start, _ in pending.values())
+    last = max(end for _, end in pending.values())
+
+    results = []
+    chunk_start = first
+    while chunk_start <= last:
+        chunk_end = min(chunk_start + timedelta(days=BATCH_DAYS), last + timedelta(days=1))
+        with conn.cursor() as cur:
+            windows = load_opening_windows(cur, chunk_start, chunk_end,
+                                           sorted(pending) if shard else None,
+                                           fields=("open", "low", "close"))
+        scores = score_windows(windows["open"], windows["low"], windows["close"], windows["counts"])
+
+        for (symbol_id, day), score in zip(windows["keys"], scores):
+            if symbol_id not in pending:
+                continue
+            start, end = pending[symbol_id]
+            if start <= day <= end and is_scoring_day(day, holidays) and not np.isnan(score):
+                results.append((symbol_id, day, round(float(score), 2)))
+        if verbose:
+            print(f"  {chunk_start} → {chunk_end - timedelta(days=1)}: {len(windows['keys'])} windows")
+        chunk_start = chunk_end
+    return results
+
+def main_batch():
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            pending = load_pending_ranges(cur)
+            cur.execute("SELECT holiday_date FROM market_holidays")
+            holidays = {row["holiday_date"] for row in cur.fetchall()}
+
+        print(f"▶ {len(pending)} symbols with unscored days")
+        results = score_pending(conn, pending, holidays)
+        bulk_store_scores(conn, results)
+        print(f"  stored {len(results)} scores")
+
+        emas = apply_new_scores(conn, results)
+        print(f"  EMA‑{EMA_PERIOD_DAYS} updated for {len(emas)} symbols")
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Score the 09:30–10:00 opening rebound for every security.")
+    parser.add_argument("--batch", action="store_true",
+                        help="score all symbols with bulk range reads, NumPy and bulk upserts")
+    args = parser.parse_args()
+
+    if args.batch:
+        main_batch()
+    else:
+        main()
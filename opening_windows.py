@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+opening_windows.py
+Pre‑extract the opening window (09:30–10:00) of every session at ingest time
+so scoring never has to dig through a symbol's full candle history.
+
+Each (symbolId, session_date) gets one row whose payload is the window's
+candles packed with candle_codec. Reads are pure range predicates on the
+primary key / session_date index.
+
+Tables used / created:
+  • candlestick_data   – source minute candles (read by symbolID + start range)
+  • candle_coverage    – fetched sessions, used to find what to extract
+  • opening_windows    – (symbolId, session_date, n_bars, payload)
+"""
+
+import argparse
+import numpy as np
+from datetime import datetime, time as dtime
+from candle_codec import encode_candles, decode_session
+from db import connect_to_db, stream
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+WINDOW_START       = dtime(9, 30)
+WINDOW_END         = dtime(10, 0)      # exclusive
+WINDOW_BARS        = 30
+FIELDS             = ("minute", "open", "high", "low", "close", "volume", "VWAP")
+# ────────────────────────────────────────────────────────────────────
+
+def window_bounds(session_date):
+    """[start, end) datetimes of a session's opening window."""
+    return datetime.combine(session_date, WINDOW_START), datetime.combine(session_date, WINDOW_END)
+
+# -------------------------------------------------------------------
+# 1. Extraction (called by AlphaCandle after each ingested session)
+# -------------------------------------------------------------------
+def extract_opening_window(cursor, symbol_id, session_date):
+    """Copy one session's opening window into opening_windows. Does not commit."""
+    start, end = window_bounds(session_date)
+    cursor.execute(
+        """
+        SELECT start, open, high, low, close, volume, VWAP
+        FROM candlestick_data
+        WHERE symbolID = %s AND start >= %s AND start < %s
+        ORDER BY start ASC
+        """,
+        (symbol_id, start, end),
+    )
+    candles = cursor.fetchall()
+    if not candles:
+        return 0
+    cursor.execute(
+        """
+        INSERT INTO opening_windows (symbolId, session_date, n_bars, payload)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE n_bars = VALUES(n_bars), payload = VALUES(payload)
+        """,
+        (symbol_id, session_date, len(candles), encode_candles(candles)),
+    )
+    return len(candles)
+
+# -------------------------------------------------------------------
+# 2. Loading
+# -------------------------------------------------------------------
+def load_opening_windows(cursor, start_date, end_date, symbol_ids=None, fields=FIELDS):
+    """
+    Load every opening window with session_date in [start_date, end_date) into
+    padded (n_windows, WINDOW_BARS) arrays, candles left‑aligned and NaN padded.
+    Returns a dict with 'keys' [(symbolId, session_date), ...], 'counts' and one
+    array per name in `fields` (minute, open, high, low, close, volume, VWAP).
+    """
+    query = """
+        SELECT symbolId, session_date, payload
+        FROM opening_windows
+        WHERE session_date >= %s AND session_date < %s
+    """
+    params = [start_date, end_date]
+    if symbol_ids is not None:
+        if not symbol_ids:
+            return stack_windows([], [], {name: [] for name in fields}, WINDOW_BARS)
+        query += f" AND symbolId IN ({', '.join(['%s'] * len(symbol_ids))})"
+        params.extend(symbol_ids)
+    # Streamed off a server‑side cursor: each payload is decoded as it arrives
+    # instead of the whole result set's blobs sitting in memory first
+    keys, counts, columns = [], [], {name: [] for name in fields}
+    for row in stream(cursor.connection, query + " ORDER BY symbolId, session_date", params):
+        bars = decode_session(row["payload"])
+        n = min(len(bars["minute"]), WINDOW_BARS)
+        keys.append((row["symbolId"], row["session_date"]))
+        counts.append(n)
+        for name in fields:
+            columns[name].append(bars[name][:n])
+    return stack_windows(keys, counts, columns, WINDOW_BARS)
+
+def stack_windows(keys, counts, columns, width):
+    """Padded (len(keys), width) arrays from per‑window value lists, NaN filled."""
+    out = {"keys": keys, "counts": np.array(counts, dtype=np.int64)}
+    for name, values in columns.items():
+        out[name] = np.full((len(keys), width), np.nan)
+        for i, v in enumerate(values):
+            out[name][i, :len(v)] = v
+    return out
+
+# -------------------------------------------------------------------
+# 3. Backfill driver
+# -------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Extract opening windows for fetched sessions that lack one.")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="only extract sessions on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            query = """
+                SELECT c.symbolId, c.session_date
+                FROM candle_coverage c
+                LEFT JOIN opening_windows w
+                       ON w.symbolId = c.symbolId AND w.session_date = c.session_date
+                WHERE c.status = 'fetched' AND w.symbolId IS NULL
+            """
+            params = []
+            if args.since:
+                query += " AND c.session_date >= %s"
+                params.append(args.since)
+            cur.execute(query, params)
+            sessions = cur.fetchall()
+            print(f"{len(sessions)} opening windows to extract")
+
+            for idx, row in enumerate(sessions, start=1):
+                extract_opening_window(cur, row["symbolId"], row["session_date"])
+                if idx % 1000 == 0:
+                    conn.commit()
+                    print(f"  {idx}/{len(sessions)}")
+            conn.commit()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
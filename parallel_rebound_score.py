@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+parallel_rebound_score.py
+Run the opening‑rebound batch scorer across a process pool.
+
+Pending symbols are sharded round‑robin (by symbolId order) across workers;
+each worker opens one DB connection, reads its symbols' opening windows in
+bulk, scores them with the same NumPy code as `opening_rebound_score2.py
+--batch`, and writes its scores and EMAs with bulk upserts (in key order, rerun
+on a deadlock). Symbols never span shards, so results are identical to the
+sequential run.
+
+  python parallel_rebound_score.py --workers 8          # score & store
+  python parallel_rebound_score.py --bench 1,2,4,8      # speedup report, no writes
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from multiprocessing import Pool
+
+import opening_rebound_score2 as ors
+from db import with_retry
+
+_conn = None          # one connection per worker process
+
+# -------------------------------------------------------------------
+# 1. Worker side
+# -------------------------------------------------------------------
+def _init_worker():
+    global _conn
+    _conn = ors.connect_to_db()
+
+def _score_shard(args):
+    pending, holidays, store = args
+    _conn.ping(reconnect=True)
+    results = ors.score_pending(_conn, pending, holidays, shard=True, verbose=False)
+    if store:
+        # Shards write concurrently: a deadlock victim was rolled back whole,
+        # and both steps are safe to rerun (upserts / EMA rebuild)
+        with_retry(lambda conn: ors.bulk_store_scores(conn, results), retries=3, deadlocks=True, conn=_conn)
+        with_retry(lambda conn: ors.apply_new_scores(conn, results), retries=3, deadlocks=True, conn=_conn)
+    return results
+
+# -------------------------------------------------------------------
+# 2. Driver
+# -------------------------------------------------------------------
+def load_work():
+    conn = ors.connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            pending = ors.load_pending_ranges(cur)
+            cur.execute("SELECT holiday_date FROM market_holidays")
+            holidays = {row["holiday_date"] for row in cur.fetchall()}
+    finally:
+        conn.close()
+    return pending, holidays
+
+def shard_pending(pending, n_shards):
+    """Round‑robin symbols (sorted by id) into n_shards dicts."""
+    shards = [{} for _ in range(n_shards)]
+    for i, symbol_id in enumerate(sorted(pending)):
+        shards[i % n_shards][symbol_id] = pending[symbol_id]
+    return [shard for shard in shards if shard]
+
+def run_parallel(pending, holidays, workers, store=True):
+    """Score `pending` on `workers` processes; returns results sorted by (symbolId, date)."""
+    shards = shard_pending(pending, workers)
+    if workers == 1:
+        _init_worker()
+        try:
+            parts = [_score_shard((shard, holidays, store)) for shard in shards]
+        finally:
+            _conn.close()
+    else:
+        with Pool(processes=workers, initializer=_init_worker) as pool:
+            parts = pool.map(_score_shard, [(shard, holidays, store) for shard in shards])
+    return sorted(row for part in parts for row in part)
+
+def fingerprint(results):
+    return hashlib.sha1(repr(results).encode()).hexdigest()[:12]
+
+def bench(pending, holidays, worker_counts):
+    print(f"{len(pending)} pending symbols\n")
+    print(f"{'Workers':>8}{'Seconds':>10}{'Speedup':>10}{'Scores':>10}  Results")
+    print("-" * 56)
+    baseline_time = baseline_fp = None
+    for workers in worker_counts:
+        t0 = time.perf_counter()
+        results = run_parallel(pending, holidays, workers, store=False)
+        elapsed = time.perf_counter() - t0
+        fp = fingerprint(results)
+        if baseline_time is None:
+            baseline_time, baseline_fp = elapsed, fp
+        same = "identical" if fp == baseline_fp else f"DIFFERENT ({fp})"
+        print(f"{workers:>8}{elapsed:>10.2f}{baseline_time / elapsed:>9.2f}x{len(results):>10}  {same}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel opening‑rebound scoring.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--bench", type=lambda s: [int(n) for n in s.split(",")],
+                        help="comma separated worker counts to time without writing, e.g. 1,2,4,8")
+    args = parser.parse_args()
+
+    pending, holidays = load_work()
+    if args.bench:
+        bench(pending, holidays, args.bench)
+        return
+
+    t0 = time.perf_counter()
+    results = run_parallel(pending, holidays, args.workers)
+    print(f"Stored {len(results)} scores for {len(pending)} symbols on "
+          f"{args.workers} workers in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
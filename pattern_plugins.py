@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+pattern_plugins.py
+Plugin framework for intraday pattern scores over the candle store.
+
+A pattern declares the session window it needs (e.g. 09:30–10:00) and a
+vectorized scoring function:
+
+    @register_pattern("my_pattern", "15:30", "16:00", ema_period=20)
+    def my_pattern(windows):
+        # windows: dict of (n_windows, n_bars) NaN‑padded arrays
+        #   'open', 'high', 'low', 'close', 'volume', 'VWAP', 'minute'
+        # plus 'counts' (bars per window), 'keys' [(symbolId, date), ...]
+        # and 'holidays' (set of market_holidays dates)
+        return np.ndarray of n_windows scores (NaN = no score)
+
+The driver loads each distinct window once per date chunk (the 09:30–10:00
+window from opening_windows, anything else sliced out of candle_sessions),
+runs every pattern registered for it in the same pass, and stores results
+in long format with a per‑pattern EMA.
+
+Tables used / created:
+  • opening_windows      – pre‑extracted 09:30–10:00 windows
+  • candle_sessions      – packed full sessions, for any other window
+  • pattern_scores_long  – (pattern, symbolId, date, score, ema)
+  • pattern_ema_state    – (pattern, symbolId, ema, last_score_date)
+"""
+
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+from candle_codec import decode_session
+from ema_engine import ema_step, ema_matrix
+from opening_windows import load_opening_windows, stack_windows, WINDOW_START, WINDOW_END
+from db import connect_to_db, executemany_batched, stream
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+BATCH_DAYS         = 30
+LOOKBACK_DAYS      = 200           # first run with no stored scores
+STALE_DAYS         = 10            # state this far behind a pattern's newest score doesn't hold back the resume date
+WRITE_CHUNK        = 5000
+FIELDS             = ("minute", "open", "high", "low", "close", "volume", "VWAP")
+# ────────────────────────────────────────────────────────────────────
+
+PATTERNS = {}
+
+# -------------------------------------------------------------------
+# 1. Registry
+# -------------------------------------------------------------------
+class Pattern:
+    def __init__(self, name, window_start, window_end, score_fn, ema_period):
+        self.name = name
+        self.window = (_minute_of_session(window_start), _minute_of_session(window_end))
+        self.score_fn = score_fn
+        self.alpha = 2 / (ema_period + 1)
+
+def _minute_of_session(hhmm):
+    t = datetime.strptime(hhmm, "%H:%M")
+    return (t.hour - 9) * 60 + t.minute - 30
+
+def register_pattern(name, window_start, window_end, ema_period=30):
+    """Decorator registering a vectorized scoring function for [window_start, window_end)."""
+    def decorator(fn):
+        if name in PATTERNS:
+            raise ValueError(f"Pattern '{name}' is already registered.")
+        PATTERNS[name] = Pattern(name, window_start, window_end, fn, ema_period)
+        return fn
+    return decorator
+
+# -------------------------------------------------------------------
+# 2. Built‑in patterns
+# -------------------------------------------------------------------
+@register_pattern("opening_rebound", "09:30", "10:00")
+def opening_rebound(windows):
+    from opening_rebound_score2 import score_windows, is_scoring_day
+    scores = score_windows(windows["open"], windows["low"], windows["close"], windows["counts"])
+    # Same days as pattern_scores / ema_scores: no Mondays, no market holidays
+    keep = np.array([is_scoring_day(day, windows["holidays"]) for _, day in windows["keys"]], dtype=bool)
+    return np.where(keep, scores, np.nan)
+
+@register_pattern("late_day_strength", "15:30", "16:00")
+def late_day_strength(windows):
+    """Close of the last half hour vs its open, scaled to 0–100 around 50 (±2 % = 0/100)."""
+    counts = windows["counts"]
+    last = np.maximum(counts - 1, 0)
+    open_px = windows["open"][:, 0]
+    close_px = windows["close"][np.arange(len(counts)), last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (close_px - open_px) / open_px * 100.0
+    score = np.clip(50.0 + pct * 25.0, 0.0, 100.0)
+    return np.where((counts >= 10) & (open_px > 0), score, np.nan)
+
+# -------------------------------------------------------------------
+# 3. Window loading
+# -------------------------------------------------------------------
+def load_session_windows(cur, start_date, end_date, window, symbol_ids=None):
+    """
+    Slice minutes [window[0], window[1]) out of every packed session (of
+    `symbol_ids`, if given) with session_date in [start_date, end_date), in
+    opening_windows' array layout.
+    """
+    lo, hi = window
+    width = hi - lo
+    query = """
+        SELECT symbolId, session_date, payload
+        FROM candle_sessions
+        WHERE session_date >= %s AND session_date < %s
+    """
+    params = [start_date, end_date]
+    if symbol_ids is not None:
+        query += f" AND symbolId IN ({', '.join(['%s'] * len(symbol_ids))})"
+        params.extend(symbol_ids)
+    keys, counts, columns = [], [], {name: [] for name in FIELDS}
+    for row in stream(cur.connection, query + " ORDER BY symbolId, session_date", params):
+        bars = decode_session(row["payload"])
+        sel = (bars["minute"] >= lo) & (bars["minute"] < hi)
+        keys.append((row["symbolId"], row["session_date"]))
+        counts.append(int(sel.sum()))
+        for name in FIELDS:
+            columns[name].append(bars[name][sel])
+    return stack_windows(keys, counts, columns, width)
+
+def _opening_window():
+    return (_minute_of_session(WINDOW_START.strftime("%H:%M")),
+            _minute_of_session(WINDOW_END.strftime("%H:%M")))
+
+def load_window(cur, start_date, end_date, window, symbol_ids=None):
+    if window == _opening_window():
+        return load_opening_windows(cur, start_date, end_date, symbol_ids)
+    return load_session_windows(cur, start_date, end_date, window, symbol_ids)
+
+# -------------------------------------------------------------------
+# 4. Persistence & EMAs
+# -------------------------------------------------------------------
+def load_state(cur):
+    """{(pattern, symbolId): (ema, last_score_date)}"""
+    cur.execute("SELECT pattern, symbolId, ema, last_score_date FROM pattern_ema_state")
+    return {(r["pattern"], r["symbolId"]): (r["ema"], r["last_score_date"]) for r in cur.fetchall()}
+
+def apply_emas(rows, state):
+    """
+    Fold new (pattern, symbolId, date, score) rows into the per‑pattern EMA
+    state in O(1) each. Returns (rows with ema appended, updated state rows).
+    """
+    out, touched = [], {}
+    for pattern, symbol_id, day, score in sorted(rows, key=lambda r: (r[0], r[1], r[2])):
+        ema, _ = touched.get((pattern, symbol_id), state.get((pattern, symbol_id), (None, None)))
+        ema = ema_step(ema, score, PATTERNS[pattern].alpha)
+        touched[(pattern, symbol_id)] = (ema, day)
+        out.append((pattern, symbol_id, day, score, ema))
+    return out, [(p, s, ema, day) for (p, s), (ema, day) in touched.items()]
+
+def store(conn, scored, states):
+    with conn.cursor() as cur:
+        executemany_batched(
+            cur,
+            """
+            INSERT INTO pattern_scores_long (pattern, symbolId, date, score, ema)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE score = VALUES(score), ema = VALUES(ema)
+            """,
+            scored,
+            WRITE_CHUNK,
+        )
+        cur.executemany(
+            """
+            INSERT INTO pattern_ema_state (pattern, symbolId, ema, last_score_date)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE ema = VALUES(ema), last_score_date = VALUES(last_score_date)
+            """,
+            states,
+        )
+    conn.commit()
+
+def rebuild_emas(conn, pattern):
+    """Recompute one pattern's EMA history from pattern_scores_long in one vectorized pass."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT symbolId, date, score FROM pattern_scores_long WHERE pattern = %s ORDER BY symbolId, date",
+            (pattern,),
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return
+    symbols = sorted({r["symbolId"] for r in rows})
+    dates = sorted({r["date"] for r in rows})
+    s_index = {s: i for i, s in enumerate(symbols)}
+    d_index = {d: j for j, d in enumerate(dates)}
+    scores = np.full((len(symbols), len(dates)), np.nan)
+    for r in rows:
+        scores[s_index[r["symbolId"]], d_index[r["date"]]] = r["score"]
+    emas = ema_matrix(scores, PATTERNS[pattern].alpha)
+
+    scored, states = [], {}
+    for r in rows:
+        ema = float(emas[s_index[r["symbolId"]], d_index[r["date"]]])
+        scored.append((pattern, r["symbolId"], r["date"], r["score"], ema))
+        states[r["symbolId"]] = (pattern, r["symbolId"], ema, r["date"])
+    store(conn, scored, list(states.values()))
+
+# -------------------------------------------------------------------
+# 5. Driver
+# -------------------------------------------------------------------
+def run(conn, start_date, end_date, names=None, symbol_ids=None):
+    """
+    Score every registered pattern (or `names`) for sessions in [start_date, end_date),
+    for every symbol (or `symbol_ids`), skipping (pattern, symbol, day) already
+    covered by the EMA state. Returns the number of scores stored.
+    """
+    patterns = [PATTERNS[n] for n in (names or PATTERNS)]
+    by_window = {}
+    for pattern in patterns:
+        by_window.setdefault(pattern.window, []).append(pattern)
+
+    with conn.cursor() as cur:
+        state = load_state(cur)
+        cur.execute("SELECT holiday_date FROM market_holidays")
+        holidays = {row["holiday_date"] for row in cur.fetchall()}
+
+    total = 0
+    chunk_start = start_date
+    while chunk_start < end_date:
+        chunk_end = min(chunk_start + timedelta(days=BATCH_DAYS), end_date)
+        rows = []
+        for window, group in by_window.items():
+            with conn.cursor() as cur:
+                windows = load_window(cur, chunk_start, chunk_end, window, symbol_ids)
+            windows["holidays"] = holidays
+            for pattern in group:
+                scores = pattern.score_fn(windows)
+                for (symbol_id, day), score in zip(windows["keys"], scores):
+                    last = state.get((pattern.name, symbol_id), (None, None))[1]
+                    if not np.isnan(score) and (last is None or day > last):
+                        rows.append((pattern.name, symbol_id, day, round(float(score), 2)))
+
+        scored, states = apply_emas(rows, state)
+        store(conn, scored, states)
+        for pattern, symbol_id, ema, day in states:
+            state[(pattern, symbol_id)] = (ema, day)
+        total += len(scored)
+        print(f"  {chunk_start} → {chunk_end - timedelta(days=1)}: {len(scored)} scores")
+        chunk_start = chunk_end
+    return total
+
+def resume_date(state, names):
+    """
+    First session the selected patterns still need: the day after the oldest
+    last_score_date among their active symbols. A symbol more than STALE_DAYS
+    behind its pattern's newest score (delisted, halted) doesn't hold the
+    start back; a pattern with no state starts LOOKBACK_DAYS ago, and nothing
+    starts earlier than that.
+    """
+    floor = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).date()
+    starts = []
+    for name in names:
+        days = [day for (pattern, _), (_, day) in state.items() if pattern == name and day]
+        if not days:
+            starts.append(floor)
+            continue
+        active = max(days) - timedelta(days=STALE_DAYS)
+        starts.append(min(day for day in days if day >= active) + timedelta(days=1))
+    return max(min(starts), floor)
+
+def unscored_symbols(cur, state, names, since):
+    """
+    {pattern: [symbolId, ...]} with windows stored since `since` but no EMA
+    state for that pattern yet – new symbols, backfilled on their own instead
+    of pulling every run's start date back.
+    """
+    stored, out = {}, {}
+    for name in names:
+        table = "opening_windows" if PATTERNS[name].window == _opening_window() else "candle_sessions"
+        if table not in stored:
+            cur.execute(f"SELECT DISTINCT symbolId FROM {table} WHERE session_date >= %s", (since,))
+            stored[table] = sorted(row["symbolId"] for row in cur.fetchall())
+        ids = [symbol_id for symbol_id in stored[table] if (name, symbol_id) not in state]
+        if ids:
+            out[name] = ids
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every registered intraday pattern over the candle store.")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="first session to score (default: where the EMA state left off, "
+                             f"or {LOOKBACK_DAYS} days ago)")
+    parser.add_argument("--pattern", action="append", choices=sorted(PATTERNS),
+                        help="only run this pattern (repeatable)")
+    parser.add_argument("--rebuild-ema", action="store_true",
+                        help="recompute the selected patterns' EMA history instead of scoring")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        if args.rebuild_ema:
+            for name in args.pattern or PATTERNS:
+                rebuild_emas(conn, name)
+                print(f"Rebuilt EMA history for {name}")
+            return
+        names = args.pattern or list(PATTERNS)
+        since, total = args.since, 0
+        if since is None:
+            floor = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).date()
+            with conn.cursor() as cur:
+                state = load_state(cur)
+                since = resume_date(state, names)
+                new = unscored_symbols(cur, state, names, floor) if since > floor else {}
+            conn.commit()
+            for name, symbol_ids in new.items():
+                print(f"▶ backfilling {name} for {len(symbol_ids)} new symbols from {floor}")
+                total += run(conn, floor, since, [name], symbol_ids)
+        print(f"▶ {', '.join(names)} from {since}")
+        total += run(conn, since, datetime.now().date() + timedelta(days=1), names)
+        print(f"Stored {total} pattern scores")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
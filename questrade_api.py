@@ -1,29 +1,25 @@
 #questrade_api.py
-import requests
+# requests is imported inside the methods that use it so scripts that only
+# touch the database don't pay for it at startup
 import time
 from datetime import datetime, timedelta
-from credentials import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+from db import connect_to_db
 import json
 import logging
-import pymysql
-from pymysql.cursors import DictCursor
 import os
+from urllib.parse import urlencode
 
 
 class QuestradeAPI:
-    def __init__(self, user_id=None):
+    def __init__(self, user_id=None, interactive=True):
         """
         Initialize the Questrade API with optional user_id.
         If user_id is None, will prompt for user selection.
+        With interactive=False nothing ever prompts: missing tokens or a failed
+        refresh raise instead (for worker threads).
         """
         # Connect to the database
-        self.db = pymysql.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE,
-            cursorclass=DictCursor
-        )
+        self.db = connect_to_db()         # pooled – db.close() hands it back
 
         self.cursor = self.db.cursor()
         self.user_id = user_id
@@ -31,6 +27,7 @@ class QuestradeAPI:
         self.refresh_token = None
         self.expires_at = None
         self.api_server = None
+        self.interactive = interactive
         
         # If no user_id provided, prompt for selection
         if self.user_id is None:
@@ -40,6 +37,8 @@ class QuestradeAPI:
 
         # If tokens are not loaded or expired, get initial tokens
         if not self.access_token or not self.refresh_token or not self.expires_at:
+            if not interactive:
+                raise Exception(f"No Questrade tokens for user_id {self.user_id}.")
             self.get_initial_tokens()
 
     def select_user(self):
@@ -89,6 +88,9 @@ class QuestradeAPI:
 
     def load_tokens(self):
         """Load the tokens and API server URL from the database for the current user."""
+        # End the current read snapshot first, otherwise a long-lived connection
+        # keeps seeing its old row and never picks up tokens other processes saved
+        self.db.commit()
         self.cursor.execute("SELECT * FROM qt_oauth WHERE user_id = %s", (self.user_id,))
         token_data = self.cursor.fetchone()
         if token_data:
@@ -131,6 +133,7 @@ class QuestradeAPI:
 
     def get_initial_tokens(self):
         """Prompt the user for an authorization code and exchange it for initial tokens."""
+        import requests
         self.cursor.execute("SELECT display_name FROM qt_users WHERE id = %s", (self.user_id,))
         user = self.cursor.fetchone()
         user_name = user['display_name'] if user else f"User {self.user_id}"
@@ -156,8 +159,36 @@ class QuestradeAPI:
         else:
             raise Exception("Failed to obtain tokens. Please check the authorization code and try again.")
 
-    def refresh_access_token(self):
-        """Refresh the access token using the refresh token. If refresh fails, prompt for new token."""
+    def refresh_access_token(self, interactive=True):
+        """
+        Refresh the access token using the refresh token. If refresh fails, prompt for new token
+        (or raise, when interactive is False).
+
+        Refreshes for a user are serialized with a MySQL named lock. Refresh tokens are
+        single-use, so whoever gets the lock second reloads and uses the token the first
+        one just saved instead of spending the (now dead) refresh token again. If the lock
+        can't be had and nobody has rotated the token meanwhile, this raises rather than
+        refreshing unlocked.
+        """
+        seen_refresh_token = self.refresh_token
+        lock_name, locked = self._acquire_oauth_lock()
+        try:
+            self.load_tokens()
+            if (self.refresh_token != seen_refresh_token
+                    and self.expires_at and datetime.now() < self.expires_at):
+                return
+            if not locked:
+                # Whoever holds the lock may be mid-refresh: never spend the
+                # single-use refresh token without it
+                raise Exception(f"Timed out waiting for the token refresh lock for user_id {self.user_id}.")
+            self._exchange_refresh_token(interactive)
+        finally:
+            if locked:
+                self._release_oauth_lock(lock_name)
+
+    def _exchange_refresh_token(self, interactive=True):
+        """POST the refresh token for a new pair; call with the OAuth lock held."""
+        import requests
         refresh_url = "https://login.questrade.com/oauth2/token"
         params = {
             "grant_type": "refresh_token",
@@ -178,6 +209,8 @@ class QuestradeAPI:
             print("\n⚠️  Refresh token has expired or is invalid.")
             print(f"Response Status Code: {response.status_code}")
             print(f"Response Text: {response.text}")
+            if not interactive:
+                raise Exception(f"Failed to refresh access token for user_id {self.user_id}.")
             
             # Get user name for the prompt
             self.cursor.execute("SELECT display_name FROM qt_users WHERE id = %s", (self.user_id,))
@@ -207,12 +240,13 @@ class QuestradeAPI:
 
     def make_request(self, endpoint):
         """Make a request to the Questrade API."""
+        import requests
         # RELOAD tokens from database before checking expiry
         self.load_tokens()
         
         # If the token is expired, refresh it before making the request
         if not self.expires_at or datetime.now() >= self.expires_at:
-            self.refresh_access_token()
+            self.refresh_access_token(self.interactive)
 
         headers = {
             "Authorization": f"Bearer {self.access_token}"
@@ -223,7 +257,7 @@ class QuestradeAPI:
         # If the access token is invalid, force a token refresh and retry the request
         if response.status_code == 401 and response.json().get("code") == 1017:
             print("Access token is invalid. Attempting to refresh...")
-            self.refresh_access_token()
+            self.refresh_access_token(self.interactive)
             headers["Authorization"] = f"Bearer {self.access_token}"
             response = requests.get(f"{self.api_server}/{endpoint}", headers=headers)
 
@@ -258,6 +292,12 @@ class QuestradeAPI:
         response = self.make_request(endpoint)
         return response
 
+    def activities_acct(self, account_number, start_time, end_time):
+        """Fetch activities for a given account number within a specified time range (max 31 days)."""
+        endpoint = f"v1/accounts/{account_number}/activities?{urlencode({'startTime': start_time, 'endTime': end_time})}"
+        response = self.make_request(endpoint)
+        return response
+
     def account_balance(self, account_type):
         """Get account balances for the account associated with the given account type."""
         account_number = self.get_account_number(account_type)
@@ -311,6 +351,11 @@ class QuestradeAPI:
         response = self.make_request(f"v1/accounts/{account_number}/positions")
         return response
     
+    def balances_acct(self, account_number):
+        """Retrieves balances in a specified account."""
+        response = self.make_request(f"v1/accounts/{account_number}/balances")
+        return response
+
     def accounts(self):
         """Retrieves the accounts associated with the user on behalf of which the API client is authorized."""        
         response = self.make_request(f"v1/accounts")
@@ -333,7 +378,7 @@ class QuestradeAPI:
         if end_time:
             params["endTime"] = end_time
 
-        response = self.make_request(f"{endpoint}?{requests.compat.urlencode(params)}")
+        response = self.make_request(f"{endpoint}?{urlencode(params)}")
         return response
     
     def get_quote(self, symbol_id):
@@ -345,7 +390,18 @@ class QuestradeAPI:
         endpoint = f"v1/markets/quotes/{symbol_id}"
         response = self.make_request(endpoint)
         return response
-    
+
+    def get_quotes(self, symbol_ids):
+        """
+        Fetch real-time market quotes for several symbols in one request.
+        :param symbol_ids: Iterable of symbol IDs.
+        :return: The JSON response from the Questrade API ({'quotes': [...]}).
+        """
+        ids = ",".join(str(symbol_id) for symbol_id in symbol_ids)
+        endpoint = f"v1/markets/quotes?ids={ids}"
+        response = self.make_request(endpoint)
+        return response
+
     def search_symbols(self, prefix):
         """
         Search for symbols using a keyword or prefix.
@@ -366,6 +422,21 @@ class QuestradeAPI:
         response = self.make_request(endpoint)
         return response
     
+    def get_symbols_info(self, symbol_ids, batch_size=100):
+        """
+        Fetch detailed information for many symbols with as few requests as possible.
+        :param symbol_ids: Iterable of symbol IDs.
+        :param batch_size: Symbol IDs per request (keeps the URL a sane length).
+        :return: A list of symbol dicts, as in the 'symbols' list of get_symbol_info.
+        """
+        symbol_ids = list(symbol_ids)
+        symbols = []
+        for i in range(0, len(symbol_ids), batch_size):
+            ids = ",".join(str(symbol_id) for symbol_id in symbol_ids[i:i + batch_size])
+            response = self.make_request(f"v1/symbols?ids={ids}")
+            symbols.extend(response.get('symbols', []))
+        return symbols
+
     def get_security_data(self, symbol_id, retries=3):
         for attempt in range(retries):
             try:
@@ -521,4 +592,21 @@ class QuestradeAPI:
         except Exception as e:
             logging.error(f"Error in resume_progress for {script_name} ({operation}): {e}")
             self.db.rollback()
-            raise
\ No newline at end of file
+            raise
+
+
+class LazyQuestradeAPI:
+    """
+    Drop-in stand-in for QuestradeAPI that defers construction (DB connection,
+    token load, possible auth-code prompt) until an attribute is first used.
+        qt = LazyQuestradeAPI(user_id=1)   # free at import time
+        qt.get_quote(12345)                # QuestradeAPI(user_id=1) built here
+    """
+    def __init__(self, user_id=None):
+        self._user_id = user_id
+        self._client = None
+
+    def __getattr__(self, name):
+        if self._client is None:
+            self._client = QuestradeAPI(user_id=self._user_id)
+        return getattr(self._client, name)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+rebound_backtest.py
+Parameter sweep for the opening‑rebound score.
+
+Loads the opening windows and daily closes once, then for every parameter
+set in PARAM_GRID (drop window, linger cap, the three weights, EMA period)
+computes each symbol's daily score and its EMA and measures how well the
+EMA as of a day's close ranks the forward return over the next
+FORWARD_SESSIONS sessions:
+  • mean_ic            – mean daily Spearman rank correlation (signal vs forward return)
+  • top_decile_return  – mean forward return of the top 10 % of symbols by signal
+  • top_decile_hit     – share of those with a positive forward return
+Weights and linger caps are broadcast together over all windows (PARAM_CHUNK
+sets at a time); only the drop window and EMA period need separate passes.
+
+Tables used / created:
+  • opening_windows          – pre‑extracted 09:30–10:00 windows
+  • candle_rollups           – daily (390‑minute) bars for forward returns
+  • rebound_backtest_results – one ranked row per parameter set per run
+"""
+
+import argparse
+import itertools
+import warnings
+import numpy as np
+from datetime import datetime, timedelta
+from opening_windows import load_opening_windows
+from ema_engine import ema_matrix
+from opening_rebound_score2 import window_components
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+PARAM_GRID = {
+    "drop_window":  [5, 10, 15],
+    "max_linger":   [5, 10, 15],
+    "weights":      [            # (DROP, RECO, LINGER)
+        (0.5, 0.3, 0.2),
+        (0.4, 0.4, 0.2),
+        (0.6, 0.2, 0.2),
+        (0.3, 0.5, 0.2),
+        (0.5, 0.4, 0.1),
+        (0.4, 0.3, 0.3),
+    ],
+    "ema_period":   [10, 20, 30],
+}
+FORWARD_SESSIONS     = 1
+LOOKBACK_DAYS        = 180
+MIN_SYMBOLS_PER_DAY  = 20       # days with fewer ranked symbols are ignored
+PARAM_CHUNK          = 9        # parameter sets broadcast together (bounds memory)
+DAILY_TIMEFRAME      = 390
+# ────────────────────────────────────────────────────────────────────
+
+# -------------------------------------------------------------------
+# 1. Data
+# -------------------------------------------------------------------
+def load_daily_closes(cur, start_date, end_date):
+    """Return (symbols, dates, closes[S, D]) from the daily rollups."""
+    cur.execute(
+        """
+        SELECT symbolId, start, close
+        FROM candle_rollups
+        WHERE timeframe = %s AND start >= %s AND start < %s
+        """,
+        (DAILY_TIMEFRAME, start_date, end_date),
+    )
+    rows = cur.fetchall()
+    symbols = sorted({r["symbolId"] for r in rows})
+    dates = sorted({r["start"].date() for r in rows})
+    s_index = {s: i for i, s in enumerate(symbols)}
+    d_index = {d: j for j, d in enumerate(dates)}
+    closes = np.full((len(symbols), len(dates)), np.nan)
+    for r in rows:
+        closes[s_index[r["symbolId"]], d_index[r["start"].date()]] = r["close"]
+    return symbols, dates, closes
+
+def forward_returns(closes, horizon=FORWARD_SESSIONS):
+    fwd = np.full(closes.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fwd[:, :-horizon] = closes[:, horizon:] / closes[:, :-horizon] - 1
+    return fwd
+
+# -------------------------------------------------------------------
+# 2. Evaluation
+# -------------------------------------------------------------------
+def _ranks(x, mask):
+    """Ordinal ranks along axis 1 among masked entries, NaN elsewhere."""
+    r = np.argsort(np.argsort(np.where(mask, x, np.inf), axis=1), axis=1).astype(np.float64)
+    r[~mask] = np.nan
+    return r
+
+def evaluate(signal, fwd):
+    """
+    signal: (P, S, D) EMA signal per parameter set; fwd: (S, D) forward returns.
+    Returns a dict of (P,) metric arrays.
+    """
+    mask = ~np.isnan(signal) & ~np.isnan(fwd)[None, :, :]
+    n = mask.sum(axis=1)                                   # (P, D)
+    day_ok = n >= MIN_SYMBOLS_PER_DAY
+    f = np.broadcast_to(fwd[None, :, :], signal.shape)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        rs = _ranks(signal, mask)
+        rf = _ranks(f, mask)
+        rs -= np.nanmean(rs, axis=1, keepdims=True)
+        rf -= np.nanmean(rf, axis=1, keepdims=True)
+        ic = np.nansum(rs * rf, axis=1) / np.sqrt(np.nansum(rs ** 2, axis=1) * np.nansum(rf ** 2, axis=1))
+        ic = np.where(day_ok, ic, np.nan)
+
+        threshold = np.nanpercentile(np.where(mask, signal, np.nan), 90, axis=1, keepdims=True)
+        top = mask & (signal >= threshold)
+        top_n = top.sum(axis=1)
+        top_ret = np.where(day_ok, np.sum(np.where(top, f, 0.0), axis=1) / top_n, np.nan)
+        top_hit = np.where(day_ok, np.sum(top & (f > 0), axis=1) / top_n, np.nan)
+        universe = np.where(day_ok, np.sum(np.where(mask, f, 0.0), axis=1) / n, np.nan)
+
+        return {
+            "n_days": day_ok.sum(axis=1),
+            "mean_ic": np.nanmean(ic, axis=1),
+            "top_decile_return": np.nanmean(top_ret, axis=1),
+            "top_decile_hit": np.nanmean(top_hit, axis=1),
+            "universe_return": np.nanmean(universe, axis=1),
+        }
+
+def run_sweep(windows, symbols, dates, fwd, holidays, grid=PARAM_GRID):
+    """Evaluate every parameter set in `grid`; returns a list of result dicts."""
+    s_index = {s: i for i, s in enumerate(symbols)}
+    d_index = {d: j for j, d in enumerate(dates)}
+
+    # Map each window onto the (symbol, date) axes once; drop the ones we can't score
+    keep, s_idx, d_idx = [], [], []
+    for i, (symbol_id, day) in enumerate(windows["keys"]):
+        if symbol_id in s_index and day in d_index and day.weekday() != 0 and day not in holidays:
+            keep.append(i)
+            s_idx.append(s_index[symbol_id])
+            d_idx.append(d_index[day])
+    keep, s_idx, d_idx = np.array(keep, dtype=np.int64), np.array(s_idx), np.array(d_idx)
+    open_, low, close = windows["open"][keep], windows["low"][keep], windows["close"][keep]
+    counts = windows["counts"][keep]
+
+    inner = list(itertools.product(grid["max_linger"], grid["weights"]))
+    results = []
+    for drop_window in grid["drop_window"]:
+        valid, pct_drop, pct_reco, linger = window_components(open_, low, close, counts, drop_window)
+
+        for lo in range(0, len(inner), PARAM_CHUNK):
+            part = inner[lo:lo + PARAM_CHUNK]
+            caps = np.array([cap for cap, _ in part], dtype=np.float64)[:, None]
+            w = np.array([weights for _, weights in part], dtype=np.float64)
+
+            lin = np.minimum(linger[None, :], caps)
+            raw = (
+                w[:, 0:1] * pct_drop[None, :] +
+                w[:, 1:2] * pct_reco[None, :] +
+                w[:, 2:3] * (1 - lin / caps) * 100
+            )
+            raw = np.where(valid[None, :], np.clip(raw, 0.0, 100.0), np.nan)
+
+            scores = np.full((len(part), len(symbols), len(dates)), np.nan)
+            scores[:, s_idx, d_idx] = raw
+            flat = scores.reshape(len(part) * len(symbols), len(dates))
+
+            for ema_period in grid["ema_period"]:
+                signal = ema_matrix(flat, 2 / (ema_period + 1)).reshape(scores.shape)
+                metrics = evaluate(signal, fwd)
+                for p, (cap, (wd, wr, wl)) in enumerate(part):
+                    results.append({
+                        "drop_window": drop_window, "max_linger": cap, "drop_weight": wd,
+                        "reco_weight": wr, "linger_weight": wl, "ema_period": ema_period,
+                        **{name: float(values[p]) for name, values in metrics.items()},
+                    })
+    return results
+
+# -------------------------------------------------------------------
+# 3. Results
+# -------------------------------------------------------------------
+def store_results(conn, results, run_at, forward_sessions):
+    with conn.cursor() as cur:
+        cur.executemany(
+            """
+            INSERT INTO rebound_backtest_results (
+                run_at, rank_no, drop_window, max_linger, drop_weight, reco_weight,
+                linger_weight, ema_period, forward_sessions, n_days, mean_ic,
+                top_decile_return, top_decile_hit, universe_return
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [
+                (run_at, rank, r["drop_window"], r["max_linger"], r["drop_weight"], r["reco_weight"],
+                 r["linger_weight"], r["ema_period"], forward_sessions, r["n_days"],
+                 _null(r["mean_ic"]), _null(r["top_decile_return"]), _null(r["top_decile_hit"]),
+                 _null(r["universe_return"]))
+                for rank, r in enumerate(results, start=1)
+            ],
+        )
+    conn.commit()
+
+def _null(x):
+    return None if np.isnan(x) else x
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest a grid of opening‑rebound parameters.")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        default=(datetime.now() - timedelta(days=LOOKBACK_DAYS)).date(),
+                        help=f"first session to include (default: {LOOKBACK_DAYS} days ago)")
+    parser.add_argument("--forward", type=int, default=FORWARD_SESSIONS,
+                        help="forward return horizon in sessions")
+    parser.add_argument("--rank-by", default="mean_ic",
+                        choices=["mean_ic", "top_decile_return", "top_decile_hit"])
+    args = parser.parse_args()
+    end = datetime.now().date() + timedelta(days=1)
+
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            windows = load_opening_windows(cur, args.since, end, fields=("open", "low", "close"))
+            symbols, dates, closes = load_daily_closes(cur, args.since, end)
+            cur.execute("SELECT holiday_date FROM market_holidays")
+            holidays = {row["holiday_date"] for row in cur.fetchall()}
+        print(f"{len(windows['keys'])} windows, {len(symbols)} symbols, {len(dates)} sessions")
+
+        results = run_sweep(windows, symbols, dates, forward_returns(closes, args.forward), holidays)
+        results.sort(key=lambda r: -np.inf if np.isnan(r[args.rank_by]) else r[args.rank_by], reverse=True)
+        store_results(conn, results, datetime.now().replace(microsecond=0), args.forward)
+    finally:
+        conn.close()
+
+    print(f"\n{'#':>3} {'Drop':>5}{'Linger':>7}{'Weights':>17}{'EMA':>5}{'IC':>8}{'Top10%':>9}{'Hit':>7}")
+    for rank, r in enumerate(results[:15], start=1):
+        weights = f"{r['drop_weight']:.1f}/{r['reco_weight']:.1f}/{r['linger_weight']:.1f}"
+        print(f"{rank:>3} {r['drop_window']:>5}{r['max_linger']:>7.0f}{weights:>17}{r['ema_period']:>5}"
+              f"{r['mean_ic']:>8.3f}{r['top_decile_return'] * 100:>8.2f}%{r['top_decile_hit'] * 100:>6.1f}%")
+
+if __name__ == "__main__":
+    main()
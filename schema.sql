@@ -15,6 +15,21 @@
 /*!40101 SET @OLD_SQL_MODE=@@SQL_MODE, SQL_MODE='NO_AUTO_VALUE_ON_ZERO' */;
 /*!40111 SET @OLD_SQL_NOTES=@@SQL_NOTES, SQL_NOTES=0 */;
 
+--
+-- Table structure for table `activity_sync_state`
+--
+
+DROP TABLE IF EXISTS `activity_sync_state`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `activity_sync_state` (
+  `account_number` varchar(50) NOT NULL,
+  `synced_through` datetime NOT NULL,
+  `last_run` datetime DEFAULT NULL,
+  PRIMARY KEY (`account_number`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `api_keys`
 --
@@ -31,6 +46,83 @@ CREATE TABLE `api_keys` (
 ) ENGINE=InnoDB AUTO_INCREMENT=2 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `candle_coverage`
+--
+
+DROP TABLE IF EXISTS `candle_coverage`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `candle_coverage` (
+  `symbolId` int NOT NULL,
+  `session_date` date NOT NULL,
+  `status` enum('fetched','partial','empty','failed') NOT NULL,
+  `attempts` int NOT NULL DEFAULT '1',
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`symbolId`,`session_date`),
+  KEY `session_status` (`session_date`,`status`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `candle_rollups`
+--
+
+DROP TABLE IF EXISTS `candle_rollups`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `candle_rollups` (
+  `symbolId` int NOT NULL,
+  `timeframe` smallint NOT NULL,
+  `start` datetime NOT NULL,
+  `end` datetime NOT NULL,
+  `open` float NOT NULL,
+  `high` float NOT NULL,
+  `low` float NOT NULL,
+  `close` float NOT NULL,
+  `volume` bigint NOT NULL,
+  `VWAP` float NOT NULL,
+  `bar_count` smallint NOT NULL,
+  PRIMARY KEY (`symbolId`,`timeframe`,`start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `candle_sessions`
+--
+
+DROP TABLE IF EXISTS `candle_sessions`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `candle_sessions` (
+  `symbolId` int NOT NULL,
+  `session_date` date NOT NULL,
+  `n_bars` smallint NOT NULL,
+  `price_scale` int NOT NULL,
+  `payload` mediumblob NOT NULL,
+  PRIMARY KEY (`symbolId`,`session_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci ROW_FORMAT=COMPRESSED;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `candle_watermarks`
+--
+
+DROP TABLE IF EXISTS `candle_watermarks`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `candle_watermarks` (
+  `symbolId` int NOT NULL,
+  `first_bar` datetime DEFAULT NULL,
+  `last_bar` datetime DEFAULT NULL,
+  `last_attempt` datetime DEFAULT NULL,
+  `consecutive_empty_days` int NOT NULL DEFAULT '0',
+  `skip_until` datetime DEFAULT NULL,
+  PRIMARY KEY (`symbolId`),
+  CONSTRAINT `candle_watermarks_ibfk_1` FOREIGN KEY (`symbolId`) REFERENCES `qt_securities` (`symbolId`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `candlestick_data`
 --
@@ -51,6 +143,7 @@ CREATE TABLE `candlestick_data` (
   `VWAP` float NOT NULL,
   PRIMARY KEY (`id`),
   KEY `candlestick_data_ibfk_1` (`symbolID`),
+  UNIQUE KEY `symbol_start` (`symbolID`,`start`),
   CONSTRAINT `candlestick_data_ibfk_1` FOREIGN KEY (`symbolID`) REFERENCES `qt_securities` (`symbolId`)
 ) ENGINE=InnoDB AUTO_INCREMENT=35318884 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -65,13 +158,69 @@ DROP TABLE IF EXISTS `div_freq`;
 CREATE TABLE `div_freq` (
   `id` int NOT NULL AUTO_INCREMENT,
   `symbol` varchar(20) NOT NULL,
-  `frequency` enum('monthly','quarterly','annually') NOT NULL,
+  `frequency` enum('monthly','quarterly','semi-annually','annually') NOT NULL,
   `last_updated` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   UNIQUE KEY `symbol` (`symbol`)
 ) ENGINE=InnoDB AUTO_INCREMENT=112 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `div_freq_failures`
+--
+
+DROP TABLE IF EXISTS `div_freq_failures`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `div_freq_failures` (
+  `symbol` varchar(20) NOT NULL,
+  `attempts` int NOT NULL DEFAULT '1',
+  `last_error` varchar(255) DEFAULT NULL,
+  `last_attempt` datetime NOT NULL,
+  `retry_after` datetime NOT NULL,
+  PRIMARY KEY (`symbol`),
+  KEY `retry_after` (`retry_after`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `dividend_projections`
+--
+
+DROP TABLE IF EXISTS `dividend_projections`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `dividend_projections` (
+  `fingerprint` char(40) NOT NULL,
+  `as_of` date NOT NULL,
+  `computed_at` datetime NOT NULL,
+  `payload` mediumtext NOT NULL,
+  PRIMARY KEY (`fingerprint`),
+  KEY `as_of` (`as_of`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `ema_leaderboard`
+--
+
+DROP TABLE IF EXISTS `ema_leaderboard`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ema_leaderboard` (
+  `symbolId` int NOT NULL,
+  `symbol` varchar(15) DEFAULT NULL,
+  `description` varchar(100) DEFAULT NULL,
+  `ema_score` float NOT NULL,
+  `last_score_date` date DEFAULT NULL,
+  `lastTradePrice` decimal(10,2) DEFAULT NULL,
+  `averageVol3Months` int DEFAULT NULL,
+  `refreshed_at` datetime NOT NULL,
+  PRIMARY KEY (`symbolId`),
+  KEY `ema_score` (`ema_score`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `ema_scores`
 --
@@ -83,6 +232,7 @@ CREATE TABLE `ema_scores` (
   `id` int NOT NULL AUTO_INCREMENT,
   `symbolId` int DEFAULT NULL,
   `ema_score` float NOT NULL,
+  `last_score_date` date DEFAULT NULL,
   `last_updated` datetime NOT NULL,
   PRIMARY KEY (`id`),
   UNIQUE KEY `security_id` (`symbolId`)
@@ -141,6 +291,39 @@ CREATE TABLE `monitor_settings` (
 ) ENGINE=InnoDB AUTO_INCREMENT=119 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `opening_windows`
+--
+
+DROP TABLE IF EXISTS `opening_windows`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `opening_windows` (
+  `symbolId` int NOT NULL,
+  `session_date` date NOT NULL,
+  `n_bars` smallint NOT NULL,
+  `payload` blob NOT NULL,
+  PRIMARY KEY (`symbolId`,`session_date`),
+  KEY `session_date` (`session_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `pattern_ema_state`
+--
+
+DROP TABLE IF EXISTS `pattern_ema_state`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `pattern_ema_state` (
+  `pattern` varchar(50) NOT NULL,
+  `symbolId` int NOT NULL,
+  `ema` float NOT NULL,
+  `last_score_date` date NOT NULL,
+  PRIMARY KEY (`pattern`,`symbolId`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `pattern_scores`
 --
@@ -159,6 +342,24 @@ CREATE TABLE `pattern_scores` (
 ) ENGINE=InnoDB AUTO_INCREMENT=491433 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `pattern_scores_long`
+--
+
+DROP TABLE IF EXISTS `pattern_scores_long`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `pattern_scores_long` (
+  `pattern` varchar(50) NOT NULL,
+  `symbolId` int NOT NULL,
+  `date` date NOT NULL,
+  `score` float NOT NULL,
+  `ema` float DEFAULT NULL,
+  PRIMARY KEY (`pattern`,`symbolId`,`date`),
+  KEY `pattern_date` (`pattern`,`date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `qt_accounts`
 --
@@ -178,6 +379,38 @@ CREATE TABLE `qt_accounts` (
 ) ENGINE=InnoDB AUTO_INCREMENT=6 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `qt_activities`
+--
+
+DROP TABLE IF EXISTS `qt_activities`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `qt_activities` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `row_hash` char(40) NOT NULL,
+  `account_number` varchar(50) NOT NULL,
+  `tradeDate` datetime DEFAULT NULL,
+  `transactionDate` datetime DEFAULT NULL,
+  `settlementDate` datetime DEFAULT NULL,
+  `action` varchar(50) DEFAULT NULL,
+  `symbol` varchar(20) DEFAULT NULL,
+  `symbolId` int DEFAULT NULL,
+  `description` varchar(255) DEFAULT NULL,
+  `currency` varchar(3) DEFAULT NULL,
+  `quantity` decimal(18,6) DEFAULT NULL,
+  `price` decimal(18,6) DEFAULT NULL,
+  `grossAmount` decimal(14,4) DEFAULT NULL,
+  `commission` decimal(14,4) DEFAULT NULL,
+  `netAmount` decimal(14,4) DEFAULT NULL,
+  `type` varchar(50) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `row_hash` (`row_hash`),
+  KEY `account_date` (`account_number`,`transactionDate`),
+  KEY `type_symbol` (`type`,`symbol`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `qt_oauth`
 --
@@ -249,7 +482,9 @@ CREATE TABLE `qt_securities` (
   `isTradable` tinyint(1) DEFAULT NULL,
   `isQuotable` tinyint(1) DEFAULT NULL,
   `currency` varchar(3) DEFAULT NULL,
-  PRIMARY KEY (`symbolId`)
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`symbolId`),
+  KEY `updated_at` (`updated_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -272,6 +507,34 @@ CREATE TABLE `qt_users` (
 ) ENGINE=InnoDB AUTO_INCREMENT=3 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `rebound_backtest_results`
+--
+
+DROP TABLE IF EXISTS `rebound_backtest_results`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `rebound_backtest_results` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `run_at` datetime NOT NULL,
+  `rank_no` int NOT NULL,
+  `drop_window` int NOT NULL,
+  `max_linger` int NOT NULL,
+  `drop_weight` float NOT NULL,
+  `reco_weight` float NOT NULL,
+  `linger_weight` float NOT NULL,
+  `ema_period` int NOT NULL,
+  `forward_sessions` int NOT NULL,
+  `n_days` int NOT NULL,
+  `mean_ic` float DEFAULT NULL,
+  `top_decile_return` float DEFAULT NULL,
+  `top_decile_hit` float DEFAULT NULL,
+  `universe_return` float DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `run_rank` (`run_at`,`rank_no`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `resume_info`
 --
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+screener.py
+In‑memory, columnar snapshot of qt_securities (plus ema_scores.ema_score and
+div_freq.frequency) as NumPy arrays, for filtering and sorting the whole
+universe without a query per screen.
+
+  s = Screener().load(conn)
+  mask = (s["yield"] > 5) & (s["exDate"] > s.days_ago(180)) & (s["frequency"] == "monthly")
+  rows = s.select(mask, order_by="-yield", limit=20)
+  rows = s.select(s.mask("ema_score >= 20", "lastTradePrice >= 0.12"), order_by="-ema_score")
+
+refresh(conn) only pulls rows changed since the last load: qt_securities by
+its updated_at column, ema_scores and div_freq by last_updated. Rows are
+upserted by symbolId; deletions need a full load(). On an existing database:
+
+  ALTER TABLE qt_securities
+    ADD COLUMN updated_at timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD KEY updated_at (updated_at);
+
+Tables used:
+  • qt_securities         – one row per security (updated_at drives refresh)
+  • ema_scores            – ema_score per symbolId
+  • div_freq              – frequency per symbol
+
+  python screener.py --where "yield > 6" --where "frequency == monthly" --order -yield
+  python screener.py --bench                 # filter+sort timing on the loaded universe
+  python screener.py --bench --synthetic 20000
+"""
+
+import argparse
+import re
+import statistics
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+NUMERIC            = (
+    "bidPrice", "askPrice", "lastTradePrice", "prevDayClosePrice", "openPrice", "highPrice", "lowPrice",
+    "volume", "averageVol3Months", "averageVol20Days", "high52w", "low52w", "VWAP",
+    "eps", "pe", "dividend", "yield", "marketCap", "outstandingShares", "isTradable", "isQuotable",
+)
+DATES              = ("exDate", "dividendDate", "lastTradeTime")
+TEXT               = ("symbol", "description", "currency", "listingExchange", "securityType")
+DISPLAY            = ("symbol", "description", "lastTradePrice", "yield", "dividend", "exDate",
+                      "frequency", "ema_score", "averageVol3Months")
+# ────────────────────────────────────────────────────────────────────
+
+def _floats(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+def _dates(values):
+    return np.array([np.datetime64(v, "s") if v else np.datetime64("NaT") for v in values], dtype="datetime64[s]")
+
+def _texts(values):
+    # Fixed‑width unicode, not object: == / isin on these run in C
+    return np.array([v or "" for v in values], dtype=str) if values else np.array([], dtype="U1")
+
+CLAUSE = re.compile(r"^\s*(\w+)\s*(>=|<=|==|!=|>|<|in)\s*(.+?)\s*$")
+
+class Screener:
+    """Column arrays aligned on row position; self.index maps symbolId → row."""
+
+    def __init__(self):
+        self.columns = {}
+        self.index = {}
+        self.ema = {}              # symbolId -> ema_score
+        self.frequency = {}        # symbol -> frequency
+        self.marks = {"qt_securities": None, "ema_scores": None, "div_freq": None}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    # ---------------------------------------------------------------
+    # Loading
+    # ---------------------------------------------------------------
+    def load(self, conn):
+        """Full snapshot."""
+        self.__init__()
+        return self.refresh(conn)
+
+    def refresh(self, conn):
+        """Pull rows changed since the previous load/refresh; returns self."""
+        with conn.cursor() as cur:
+            securities = self._changed(cur, "qt_securities", "updated_at",
+                                       ["symbolId", "updated_at", *TEXT, *NUMERIC, *DATES])
+            emas = self._changed(cur, "ema_scores", "last_updated", ["symbolId", "ema_score", "last_updated"])
+            frequencies = self._changed(cur, "div_freq", "last_updated", ["symbol", "frequency", "last_updated"])
+        conn.commit()              # end the read snapshot so the next refresh sees new writes
+        self.apply(securities, emas, frequencies)
+        return self
+
+    def _changed(self, cur, table, mark_column, columns):
+        query = f"SELECT {', '.join(f'`{c}`' for c in columns)} FROM {table}"
+        params = []
+        if self.marks[table] is not None:
+            query += f" WHERE `{mark_column}` >= %s"      # >=: rows written in the same second as the mark
+            params.append(self.marks[table])
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        stamps = [row[mark_column] for row in rows if row[mark_column] is not None]
+        if stamps:
+            self.marks[table] = max(stamps)
+        return rows
+
+    def apply(self, securities=(), emas=(), frequencies=()):
+        """Upsert qt_securities rows (dicts) by symbolId and fold in EMA / frequency rows."""
+        new = [row for row in securities if row["symbolId"] not in self.index]
+        old = [row for row in securities if row["symbolId"] in self.index]
+
+        if old:
+            rows = np.array([self.index[row["symbolId"]] for row in old], dtype=np.int64)
+            for name, values in self._convert(old).items():
+                self._assign(name, rows, values)
+        if new:
+            start = len(self.index)
+            for i, row in enumerate(new):
+                self.index[row["symbolId"]] = start + i
+            for name, values in self._convert(new).items():
+                column = self.columns.get(name)
+                self.columns[name] = values if column is None else np.concatenate([column, values])
+
+        self.ema.update({row["symbolId"]: row["ema_score"] for row in emas})
+        self.frequency.update({row["symbol"]: row["frequency"] for row in frequencies})
+        if "symbolId" not in self.columns:
+            return self
+        if new or emas or frequencies:
+            self.columns["ema_score"] = _floats([self.ema.get(i) for i in self.columns["symbolId"]])
+            self.columns["frequency"] = _texts([self.frequency.get(s) for s in self.columns["symbol"]])
+        elif old:
+            self._assign("frequency", rows, _texts([self.frequency.get(row["symbol"]) for row in old]))
+        return self
+
+    def _assign(self, name, rows, values):
+        column = self.columns[name]
+        if column.dtype.kind == "U" and values.dtype.itemsize > column.dtype.itemsize:
+            column = self.columns[name] = column.astype(values.dtype)      # widen before a longer string
+        column[rows] = values
+
+    @staticmethod
+    def _convert(rows):
+        columns = {"symbolId": np.array([row["symbolId"] for row in rows], dtype=np.int64)}
+        for name in NUMERIC:
+            columns[name] = _floats([row.get(name) for row in rows])
+        for name in DATES:
+            columns[name] = _dates([row.get(name) for row in rows])
+        for name in TEXT:
+            columns[name] = _texts([row.get(name) for row in rows])
+        return columns
+
+    # ---------------------------------------------------------------
+    # Screening
+    # ---------------------------------------------------------------
+    @staticmethod
+    def days_ago(days):
+        return np.datetime64(datetime.now() - timedelta(days=days), "s")
+
+    def _value(self, name, text):
+        if self.columns[name].dtype.kind == "M":
+            if text.startswith("-") and text.endswith("d"):
+                return self.days_ago(int(text[1:-1]))
+            return np.datetime64(text, "s")
+        if self.columns[name].dtype.kind == "U":
+            return text.strip("'\"")
+        return float(text)
+
+    def mask(self, *clauses):
+        """AND of 'column op value' clauses (op: > >= < <= == != in). Dates take '-180d' or 'YYYY-MM-DD'."""
+        result = np.ones(len(self), dtype=bool)
+        for clause in clauses:
+            match = CLAUSE.match(clause)
+            if not match or match[1] not in self.columns:
+                raise ValueError(f"can't screen on {clause!r}")
+            name, op, text = match.groups()
+            column = self.columns[name]
+            if op == "in":
+                result &= np.isin(column, [self._value(name, v.strip()) for v in text.split(",")])
+                continue
+            value = self._value(name, text)
+            result &= {
+                ">": column > value, ">=": column >= value, "<": column < value,
+                "<=": column <= value, "==": column == value, "!=": column != value,
+            }[op]
+        return result
+
+    def select(self, mask=None, order_by=None, limit=None, columns=None):
+        """
+        Rows where `mask` holds, as dicts, sorted by `order_by` ('-col' for
+        descending; NaN/NaT always last) and cut to `limit`.
+        """
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if order_by:
+            descending = order_by.startswith("-")
+            values = self.columns[order_by.lstrip("-")][rows]
+            if values.dtype.kind == "U":
+                order = np.argsort(values, kind="stable")
+                order = order[::-1] if descending else order
+            else:
+                key = values.astype(np.float64)
+                if values.dtype.kind == "M":
+                    key[np.isnat(values)] = np.nan
+                key = -key if descending else key
+                key[np.isnan(key)] = np.inf
+                if limit is not None and limit < len(key):
+                    # Only the top `limit` need ordering
+                    top = np.argpartition(key, limit)[:limit]
+                    order = top[np.argsort(key[top], kind="stable")]
+                else:
+                    order = np.argsort(key, kind="stable")
+            rows = rows[order]
+        if limit is not None:
+            rows = rows[:limit]
+
+        names = columns or list(self.columns)
+        values = []
+        for name in names:
+            column = self.columns[name][rows]
+            items = column.tolist()                   # datetime64[s] → datetime / None, U → str
+            if column.dtype.kind == "f":
+                items = [None if v != v else v for v in items]
+            values.append(items)
+        return [dict(zip(names, record)) for record in zip(*values)]
+
+# -------------------------------------------------------------------
+# Benchmark
+# -------------------------------------------------------------------
+def synthetic(n, seed=0):
+    """A random universe of n securities (no database needed)."""
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    securities = [
+        {
+            "symbolId": i, "symbol": f"S{i}", "description": f"Security {i}", "currency": "CAD",
+            "lastTradePrice": float(rng.uniform(0.05, 300)), "yield": float(rng.uniform(0, 15)),
+            "dividend": float(rng.uniform(0, 2)), "averageVol3Months": int(rng.integers(0, 2_000_000)),
+            "exDate": now - timedelta(days=int(rng.integers(0, 400))),
+        }
+        for i in range(n)
+    ]
+    emas = [{"symbolId": i, "ema_score": float(rng.uniform(-50, 80))} for i in range(0, n, 2)]
+    frequencies = [{"symbol": f"S{i}", "frequency": rng.choice(["monthly", "quarterly"])} for i in range(0, n, 3)]
+    return Screener().apply(securities, emas, frequencies)
+
+def bench(screener, runs=200):
+    screens = {
+        "dividend picker": (lambda s: (s["yield"] > 0) & (s["exDate"] > s.days_ago(180))
+                            & ((s["frequency"] == "monthly") | (s["frequency"] == "")), "-yield", 100),
+        "ema scoreboard": (lambda s: (s["ema_score"] >= 20) & (s["lastTradePrice"] >= 0.12)
+                           & (s["averageVol3Months"] >= 5000), "-ema_score", 20),
+        "parsed clauses": (lambda s: s.mask("yield >= 4", "exDate > -90d", "currency in CAD,USD"), "-dividend", 50),
+    }
+    print(f"{len(screener)} securities, {runs} runs\n")
+    for name, (build, order_by, limit) in screens.items():
+        filter_us, total_us = [], []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            mask = build(screener)
+            t1 = time.perf_counter()
+            rows = screener.select(mask, order_by, limit, columns=DISPLAY)
+            t2 = time.perf_counter()
+            filter_us.append((t1 - t0) * 1e6)
+            total_us.append((t2 - t0) * 1e6)
+        print(f"  {name:<16} {int(mask.sum()):>7} match  filter {statistics.median(filter_us):8.1f} µs"
+              f"   filter+sort+{len(rows)} rows {statistics.median(total_us):8.1f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen qt_securities in memory.")
+    parser.add_argument("--where", action="append", default=[], help="'column op value' (repeatable, ANDed)")
+    parser.add_argument("--order", default="-yield", help="column to sort by, '-' for descending")
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--bench", action="store_true", help="time a few typical screens")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="use N random securities instead of the database")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        screener = synthetic(args.synthetic)
+    else:
+        conn = connect_to_db()
+        try:
+            t0 = time.perf_counter()
+            screener = Screener().load(conn)
+            print(f"Loaded {len(screener)} securities in {time.perf_counter() - t0:.2f}s")
+        finally:
+            conn.close()
+
+    if args.bench:
+        bench(screener)
+        return
+
+    for row in screener.select(screener.mask(*args.where), args.order, args.limit, columns=DISPLAY):
+        ex = row["exDate"].strftime("%Y-%m-%d") if row["exDate"] else "-"
+        print(f"{row['symbol']:<12} {(row['description'] or '')[:30]:<31}"
+              f"{row['lastTradePrice'] or 0:>9.2f} {row['yield'] or 0:>7.2f}% {ex:>11} "
+              f"{row['frequency'] or '-':<14}"
+              + (f"{row['ema_score']:>8.1f}" if row["ema_score"] is not None else f"{'-':>8}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+startup_bench.py
+Measure how long each script takes to import, in a fresh interpreter per run,
+and which expensive things got pulled in along the way.
+
+Nothing should hit the Questrade API, open the OAuth machinery or start a
+browser just because a module was imported; the "loaded" column lists any of
+requests / playwright / a constructed QuestradeAPI that did show up.
+
+  python startup_bench.py              # every script, 5 runs each
+  python startup_bench.py --runs 20 AlphaCandle daily_ema_scoreboard2
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+RUNS               = 5
+SCRIPTS            = [
+    "AlphaSweep", "AlphaEnrich", "AlphaCandle", "candle_rollups", "candle_codec",
+    "candle_scheduler", "opening_windows", "opening_rebound_score2", "ema_engine",
+    "parallel_rebound_score", "rebound_backtest", "pattern_plugins", "live_rebound",
+    "daily_ema_scoreboard2", "dividend_calculator", "highest_yeild", "tmx_scraper", "tmx_http", "frequency_cache", "screener", "token_keepalive", "token_refresher", "db",
+]
+HEAVY              = ("requests", "playwright", "numpy")
+# ────────────────────────────────────────────────────────────────────
+
+PROBE = """
+import gc, json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+qt = sys.modules.get("questrade_api")
+print(json.dumps({{
+    "seconds": elapsed,
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+    "api_built": qt is not None and any(isinstance(o, qt.QuestradeAPI) for o in gc.get_objects()),
+}}))
+"""
+
+def probe(module):
+    """Import `module` in a new interpreter; returns the probe dict or {'error': ...}."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+        cwd=Path(__file__).resolve().parent,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Per‑script import/startup time.")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="module names (default: all scripts)")
+    parser.add_argument("--runs", type=int, default=RUNS, help="fresh interpreters per script")
+    args = parser.parse_args()
+
+    print(f"{'Script':<26}{'median ms':>10}{'min ms':>9}  loaded")
+    print("-" * 70)
+    for module in args.scripts:
+        samples = [probe(module) for _ in range(args.runs)]
+        errors = [s["error"] for s in samples if "error" in s]
+        if errors:
+            print(f"{module:<26}{'—':>10}{'—':>9}  failed: {errors[0]}")
+            continue
+        times = [s["seconds"] * 1000 for s in samples]
+        loaded = list(samples[0]["modules"])
+        if samples[0]["api_built"]:
+            loaded.append("QuestradeAPI")
+        print(f"{module:<26}{statistics.median(times):>10.1f}{min(times):>9.1f}  {', '.join(loaded) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+tmx_http.py
+Distribution frequency from TMX without a browser: fetch the key‑data page
+with a pooled requests.Session and read the frequency straight out of the
+HTML, falling back to the browser scraper (tmx_scraper) only for symbols the
+HTML doesn't give up.
+
+A page is tried three ways, cheapest first:
+  1. the rendered "… Frequency" label/value pair (Item__Label → Item__Desc)
+  2. a "dividendFrequency"/"distributionFrequency" key anywhere in the
+     page's inline JSON (Next.js / Apollo state)
+  3. the same key inside the __NEXT_DATA__ script, properly JSON‑decoded
+All three are compiled regexes / json from the standard library – no
+parser dependency.
+
+  python tmx_http.py ZWC XEI ZDV                      # live, browser fallback on
+  python tmx_http.py --bench fixtures/tmx --runs 50   # parse + HTTP (+ browser) timing
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tmx_scraper import TMX_BASE_URL, quote_url
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+WORKERS            = 8             # concurrent HTTP requests (also the pool size)
+TIMEOUT            = 10            # seconds per request
+RETRIES            = 2
+USER_AGENT         = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/126.0 Safari/537.36")
+FREQUENCIES        = {
+    "monthly": "monthly",
+    "quarterly": "quarterly",
+    "semi-annually": "semi-annually",
+    "semi-annual": "semi-annually",
+    "semiannually": "semi-annually",
+    "semiannual": "semi-annually",
+    "annually": "annually",
+    "annual": "annually",
+}
+# ────────────────────────────────────────────────────────────────────
+
+LABEL_VALUE = re.compile(
+    r'class="[^"]*Item__Label[^"]*"[^>]*>\s*(?:Distribution|Dividend)\s+Frequency\s*</\w+>\s*'
+    r'<\w+[^>]*class="[^"]*Item__Desc[^"]*"[^>]*>\s*([A-Za-z-]+)\s*<',
+    re.I,
+)
+JSON_KEY = re.compile(r'"(?:dividend|distribution)Frequency"\s*:\s*"([A-Za-z-]+)"', re.I)
+NEXT_DATA = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+
+def _normalize(value):
+    return FREQUENCIES.get(str(value).strip().lower()) if value else None
+
+def _find_key(node):
+    """Depth‑first search of decoded JSON for a *Frequency value."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key.lower() in ("dividendfrequency", "distributionfrequency") and _normalize(value):
+                return _normalize(value)
+            found = _find_key(value)
+            if found:
+                return found
+    elif isinstance(node, list):
+        for value in node:
+            found = _find_key(value)
+            if found:
+                return found
+    return None
+
+def parse_frequency(html):
+    """Frequency ('monthly', …) from a key‑data page's HTML, or None."""
+    for pattern in (LABEL_VALUE, JSON_KEY):
+        match = pattern.search(html)
+        if match and _normalize(match.group(1)):
+            return _normalize(match.group(1))
+    match = NEXT_DATA.search(html)
+    if match:
+        try:
+            return _find_key(json.loads(match.group(1)))
+        except ValueError:
+            pass
+    return None
+
+# -------------------------------------------------------------------
+# 1. HTTP
+# -------------------------------------------------------------------
+def make_session(pool_size=WORKERS):
+    """requests.Session with keep‑alive connections for pool_size threads and a small retry."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=RETRIES, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"})
+    return session
+
+def fetch_frequency(session, symbol, base_url=TMX_BASE_URL):
+    try:
+        response = session.get(quote_url(symbol, base_url), timeout=TIMEOUT)
+        if response.status_code != 200:
+            return None
+        return parse_frequency(response.text)
+    except Exception as e:
+        print(f"[HTTP error: {symbol}] {e}")
+        return None
+
+def resolve_frequencies(symbols, session=None, base_url=TMX_BASE_URL, fallback=None, workers=WORKERS):
+    """
+    {symbol: frequency or None}. Symbols the HTML doesn't answer are handed to
+    `fallback` (e.g. TmxScraper(...).fetch) in one call, if given.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    own_session = session is None
+    session = session or make_session(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=min(workers, len(symbols))) as pool:
+            results = dict(zip(symbols, pool.map(lambda s: fetch_frequency(session, s, base_url), symbols)))
+    finally:
+        if own_session:
+            session.close()
+
+    missing = [symbol for symbol, frequency in results.items() if frequency is None]
+    if missing and fallback is not None:
+        print(f"Falling back to the browser for {', '.join(missing)}...")
+        results.update(fallback(missing))
+    return results
+
+# -------------------------------------------------------------------
+# 2. Benchmark
+# -------------------------------------------------------------------
+def bench(directory, runs, browser=False):
+    from tmx_scraper import TmxScraper, fixture_symbols, serve_fixtures
+
+    pages = {p.stem: p.read_text() for p in sorted(Path(directory).glob("*.html"))}
+    print(f"{len(pages)} fixture pages, {runs} runs\n")
+
+    for symbol, html in pages.items():
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            frequency = parse_frequency(html)
+            times.append((time.perf_counter() - t0) * 1e6)
+        print(f"  parse {symbol:<10} {frequency or '-':<14} {statistics.median(times):8.1f} µs")
+
+    server, base_url = serve_fixtures(directory)
+    symbols = fixture_symbols(directory)
+    try:
+        with make_session() as session:
+            times = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                results = resolve_frequencies(symbols, session, base_url)
+                times.append((time.perf_counter() - t0) * 1000)
+        print(f"\n  http  {len(symbols)} pages      {statistics.median(times):8.1f} ms / batch   {results}")
+
+        if browser:
+            t0 = time.perf_counter()
+            with TmxScraper(base_url=base_url) as scraper:
+                t1 = time.perf_counter()
+                results = scraper.fetch(symbols)
+                t2 = time.perf_counter()
+            print(f"  browser {len(symbols)} pages    {(t2 - t1) * 1000:8.1f} ms / batch   {results}"
+                  f"   (+{(t1 - t0) * 1000:.0f} ms browser start)")
+    finally:
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve TMX distribution frequencies over plain HTTP.")
+    parser.add_argument("symbols", nargs="*", help="symbols to look up")
+    parser.add_argument("--base-url", default=TMX_BASE_URL)
+    parser.add_argument("--no-browser", action="store_true", help="don't fall back to the browser scraper")
+    parser.add_argument("--bench", metavar="DIR", help="benchmark against a directory of fixture pages")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--with-browser", action="store_true", help="include the browser scraper in --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.runs, args.with_browser)
+        return
+
+    scraper = None
+    if not args.no_browser:
+        from tmx_scraper import TmxScraper
+        scraper = TmxScraper(base_url=args.base_url)
+    try:
+        t0 = time.perf_counter()
+        results = resolve_frequencies(args.symbols, base_url=args.base_url,
+                                      fallback=scraper.fetch if scraper else None)
+        elapsed = time.perf_counter() - t0
+    finally:
+        if scraper:
+            scraper.close()
+    for symbol in args.symbols:
+        print(f"  {symbol:<15} {results.get(symbol) or '-'}")
+    print(f"\n{len(args.symbols)} symbols in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+tmx_scraper.py
+Distribution frequency (monthly / quarterly / …) from money.tmx.com key‑data
+pages, many symbols at once.
+
+One Chromium is shared by a pool of CONTEXTS browser contexts; each context
+keeps a single page and takes symbols off a common queue, so CONTEXTS pages
+load in parallel. Images, fonts, media, stylesheets and ad/analytics hosts
+are aborted at the router, and each page is done as soon as the frequency
+element (FREQUENCY_SELECTOR with a Monthly/Quarterly/… label) is in the DOM
+instead of waiting for network idle.
+
+base_url is a parameter so the whole thing can run against the pages in
+fixtures/tmx, served locally by serve_fixtures():
+
+  python tmx_scraper.py ZWC XEI ZDV               # live TMX
+  python tmx_scraper.py --fixtures fixtures/tmx   # every fixture page, locally
+"""
+
+import argparse
+import asyncio
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+TMX_BASE_URL       = "https://money.tmx.com"
+QUOTE_PATH         = "/en/quote/{symbol}/key-data"
+CONTEXTS           = 4             # pages loading at once
+NAV_TIMEOUT_MS     = 15000
+FREQUENCY_TIMEOUT_MS = 8000        # after DOMContentLoaded; non‑payers never show one
+FREQUENCY_SELECTOR = '[class*="Item__Desc"]'
+FREQUENCY_LABEL    = re.compile(r"^\s*(Monthly|Quarterly|Semi-Annually|Annually)\s*$", re.I)
+BLOCKED_RESOURCES  = {"image", "media", "font", "stylesheet"}
+BLOCKED_HOSTS      = (
+    "doubleclick.net", "googlesyndication.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adsrvr.org",
+    "amazon-adsystem.com", "scorecardresearch.com", "facebook.net",
+)
+# ────────────────────────────────────────────────────────────────────
+
+def quote_url(symbol, base_url=TMX_BASE_URL):
+    return base_url.rstrip("/") + QUOTE_PATH.format(symbol=symbol)
+
+# -------------------------------------------------------------------
+# 1. Browser pool
+# -------------------------------------------------------------------
+async def _block_non_essential(route):
+    request = route.request
+    host = urlsplit(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCES or host.endswith(BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def _read_frequency(page, symbol, base_url):
+    """Load one key‑data page and return its frequency ('monthly', …) or None."""
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    try:
+        await page.goto(quote_url(symbol, base_url), wait_until="domcontentloaded", timeout=NAV_TIMEOUT_MS)
+        label = page.locator(FREQUENCY_SELECTOR).filter(has_text=FREQUENCY_LABEL).first
+        await label.wait_for(state="attached", timeout=FREQUENCY_TIMEOUT_MS)
+        return (await label.text_content()).strip().lower()
+    except PlaywrightTimeoutError:
+        print(f"[Timeout: {symbol}] No distribution frequency on the page")
+    except Exception as e:
+        print(f"[Error: {symbol}] {e}")
+    return None
+
+async def _worker(context, queue, results, base_url):
+    page = await context.new_page()
+    try:
+        while True:
+            try:
+                symbol = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            results[symbol] = await _read_frequency(page, symbol, base_url)
+    finally:
+        await page.close()
+
+class TmxScraper:
+    """
+    A running browser + context pool. Usable from ordinary (sync) code:
+
+        with TmxScraper() as scraper:
+            scraper.fetch(["ZWC", "XEI"])     # {'ZWC': 'monthly', 'XEI': 'monthly'}
+
+    The browser stays up between fetch() calls. Playwright is only imported
+    when the scraper starts – on start()/with, or on the first fetch().
+    """
+
+    def __init__(self, contexts=CONTEXTS, base_url=TMX_BASE_URL, headless=True):
+        self.size = contexts
+        self.base_url = base_url
+        self.headless = headless
+        self._loop = None
+        self._playwright = None
+        self._browser = None
+        self._contexts = []
+
+    async def _start(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        for _ in range(self.size):
+            context = await self._browser.new_context()
+            await context.route("**/*", _block_non_essential)
+            self._contexts.append(context)
+
+    async def _fetch(self, symbols):
+        queue = asyncio.Queue()
+        for symbol in dict.fromkeys(symbols):
+            queue.put_nowait(symbol)
+        results = {}
+        workers = self._contexts[:max(1, min(len(self._contexts), queue.qsize()))]
+        await asyncio.gather(*(_worker(c, queue, results, self.base_url) for c in workers))
+        return results
+
+    async def _close(self):
+        for context in self._contexts:
+            await context.close()
+        self._contexts = []
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._start())
+        return self
+
+    def fetch(self, symbols):
+        """{symbol: frequency or None} for every symbol, CONTEXTS at a time."""
+        if not symbols:
+            return {}
+        if self._loop is None:
+            self.start()
+        return self._loop.run_until_complete(self._fetch(symbols))
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.run_until_complete(self._close())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+def fetch_frequencies(symbols, contexts=CONTEXTS, base_url=TMX_BASE_URL):
+    """One‑shot helper: start a pool, fetch, shut it down."""
+    with TmxScraper(contexts, base_url) as scraper:
+        return scraper.fetch(symbols)
+
+# -------------------------------------------------------------------
+# 2. Local fixtures
+# -------------------------------------------------------------------
+def serve_fixtures(directory):
+    """
+    Serve <directory>/<SYMBOL>.html at QUOTE_PATH on a free localhost port.
+    /delay/<ms>/… answers after <ms> milliseconds (fixtures use it for the
+    images/fonts a real page drags in). Returns (server, base_url); call
+    server.shutdown() when done.
+    """
+    directory = Path(directory)
+    quote = re.compile("^" + re.escape(QUOTE_PATH).replace(re.escape("{symbol}"), "(?P<symbol>[^/]+)") + "$")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path.startswith("/delay/"):
+                time.sleep(int(path.split("/")[2]) / 1000)
+                self._send(200, b"", "application/octet-stream")
+                return
+            match = quote.match(path)
+            page = match and directory / f"{match['symbol']}.html"
+            if page and page.is_file():
+                self._send(200, page.read_bytes(), "text/html; charset=utf-8")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def fixture_symbols(directory):
+    return sorted(p.stem for p in Path(directory).glob("*.html"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape TMX distribution frequencies with a browser-context pool.")
+    parser.add_argument("symbols", nargs="*", help="symbols to look up")
+    parser.add_argument("--contexts", type=int, default=CONTEXTS, help="pages loading at once")
+    parser.add_argument("--base-url", default=TMX_BASE_URL)
+    parser.add_argument("--fixtures", help="serve this directory of <SYMBOL>.html pages locally and scrape those")
+    args = parser.parse_args()
+
+    server = None
+    symbols, base_url = args.symbols, args.base_url
+    if args.fixtures:
+        server, base_url = serve_fixtures(args.fixtures)
+        symbols = symbols or fixture_symbols(args.fixtures)
+    try:
+        t0 = time.perf_counter()
+        with TmxScraper(args.contexts, base_url) as scraper:
+            t1 = time.perf_counter()
+            results = scraper.fetch(symbols)
+            t2 = time.perf_counter()
+    finally:
+        if server:
+            server.shutdown()
+
+    for symbol in symbols:
+        print(f"  {symbol:<15} {results.get(symbol) or '-'}")
+    print(f"\n{len(symbols)} symbols in {t2 - t1:.2f}s with {args.contexts} contexts "
+          f"(+{t1 - t0:.2f}s browser start)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+token_refresher.py
+Long‑running Questrade token refresher for every user in qt_oauth.
+
+Each pass reads every user's expires_at in one query and refreshes, in
+parallel, the ones expiring within LEAD_SECONDS. Refreshes go through
+QuestradeAPI.refresh_access_token, which holds the per‑user MySQL named lock
+(GET_LOCK('qt_oauth_refresh_user_<id>')), so a script that hits an expired
+token at the same moment waits for the lock and then simply reloads the new
+token instead of spending the single‑use refresh token a second time. With
+this running, scripts only ever read fresh tokens.
+
+It then sleeps until the next token is due (between MIN_SLEEP and MAX_SLEEP).
+Replaces the twice‑a‑day token_keepalive cron job.
+
+Tables used:
+  • qt_oauth              – access/refresh tokens and expires_at per user_id
+
+  python token_refresher.py              # run forever
+  python token_refresher.py --once       # one pass (cron‑friendly)
+"""
+
+import argparse
+import time
+import pymysql
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from db import connect_to_db
+
+# ─────────────────────────── PARAMETERS ────────────────────────────
+LEAD_SECONDS       = 300           # refresh this long before expires_at
+MIN_SLEEP          = 5
+MAX_SLEEP          = 300           # re‑read qt_oauth at least this often (new users, manual changes)
+RETRY_SECONDS      = 60            # after a failed refresh
+WORKERS            = 8
+# ────────────────────────────────────────────────────────────────────
+
+def load_expiries(conn):
+    """{user_id: expires_at} for every user with tokens."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT user_id, expires_at FROM qt_oauth")
+        expiries = {row["user_id"]: row["expires_at"] for row in cur.fetchall()}
+    conn.commit()                  # end the snapshot so the next poll sees tokens saved since
+    return expiries
+
+def refresh_user(user_id):
+    """Refresh one user's token (under the OAuth lock); returns the new expires_at."""
+    from questrade_api import QuestradeAPI
+
+    qt = QuestradeAPI(user_id=user_id)
+    try:
+        if qt.expires_at and qt.expires_at - datetime.now() > timedelta(seconds=LEAD_SECONDS):
+            return qt.expires_at               # someone else already did it
+        qt.refresh_access_token(interactive=False)
+        return qt.expires_at
+    finally:
+        qt.db.close()
+
+def refresh_due(conn, now=None, workers=WORKERS):
+    """
+    One pass: refresh every user expiring within LEAD_SECONDS, concurrently.
+    Returns {user_id: next time this user needs attention}.
+    """
+    now = now or datetime.now()
+    expiries = load_expiries(conn)
+    due = [u for u, expires_at in expiries.items() if expires_at - now <= timedelta(seconds=LEAD_SECONDS)]
+    next_check = {u: expires_at - timedelta(seconds=LEAD_SECONDS) for u, expires_at in expiries.items()}
+    if not due:
+        return next_check
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(due))) as pool:
+        futures = {user_id: pool.submit(refresh_user, user_id) for user_id in due}
+    for user_id, future in futures.items():
+        try:
+            expires_at = future.result()
+            next_check[user_id] = expires_at - timedelta(seconds=LEAD_SECONDS)
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} ✓ user {user_id} refreshed, expires {expires_at:%H:%M:%S}")
+        except Exception as e:
+            next_check[user_id] = datetime.now() + timedelta(seconds=RETRY_SECONDS)
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} ✗ user {user_id}: {e}")
+    return next_check
+
+def sleep_seconds(next_check, now=None):
+    if not next_check:
+        return MAX_SLEEP
+    wait = (min(next_check.values()) - (now or datetime.now())).total_seconds()
+    return max(MIN_SLEEP, min(MAX_SLEEP, wait))
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep every user's Questrade token fresh.")
+    parser.add_argument("--once", action="store_true", help="one pass, then exit")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    try:
+        while True:
+            try:
+                next_check = refresh_due(conn)
+            except pymysql.err.OperationalError as e:
+                print(f"Database error: {e} – reconnecting")
+                if conn.open:
+                    conn.close()
+                time.sleep(MIN_SLEEP)
+                conn = connect_to_db()
+                continue
+            if args.once:
+                break
+            time.sleep(sleep_seconds(next_check))
+    finally:
+        if conn.open:
+            conn.close()
+
+if __name__ == "__main__":
+    main()